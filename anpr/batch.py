@@ -0,0 +1,336 @@
+"""Пакетная обработка видеоархива без GUI.
+
+Файлы распределяются по пулу процессов (у каждого свои модели), кадры декодируются с
+прореживанием (``--frame-step``), детектор получает их пачками (``--batch-size``), а
+найденные номера пишутся в ``EventDatabase`` одной транзакцией на файл. Время события —
+время кадра в записи: начало ролика берется из имени файла (``20240131_142500.mp4``,
+``cam1-2024-01-31T14-25-00.mkv``) или из времени изменения файла минус длительность.
+
+Параметры пайплайна берутся из канала с именем ``--channel``, если он есть в настройках,
+иначе из общих значений ``tracking`` (без ``--channel`` канал определяется по имени файла).
+Файлы каналов с разным входом детектора обрабатываются отдельными пулами процессов.
+Детекция по движению в пакетном режиме не используется: ее роль выполняет прореживание кадров.
+
+Запуск::
+
+    python app.py --batch archive/ --channel "Канал 1" --workers 4
+    python -m anpr.batch cam1/*.mp4 --frame-step 3 --batch-size 16 --json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+
+from anpr.workers.channel_runner import ChannelRunner, extract_region, offset_detections
+from logging_manager import LoggingManager, get_logger
+from rollups import RollupStore
+from settings_manager import SettingsManager
+from storage import EventDatabase
+from tracker import ByteTracker
+
+logger = get_logger(__name__)
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".ts", ".m4v", ".webm")
+TIMESTAMP_SOURCES = ("auto", "filename", "mtime")
+
+# Дата и время в имени файла: 20240131_142500, 2024-01-31T14-25-00, 2024-01-31 14.25.00 и т. п.
+_FILENAME_TIMESTAMP = re.compile(
+    r"(?<!\d)(\d{4})[-_.]?(\d{2})[-_.]?(\d{2})[T_\-. ]?(\d{2})[-_.:]?(\d{2})[-_.:]?(\d{2})(?!\d)"
+)
+
+# Модели процесса-исполнителя: загружаются один раз в _init_worker.
+_worker_detector = None
+_worker_recognizer = None
+
+
+def collect_files(paths: Sequence[str], recursive: bool = False) -> List[str]:
+    """Разворачивает каталоги в список видеофайлов; явно указанные файлы берутся как есть."""
+    files: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                files.extend(
+                    os.path.join(root, name) for name in sorted(names) if name.lower().endswith(VIDEO_EXTENSIONS)
+                )
+                if not recursive:
+                    break
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            logger.warning("Файл не найден: %s", path)
+    return files
+
+
+def timestamp_from_filename(path: str) -> Optional[datetime]:
+    """Время начала записи из имени файла (местное время регистратора)."""
+    match = _FILENAME_TIMESTAMP.search(os.path.basename(path))
+    if match is None:
+        return None
+    try:
+        local = datetime(*(int(part) for part in match.groups()))
+    except ValueError:
+        return None
+    return local.astimezone(timezone.utc)
+
+
+def media_start_time(path: str, mode: str, duration_seconds: float) -> datetime:
+    """Время первого кадра ролика в UTC."""
+    if mode in ("auto", "filename"):
+        started = timestamp_from_filename(path)
+        if started is not None:
+            return started
+        if mode == "filename":
+            logger.warning("В имени %s нет даты, используется время изменения файла", path)
+    # Время изменения файла — момент окончания записи.
+    modified = datetime.fromtimestamp(os.path.getmtime(path), tz=timezone.utc)
+    return modified - timedelta(seconds=duration_seconds)
+
+
+def _init_worker(inference_config: Dict[str, Any], detector_options: Dict[str, Any], threads: int) -> None:
+    global _worker_detector, _worker_recognizer
+
+    import torch
+
+    from model_pool import MODEL_POOL
+
+    if threads > 0:
+        torch.set_num_threads(threads)
+    MODEL_POOL.configure(inference_config)
+    _worker_detector = MODEL_POOL.detector(**detector_options)
+    _worker_recognizer = MODEL_POOL.recognizer()
+
+
+def process_file(path: str, channel_conf: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Обрабатывает один файл в процессе-исполнителе и возвращает события и счетчики."""
+    from detector import Config as ModelConfig
+
+    started = time.perf_counter()
+    report: Dict[str, Any] = {"path": path, "events": [], "frames_decoded": 0, "frames_processed": 0}
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        report["error"] = "не удалось открыть файл"
+        return report
+
+    fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+    frame_count = capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0.0
+    duration = frame_count / fps if fps > 0 else 0.0
+    start_time = media_start_time(path, options["timestamps"], duration)
+
+    runner = ChannelRunner(channel_conf, db_path="")
+    pipeline = runner.create_pipeline(_worker_recognizer)
+    region = channel_conf.get("region", {})
+    tracker = ByteTracker(high_threshold=ModelConfig.DETECTION_CONFIDENCE_THRESHOLD)
+    frame_step = max(1, options["frame_step"])
+    batch_size = max(1, options["batch_size"])
+    batch: List[Tuple[Any, float]] = []
+
+    def flush() -> None:
+        regions = [extract_region(frame, region) for frame, _ in batch]
+        batch_detections = _worker_detector.detect_batch(
+            [roi for roi, _ in regions], min_confidence=tracker.low_threshold
+        )
+        for (frame, offset), (_, roi_rect), detections in zip(batch, regions, batch_detections):
+            detections = tracker.update(detections)
+            detections = offset_detections(detections, roi_rect)
+            results = pipeline.process_frame(frame, detections, now=offset)
+            timestamp = (start_time + timedelta(seconds=offset)).isoformat()
+            for res in results:
+                if res.get("text") and not res.get("unreadable"):
+                    report["events"].append(
+                        (timestamp, runner.name, res["text"], float(res.get("confidence", 0.0)), path)
+                    )
+        report["frames_processed"] += len(batch)
+        batch.clear()
+
+    index = 0
+    try:
+        while True:
+            # Пропускаемые кадры только демультиплексируются/декодируются, без конвертации в BGR.
+            if index % frame_step:
+                if not capture.grab():
+                    break
+            else:
+                ret, frame = capture.read()
+                if not ret:
+                    break
+                offset = index / fps if fps > 0 else capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+                batch.append((frame, offset))
+                if len(batch) >= batch_size:
+                    flush()
+            index += 1
+        if batch:
+            flush()
+    finally:
+        capture.release()
+
+    report["frames_decoded"] = index
+    report["media_seconds"] = duration or (index / fps if fps > 0 else 0.0)
+    report["seconds"] = time.perf_counter() - started
+    return report
+
+
+def detector_options(channel_conf: Dict[str, Any]) -> Dict[str, Any]:
+    """Параметры входа детектора канала; в процессе-исполнителе они общие для всех файлов."""
+    return {
+        "imgsz": int(channel_conf.get("detector_imgsz", 640)),
+        "rect": bool(channel_conf.get("detector_rect", True)),
+        "half_resolution": bool(channel_conf.get("detector_half_resolution", False)),
+    }
+
+
+def resolve_channel_conf(settings: SettingsManager, channel: str) -> Dict[str, Any]:
+    """Параметры канала из настроек; для неизвестного имени — значения по умолчанию."""
+    for conf in settings.get_channels():
+        if conf.get("name") == channel:
+            return dict(conf)
+    conf = SettingsManager._channel_defaults(settings.settings.get("tracking", {}))
+    conf["name"] = channel
+    return conf
+
+
+def run_batch(
+    files: Sequence[str],
+    settings: SettingsManager,
+    channel: Optional[str],
+    options: Dict[str, Any],
+    workers: int,
+    threads: int,
+) -> Dict[str, Any]:
+    """Распределяет файлы по процессам и пишет события в базу по мере готовности файлов."""
+    database = EventDatabase(settings.get_db_path())
+    summary: Dict[str, Any] = {
+        "files": len(files),
+        "failed": [],
+        "events": 0,
+        "frames_decoded": 0,
+        "frames_processed": 0,
+        "media_seconds": 0.0,
+    }
+    channel_confs = {
+        path: resolve_channel_conf(settings, channel or os.path.splitext(os.path.basename(path))[0])
+        for path in files
+    }
+    # Детектор создается в процессе-исполнителе один раз, поэтому файлы каналов с разным
+    # входом детектора обрабатываются отдельными пулами.
+    groups: Dict[Tuple[Tuple[str, Any], ...], List[str]] = {}
+    for path in files:
+        key = tuple(sorted(detector_options(channel_confs[path]).items()))
+        groups.setdefault(key, []).append(path)
+
+    started = time.perf_counter()
+    # spawn: torch и ultralytics плохо переносят fork после инициализации потоков.
+    context = multiprocessing.get_context("spawn")
+    done = 0
+    for key, group in groups.items():
+        if len(groups) > 1:
+            logger.info("Вход детектора %s: %d файлов", dict(key), len(group))
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(group)),
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(settings.get_inference_config(), dict(key), threads),
+        ) as pool:
+            futures = {pool.submit(process_file, path, channel_confs[path], options): path for path in group}
+            for future in as_completed(futures):
+                done += 1
+                path = futures[future]
+                try:
+                    report = future.result()
+                except Exception as exc:  # noqa: BLE001
+                    report = {"path": path, "events": [], "error": str(exc)}
+                if report.get("error"):
+                    summary["failed"].append({"path": path, "error": report["error"]})
+                    logger.error("Файл %s не обработан: %s", path, report["error"])
+                else:
+                    summary["events"] += database.insert_events(report["events"])
+                    for name in ("frames_decoded", "frames_processed", "media_seconds"):
+                        summary[name] += report[name]
+                _print_progress(done, len(files), report, summary, time.perf_counter() - started)
+
+    # Агрегаты статистики досчитываются сразу, не дожидаясь фоновой задачи GUI или headless.
+    rollups = RollupStore.from_config(settings.get_rollup_config(), settings.get_db_path())
+    if rollups is not None and summary["events"]:
+        rollups.update()
+
+    elapsed = time.perf_counter() - started
+    summary["seconds"] = elapsed
+    summary["frames_per_s"] = summary["frames_decoded"] / elapsed if elapsed else 0.0
+    summary["realtime_factor"] = summary["media_seconds"] / elapsed if elapsed else 0.0
+    return summary
+
+
+def _print_progress(done: int, total: int, report: Dict[str, Any], summary: Dict[str, Any], elapsed: float) -> None:
+    name = os.path.basename(report["path"])
+    if report.get("error"):
+        line = f"ошибка: {report['error']}"
+    else:
+        seconds = report["seconds"] or 1e-9
+        line = (
+            f"{report['frames_decoded']} кадров ({report['frames_processed']} в обработке), "
+            f"{len(report['events'])} событий, {report['frames_decoded'] / seconds:.1f} кадр/с"
+        )
+    remaining = elapsed / done * (total - done)
+    print(
+        f"[{done}/{total}] {name}: {line}; всего {summary['frames_decoded'] / elapsed:.1f} кадр/с, "
+        f"осталось ~{remaining:.0f} с",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Пакетная обработка видеоархива.")
+    parser.add_argument("--batch", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("paths", nargs="+", help="Видеофайлы и/или каталоги с записями.")
+    parser.add_argument("--recursive", action="store_true", help="Обходить вложенные каталоги.")
+    parser.add_argument("--settings", default="settings.json", help="Путь к settings.json.")
+    parser.add_argument(
+        "--channel", help="Имя канала для событий и его параметров (по умолчанию — имя файла без расширения)."
+    )
+    parser.add_argument(
+        "--workers", type=int, default=max(1, (os.cpu_count() or 1) // 4), help="Число процессов-исполнителей."
+    )
+    parser.add_argument("--threads", type=int, default=0, help="Потоки torch в каждом процессе (0 — поровну).")
+    parser.add_argument("--frame-step", type=int, default=3, help="Обрабатывать каждый N-й кадр.")
+    parser.add_argument("--batch-size", type=int, default=8, help="Кадров в одном вызове детектора.")
+    parser.add_argument(
+        "--timestamps", choices=TIMESTAMP_SOURCES, default="auto", help="Откуда брать время начала записи."
+    )
+    parser.add_argument("--json", action="store_true", help="Вывести итог в JSON.")
+    args = parser.parse_args(argv)
+
+    settings = SettingsManager(args.settings)
+    LoggingManager(settings.get_logging_config())
+    files = collect_files(args.paths, args.recursive)
+    if not files:
+        raise SystemExit("Нет видеофайлов для обработки")
+    workers = max(1, min(args.workers, len(files)))
+    threads = args.threads or max(1, (os.cpu_count() or 1) // workers)
+    logger.info("Пакетная обработка: %d файлов, %d процессов по %d потоков", len(files), workers, threads)
+
+    options = {"frame_step": args.frame_step, "batch_size": args.batch_size, "timestamps": args.timestamps}
+    summary = run_batch(files, settings, args.channel, options, workers, threads)
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    else:
+        print(
+            f"Файлов: {summary['files']} (ошибок: {len(summary['failed'])}), событий: {summary['events']}, "
+            f"кадров: {summary['frames_decoded']} ({summary['frames_per_s']:.1f} кадр/с, "
+            f"x{summary['realtime_factor']:.1f} к реальному времени), {summary['seconds']:.1f} с"
+        )
+    if summary["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""Headless-режим: каналы распознавания без PyQt, превью и GUI.
+
+Каждый канал крутится в собственном потоке со своим asyncio-циклом (как ``ChannelWorker``),
+а события передаются в подключаемые приемники (``EventSink``). Срабатывания списка
+розыска уходят в те же приемники: это событие с полями ``listed_plate``, ``match_kind``
+и ``note``. Так же раздаются проезды между парами каналов (``correlator.py``).
+
+Запуск::
+
+    python app.py --headless --sink log --sink jsonl:data/events.jsonl
+    python -m anpr.headless --sink webhook:http://127.0.0.1:8080/events
+"""
+
+import abc
+import argparse
+import json
+import os
+import queue
+import signal
+import threading
+import urllib.request
+from typing import Any, Dict, Iterable, List, Optional
+
+from anpr.workers.channel_runner import ChannelRunner
+from correlator import Correlator
+from logging_manager import LoggingManager, get_logger
+from metrics import REGISTRY, start_exporter
+from model_pool import MODEL_POOL
+from rollups import RollupStore
+from settings_manager import SettingsManager
+from snapshots import SnapshotStore
+from storage import EventDatabase
+from watchlist import Watchlist
+
+logger = get_logger(__name__)
+
+
+class EventSink(abc.ABC):
+    """Приемник событий распознавания; вызывается из потоков каналов."""
+
+    @abc.abstractmethod
+    def handle(self, event: Dict[str, Any]) -> None:
+        """Обрабатывает событие, срабатывание списка розыска или проезд."""
+
+    def close(self) -> None:
+        """Освобождает ресурсы при остановке сервиса."""
+
+
+class LogEventSink(EventSink):
+    """Пишет события в журнал приложения."""
+
+    def handle(self, event: Dict[str, Any]) -> None:
+        logger.info(
+            "Событие: %s (%s, conf=%.2f, id=%s)",
+            event.get("plate"),
+            event.get("channel"),
+            event.get("confidence") or 0.0,
+            event.get("id"),
+        )
+
+
+class JsonlEventSink(EventSink):
+    """Дописывает события в файл JSON Lines (по строке на событие)."""
+
+    def __init__(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def handle(self, event: Dict[str, Any]) -> None:
+        line = json.dumps(event, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class WebhookEventSink(EventSink):
+    """Отправляет события POST-запросом в JSON из отдельного потока.
+
+    Медленный или недоступный приемник не тормозит каналы: события складываются в очередь
+    ограниченного размера, при переполнении новые события отбрасываются с предупреждением.
+    """
+
+    def __init__(self, url: str, timeout: float = 5.0, max_queue: int = 1000) -> None:
+        self.url = url
+        self.timeout = timeout
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._worker, name="webhook-sink", daemon=True)
+        self._thread.start()
+
+    def handle(self, event: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            logger.warning("Очередь webhook переполнена, событие %s отброшено", event.get("plate"))
+
+    def _worker(self) -> None:
+        while True:
+            event = self._queue.get()
+            if event is None:
+                return
+            request = urllib.request.Request(
+                self.url,
+                data=json.dumps(event, ensure_ascii=False).encode("utf-8"),
+                headers={"Content-Type": "application/json"},
+                method="POST",
+            )
+            try:
+                urllib.request.urlopen(request, timeout=self.timeout).close()
+            except Exception:  # noqa: BLE001
+                logger.exception("Не удалось отправить событие на %s", self.url)
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join(self.timeout)
+
+
+def build_sink(spec: str) -> EventSink:
+    """Создает приемник по строке вида ``log``, ``jsonl:<путь>`` или ``webhook:<url>``."""
+    kind, _, arg = spec.partition(":")
+    if kind == "log":
+        return LogEventSink()
+    if kind == "jsonl":
+        return JsonlEventSink(arg or "data/events.jsonl")
+    if kind == "webhook" and arg:
+        return WebhookEventSink(arg)
+    raise ValueError(f"Неизвестный приемник событий: {spec}")
+
+
+class HeadlessService:
+    """Запускает все каналы из настроек без GUI и раздает события приемникам."""
+
+    def __init__(self, settings: SettingsManager, sinks: Iterable[EventSink]) -> None:
+        self.settings = settings
+        self.sinks: List[EventSink] = list(sinks)
+        self.runners: List[ChannelRunner] = []
+        self._threads: List[threading.Thread] = []
+        self.snapshots = SnapshotStore.from_config(settings.get_snapshot_config(), settings.get_db_path())
+        self.watchlist = Watchlist.from_config(settings.get_watchlist_config())
+        self.correlator = Correlator.from_config(settings.get_correlation_config())
+        self.rollups = RollupStore.from_config(settings.get_rollup_config(), settings.get_db_path())
+
+    def _dispatch(self, event: Dict[str, Any]) -> None:
+        for sink in self.sinks:
+            try:
+                sink.handle(event)
+            except Exception:  # noqa: BLE001
+                logger.exception("Приемник %s не смог обработать событие", type(sink).__name__)
+
+    @staticmethod
+    def _log_status(channel: str, status: str) -> None:
+        logger.info("Канал %s: %s", channel, status)
+
+    def start(self) -> None:
+        MODEL_POOL.warmup_async()
+        db_path = self.settings.get_db_path()
+        if self.correlator is not None:
+            self.correlator.restore(EventDatabase(db_path))
+            REGISTRY.register_gauge(
+                "anpr_occupancy", "Открытые проезды по парам каналов (машин внутри)", self.correlator.metrics
+            )
+        for channel_conf in self.settings.get_channels():
+            runner = ChannelRunner(
+                channel_conf,
+                db_path,
+                on_event=self._dispatch,
+                on_status=self._log_status,
+                snapshots=self.snapshots,
+                clip_config=self.settings.get_clip_config(),
+                watchlist=self.watchlist,
+                on_alert=self._dispatch,
+                correlator=self.correlator,
+                on_passage=self._dispatch,
+                rollups=self.rollups,
+            )
+            thread = threading.Thread(target=runner.run_blocking, name=f"channel-{runner.name}")
+            self.runners.append(runner)
+            self._threads.append(thread)
+            thread.start()
+        if self.snapshots is not None:
+            REGISTRY.register_gauge(
+                "anpr_snapshots", "Снимки событий: сохранено, отброшено, вытеснено, в очереди, байт", self.snapshots.metrics
+            )
+        if self.rollups is not None:
+            self.rollups.start()
+            REGISTRY.register_gauge(
+                "anpr_rollups", "Агрегаты событий: учтено событий, длительность обновления", self.rollups.metrics
+            )
+        if self.watchlist is not None:
+            REGISTRY.register_gauge(
+                "anpr_watchlist", "Список розыска: номеров, проверок, совпадений", self.watchlist.metrics
+            )
+        logger.info("Headless-режим: запущено каналов: %d", len(self.runners))
+
+    def stop(self) -> None:
+        for runner in self.runners:
+            runner.stop()
+
+    def wait(self) -> None:
+        for thread in self._threads:
+            # join с таймаутом, чтобы главный поток продолжал получать сигналы.
+            while thread.is_alive():
+                thread.join(0.5)
+        for sink in self.sinks:
+            sink.close()
+        if self.snapshots is not None:
+            self.snapshots.close()
+        if self.watchlist is not None:
+            self.watchlist.stop()
+        if self.rollups is not None:
+            self.rollups.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="ANPR без графического интерфейса.")
+    parser.add_argument("--headless", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--settings", default="settings.json", help="Путь к settings.json.")
+    parser.add_argument(
+        "--sink",
+        action="append",
+        dest="sinks",
+        help="Приемник событий: log, jsonl:<путь>, webhook:<url>. Можно указать несколько раз.",
+    )
+    args = parser.parse_args(argv)
+
+    settings = SettingsManager(args.settings)
+    LoggingManager(settings.get_logging_config())
+    logger.info("Запуск ANPR в headless-режиме")
+    start_exporter(settings.get_metrics_config())
+    MODEL_POOL.configure(settings.get_inference_config())
+
+    service = HeadlessService(settings, [build_sink(spec) for spec in args.sinks or ["log"]])
+
+    def _shutdown(signum, _frame) -> None:
+        logger.info("Получен сигнал %s, остановка каналов", signum)
+        service.stop()
+
+    signal.signal(signal.SIGINT, _shutdown)
+    signal.signal(signal.SIGTERM, _shutdown)
+    service.start()
+    service.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,22 @@
+import copy
+import time
+from datetime import datetime, timedelta
+
 import cv2
 from typing import Dict, List, Optional, Tuple
 
 from PyQt5 import QtCore, QtGui, QtWidgets
 
 from anpr.workers.channel_worker import ChannelWorker
+from correlator import Correlator
 from logging_manager import get_logger
+from metrics import REGISTRY
+from rollups import ALL_CHANNELS, RollupStore, bucket_range, bucket_start
 from settings_manager import SettingsManager
+from snapshots import SnapshotStore
 from storage import EventDatabase
+from video_sources import decode_options, open_source
+from watchlist import Watchlist
 
 logger = get_logger(__name__)
 
@@ -50,6 +60,15 @@ class ChannelView(QtWidgets.QWidget):
         self.status_hint.setAttribute(QtCore.Qt.WA_TransparentForMouseEvents)
         self.status_hint.hide()
 
+        self.stats_overlay = QtWidgets.QLabel("")
+        self.stats_overlay.setParent(self.video_label)
+        self.stats_overlay.setStyleSheet(
+            "background-color: rgba(0, 0, 0, 0.55); color: #9f9; padding: 2px 4px;"
+            "font-family: monospace; font-size: 10px;"
+        )
+        self.stats_overlay.hide()
+        self._stats_enabled = False
+
     def resizeEvent(self, event: QtGui.QResizeEvent) -> None:  # noqa: N802
         super().resizeEvent(event)
         rect = self.video_label.contentsRect()
@@ -60,6 +79,7 @@ class ChannelView(QtWidgets.QWidget):
         )
         status_size = self.status_hint.sizeHint()
         self.status_hint.move(rect.left() + margin, rect.bottom() - status_size.height() - margin)
+        self.stats_overlay.move(rect.left() + margin, rect.top() + margin)
 
     def set_pixmap(self, pixmap: QtGui.QPixmap) -> None:
         self.video_label.setPixmap(pixmap)
@@ -73,6 +93,39 @@ class ChannelView(QtWidgets.QWidget):
         if text:
             self.status_hint.adjustSize()
 
+    def set_stats_enabled(self, enabled: bool) -> None:
+        self._stats_enabled = enabled
+        self.stats_overlay.setVisible(enabled and bool(self.stats_overlay.text()))
+
+    def set_stats(self, stats: Dict) -> None:
+        stages = stats.get("stages", {})
+        detect = stages.get("detect", {})
+        recognize = stages.get("recognize", {})
+        self.stats_overlay.setText(
+            f"{stats.get('fps', 0.0):.1f} к/с | детект p95 {detect.get('p95_ms', 0.0):.0f} мс"
+            f" | OCR p95 {recognize.get('p95_ms', 0.0):.0f} мс"
+        )
+        lines = [
+            f"Кадров: {stats.get('frames_read', 0)}, обработано: {stats.get('frames_processed', 0)}, "
+            f"без движения: {stats.get('frames_skipped', 0)}, потеряно источником: {stats.get('frames_lost', 0)}, "
+            f"ошибок чтения: {stats.get('read_failures', 0)}",
+            "Стадия: p50 / p95 / p99 (мс)",
+        ]
+        if stats.get("reconnects") or stats.get("reconnecting"):
+            lines.insert(
+                1,
+                f"Переподключений: {stats.get('reconnects', 0)}, последнее {stats.get('last_reconnect_seconds', 0.0):.1f} с, "
+                f"простой {stats.get('downtime_seconds', 0.0):.0f} с",
+            )
+        for name, hist in stages.items():
+            if hist.get("count"):
+                lines.append(
+                    f"{name}: {hist['p50_ms']:.1f} / {hist['p95_ms']:.1f} / {hist['p99_ms']:.1f}"
+                )
+        self.stats_overlay.setToolTip("\n".join(lines))
+        self.stats_overlay.adjustSize()
+        self.stats_overlay.setVisible(self._stats_enabled)
+
 
 class ROIEditor(QtWidgets.QLabel):
     """Виджет предпросмотра канала с настраиваемой областью распознавания."""
@@ -191,6 +244,63 @@ class ROIEditor(QtWidgets.QLabel):
         self.update()
 
 
+class BarChart(QtWidgets.QWidget):
+    """Столбчатая диаграмма значений по интервалам времени; подсказка — при наведении."""
+
+    def __init__(self, title: str, color: str, value_suffix: str = "") -> None:
+        super().__init__()
+        self.title = title
+        self.color = QtGui.QColor(color)
+        self.value_suffix = value_suffix
+        self._labels: List[str] = []
+        self._values: List[float] = []
+        self.setMinimumHeight(140)
+        self.setMouseTracking(True)
+        self.setStyleSheet("background-color: #1c1c1c;")
+
+    def set_data(self, labels: List[str], values: List[float]) -> None:
+        self._labels = labels
+        self._values = values
+        self.update()
+
+    def _plot_rect(self) -> QtCore.QRect:
+        return self.rect().adjusted(8, 22, -8, -18)
+
+    def paintEvent(self, event: QtGui.QPaintEvent) -> None:  # noqa: N802
+        painter = QtGui.QPainter(self)
+        painter.fillRect(self.rect(), QtGui.QColor("#1c1c1c"))
+        painter.setPen(QtGui.QColor("#ccc"))
+        peak = max(self._values, default=0.0)
+        painter.drawText(8, 15, f"{self.title} (макс. {peak:.0f}{self.value_suffix})")
+        if not self._values:
+            return
+        plot = self._plot_rect()
+        step = plot.width() / len(self._values)
+        painter.setPen(QtCore.Qt.NoPen)
+        painter.setBrush(self.color)
+        for index, value in enumerate(self._values):
+            if value <= 0 or peak <= 0:
+                continue
+            height = max(1, int(plot.height() * value / peak))
+            left = plot.left() + int(index * step)
+            width = max(1, int((index + 1) * step) - int(index * step) - (1 if step > 3 else 0))
+            painter.drawRect(left, plot.bottom() - height, width, height)
+        painter.setPen(QtGui.QColor("#888"))
+        painter.drawText(plot.left(), self.height() - 4, self._labels[0])
+        last = self._labels[-1]
+        painter.drawText(plot.right() - painter.fontMetrics().horizontalAdvance(last), self.height() - 4, last)
+
+    def mouseMoveEvent(self, event: QtGui.QMouseEvent) -> None:  # noqa: N802
+        plot = self._plot_rect()
+        if not self._values or not plot.width():
+            return
+        index = int((event.pos().x() - plot.left()) * len(self._values) / plot.width())
+        if 0 <= index < len(self._values):
+            QtWidgets.QToolTip.showText(
+                event.globalPos(), f"{self._labels[index]}: {self._values[index]:.1f}{self.value_suffix}", self
+            )
+
+
 class MainWindow(QtWidgets.QMainWindow):
     """Главное окно приложения ANPR с вкладками мониторинга, событий, поиска и настроек."""
 
@@ -202,24 +312,66 @@ class MainWindow(QtWidgets.QMainWindow):
         self.resize(1280, 800)
 
         self.settings = settings or SettingsManager()
+        self.settings.subscribe(self._on_settings_changed)
         self.db = EventDatabase(self.settings.get_db_path())
+        self.snapshots = SnapshotStore.from_config(self.settings.get_snapshot_config(), self.settings.get_db_path())
+        if self.snapshots is not None:
+            REGISTRY.register_gauge(
+                "anpr_snapshots", "Снимки событий: сохранено, отброшено, вытеснено, в очереди, байт", self.snapshots.metrics
+            )
+        self.watchlist = Watchlist.from_config(self.settings.get_watchlist_config())
+        if self.watchlist is not None:
+            REGISTRY.register_gauge(
+                "anpr_watchlist", "Список розыска: номеров, проверок, совпадений", self.watchlist.metrics
+            )
+        self.rollups = RollupStore.from_config(self.settings.get_rollup_config(), self.settings.get_db_path())
+        if self.rollups is not None:
+            self.rollups.start()
+            REGISTRY.register_gauge(
+                "anpr_rollups", "Агрегаты событий: учтено событий, длительность обновления", self.rollups.metrics
+            )
+        self.correlator = Correlator.from_config(self.settings.get_correlation_config())
+        if self.correlator is not None:
+            self.correlator.restore(self.db)
+            REGISTRY.register_gauge(
+                "anpr_occupancy", "Открытые проезды по парам каналов (машин внутри)", self.correlator.metrics
+            )
 
-        self.channel_workers: List[ChannelWorker] = []
+        # Работающие каналы по id из настроек: при сохранении трогаем только измененные.
+        self.channel_workers: Dict[int, ChannelWorker] = {}
         self.channel_labels: Dict[str, ChannelView] = {}
+        self.channel_stats: Dict[str, Dict] = {}
 
         self.tabs = QtWidgets.QTabWidget()
         self.monitor_tab = self._build_monitor_tab()
         self.events_tab = self._build_events_tab()
+        self.alerts_tab = self._build_alerts_tab()
+        self.passages_tab = self._build_passages_tab()
+        self.dashboard_tab = self._build_dashboard_tab()
         self.search_tab = self._build_search_tab()
         self.settings_tab = self._build_settings_tab()
 
         self.tabs.addTab(self.monitor_tab, "Монитор")
         self.tabs.addTab(self.events_tab, "События")
+        self.tabs.addTab(self.alerts_tab, "Тревоги")
+        self.tabs.addTab(self.passages_tab, "Проезды")
+        self.tabs.addTab(self.dashboard_tab, "Статистика")
         self.tabs.addTab(self.search_tab, "Поиск")
         self.tabs.addTab(self.settings_tab, "Настройки")
+        self.unseen_alerts = 0
+        self.tabs.currentChanged.connect(self._on_tab_changed)
 
         self.setCentralWidget(self.tabs)
+        self.statusBar().showMessage("Каналы не запущены")
+        # Зависшая камера перестает присылать метрики, поэтому возраст кадра досчитываем по таймеру.
+        self.stats_timer = QtCore.QTimer(self)
+        self.stats_timer.timeout.connect(self._refresh_status_bar)
+        # Заполненность меняется и без новых проездов: входы открывают проезды, старые истекают.
+        self.stats_timer.timeout.connect(self._update_occupancy_label)
+        self.stats_timer.start(1000)
         self._refresh_events_table()
+        self._refresh_alerts_table()
+        self._refresh_passages_table()
 
     # ------------------ Мониторинг ------------------
     def _build_monitor_tab(self) -> QtWidgets.QWidget:
@@ -238,6 +390,11 @@ class MainWindow(QtWidgets.QMainWindow):
         self.start_button.clicked.connect(self._start_channels)
         controls.addWidget(self.start_button)
 
+        self.stats_toggle = QtWidgets.QCheckBox("Статистика")
+        self.stats_toggle.setToolTip("Показывать FPS и задержки стадий поверх каналов")
+        self.stats_toggle.toggled.connect(self._on_stats_toggled)
+        controls.addWidget(self.stats_toggle)
+
         controls.addStretch()
         controls.addWidget(QtWidgets.QLabel("Последнее событие:"))
         self.last_event_label = QtWidgets.QLabel("—")
@@ -282,6 +439,7 @@ class MainWindow(QtWidgets.QMainWindow):
         for row in range(rows):
             for col in range(cols):
                 label = ChannelView(f"Канал {index+1}")
+                label.set_stats_enabled(self.stats_toggle.isChecked())
                 if index < len(channels):
                     channel_name = channels[index].get("name", f"Канал {index+1}")
                     self.channel_labels[channel_name] = label
@@ -294,20 +452,65 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def _start_channels(self) -> None:
         self._stop_workers()
-        self.channel_workers = []
         for channel_conf in self.settings.get_channels():
-            worker = ChannelWorker(channel_conf, self.settings.get_db_path())
-            worker.frame_ready.connect(self._update_frame)
-            worker.event_ready.connect(self._handle_event)
-            worker.status_ready.connect(self._handle_status)
-            self.channel_workers.append(worker)
-            worker.start()
+            self._start_worker(channel_conf)
+
+    def _start_worker(self, channel_conf: Dict) -> None:
+        # Копия: формы настроек меняют словари каналов на месте, а сравнение идет с запущенной версией.
+        worker = ChannelWorker(
+            copy.deepcopy(channel_conf),
+            self.settings.get_db_path(),
+            snapshots=self.snapshots,
+            clip_config=self.settings.get_clip_config(),
+            watchlist=self.watchlist,
+            correlator=self.correlator,
+            rollups=self.rollups,
+        )
+        worker.frame_ready.connect(self._update_frame)
+        worker.event_ready.connect(self._handle_event)
+        worker.alert_ready.connect(self._handle_alert)
+        worker.passage_ready.connect(self._handle_passage)
+        worker.status_ready.connect(self._handle_status)
+        worker.stats_ready.connect(self._handle_stats)
+        self.channel_workers[channel_conf.get("id")] = worker
+        worker.start()
+
+    def _stop_worker(self, channel_id: int) -> None:
+        worker = self.channel_workers.pop(channel_id)
+        worker.stop()
+        worker.wait(1000)
+        self.channel_stats.pop(worker.runner.name, None)
 
     def _stop_workers(self) -> None:
-        for worker in self.channel_workers:
-            worker.stop()
-            worker.wait(1000)
-        self.channel_workers = []
+        for channel_id in list(self.channel_workers):
+            self._stop_worker(channel_id)
+        self.channel_stats.clear()
+
+    def _on_settings_changed(self, section: str) -> None:
+        if section in ("channels", "all"):
+            self._sync_workers()
+
+    def _sync_workers(self) -> None:
+        """Приводит работающие каналы к настройкам, не трогая неизмененные.
+
+        Удаленные каналы останавливаются, новые запускаются, переименованные перезапускаются;
+        остальным изменения передаются на лету через ``ChannelWorker.update_config``.
+        """
+        if not self.channel_workers:
+            return
+        channels = {channel.get("id"): channel for channel in self.settings.get_channels()}
+        for channel_id in list(self.channel_workers):
+            if channel_id not in channels:
+                self._stop_worker(channel_id)
+        for channel_id, channel_conf in channels.items():
+            worker = self.channel_workers.get(channel_id)
+            if worker is None:
+                self._start_worker(channel_conf)
+            elif channel_conf.get("name") != worker.runner.name:
+                self._stop_worker(channel_id)
+                self._start_worker(channel_conf)
+            elif channel_conf != worker.channel_conf:
+                worker.update_config(copy.deepcopy(channel_conf))
 
     def _update_frame(self, channel_name: str, image: QtGui.QImage) -> None:
         label = self.channel_labels.get(channel_name)
@@ -335,6 +538,34 @@ class MainWindow(QtWidgets.QMainWindow):
                 label.set_status(status)
             label.set_motion_active("обнаружено" in normalized)
 
+    def _on_stats_toggled(self, enabled: bool) -> None:
+        for label in self.channel_labels.values():
+            label.set_stats_enabled(enabled)
+
+    def _handle_stats(self, channel: str, stats: Dict) -> None:
+        stats["received_at"] = time.monotonic()
+        self.channel_stats[channel] = stats
+        label = self.channel_labels.get(channel)
+        if label:
+            label.set_stats(stats)
+        self._refresh_status_bar()
+
+    def _refresh_status_bar(self) -> None:
+        if not self.channel_stats:
+            return
+        now = time.monotonic()
+        total_fps = sum(item.get("fps", 0.0) for item in self.channel_stats.values())
+        # Канал без кадров дольше нескольких секунд считаем зависшим.
+        stalled = [
+            name
+            for name, item in self.channel_stats.items()
+            if (item.get("frame_age") or 0.0) + now - item["received_at"] > 5.0
+        ]
+        message = f"Каналов: {len(self.channel_stats)} | суммарно {total_fps:.1f} к/с"
+        if stalled:
+            message += f" | нет кадров: {', '.join(stalled)}"
+        self.statusBar().showMessage(message)
+
     # ------------------ События ------------------
     def _build_events_tab(self) -> QtWidgets.QWidget:
         widget = QtWidgets.QWidget()
@@ -397,6 +628,239 @@ class MainWindow(QtWidgets.QMainWindow):
             )
             self.events_table.setItem(row_index, 4, QtWidgets.QTableWidgetItem(row_data["source"]))
 
+    # ------------------ Тревоги ------------------
+    ALERT_COLUMNS = ["Время", "Канал", "Номер", "В списке", "Совпадение", "Комментарий"]
+    # Строк в таблице тревог: старые уходят вниз и отбрасываются.
+    ALERTS_LIMIT = 200
+
+    def _build_alerts_tab(self) -> QtWidgets.QWidget:
+        widget = QtWidgets.QWidget()
+        layout = QtWidgets.QVBoxLayout(widget)
+
+        controls = QtWidgets.QHBoxLayout()
+        self.watchlist_label = QtWidgets.QLabel()
+        controls.addWidget(self.watchlist_label)
+        controls.addStretch()
+        reload_btn = QtWidgets.QPushButton("Перечитать список")
+        reload_btn.setEnabled(self.watchlist is not None)
+        reload_btn.clicked.connect(self._reload_watchlist)
+        controls.addWidget(reload_btn)
+        layout.addLayout(controls)
+
+        self.alerts_table = QtWidgets.QTableWidget(0, len(self.ALERT_COLUMNS))
+        self.alerts_table.setHorizontalHeaderLabels(self.ALERT_COLUMNS)
+        self.alerts_table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.alerts_table)
+
+        self._update_watchlist_label()
+        return widget
+
+    def _update_watchlist_label(self) -> None:
+        if self.watchlist is None:
+            self.watchlist_label.setText("Список розыска выключен")
+        else:
+            self.watchlist_label.setText(f"Номеров в списке розыска: {len(self.watchlist)} ({self.watchlist.path})")
+
+    def _reload_watchlist(self) -> None:
+        self.watchlist.reload()
+        self._update_watchlist_label()
+
+    def _insert_alert_row(self, row_index: int, alert: Dict) -> None:
+        self.alerts_table.insertRow(row_index)
+        values = [
+            alert["timestamp"],
+            alert["channel"],
+            alert["plate"],
+            alert["listed_plate"],
+            alert["match_kind"],
+            alert["note"] or "",
+        ]
+        for column, value in enumerate(values):
+            self.alerts_table.setItem(row_index, column, QtWidgets.QTableWidgetItem(value))
+
+    def _refresh_alerts_table(self) -> None:
+        self.alerts_table.setRowCount(0)
+        for row_data in self.db.fetch_alerts(self.ALERTS_LIMIT):
+            self._insert_alert_row(self.alerts_table.rowCount(), row_data)
+
+    def _handle_alert(self, alert: Dict) -> None:
+        # Новая тревога сверху; базу не перечитываем — строка уже есть в сигнале.
+        self._insert_alert_row(0, alert)
+        if self.alerts_table.rowCount() > self.ALERTS_LIMIT:
+            self.alerts_table.removeRow(self.alerts_table.rowCount() - 1)
+        self._update_watchlist_label()
+        # Строку состояния каждую секунду перезаписывают метрики, поэтому тревогу показывает вкладка.
+        if self.tabs.currentWidget() is not self.alerts_tab:
+            self.unseen_alerts += 1
+            index = self.tabs.indexOf(self.alerts_tab)
+            self.tabs.setTabText(index, f"Тревоги ({self.unseen_alerts})")
+            self.tabs.tabBar().setTabTextColor(index, QtGui.QColor("red"))
+
+    def _on_tab_changed(self, index: int) -> None:
+        if self.tabs.widget(index) is self.dashboard_tab:
+            self._refresh_dashboard()
+        if self.tabs.widget(index) is self.alerts_tab and self.unseen_alerts:
+            self.unseen_alerts = 0
+            self.tabs.setTabText(index, "Тревоги")
+            self.tabs.tabBar().setTabTextColor(index, self.tabs.tabBar().tabTextColor(0))
+
+    # ------------------ Проезды ------------------
+    PASSAGE_COLUMNS = ["Пара", "Номер", "Начало", "Конец", "Длительность"]
+    PASSAGES_LIMIT = 200
+
+    def _build_passages_tab(self) -> QtWidgets.QWidget:
+        widget = QtWidgets.QWidget()
+        layout = QtWidgets.QVBoxLayout(widget)
+
+        self.occupancy_label = QtWidgets.QLabel()
+        layout.addWidget(self.occupancy_label)
+
+        self.passages_table = QtWidgets.QTableWidget(0, len(self.PASSAGE_COLUMNS))
+        self.passages_table.setHorizontalHeaderLabels(self.PASSAGE_COLUMNS)
+        self.passages_table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.passages_table)
+
+        self._update_occupancy_label()
+        return widget
+
+    def _update_occupancy_label(self) -> None:
+        if self.correlator is None:
+            self.occupancy_label.setText("Пары каналов не заданы (раздел correlation в settings.json)")
+            return
+        parts = [f"{name}: {count}" for name, count in self.correlator.occupancy().items()]
+        self.occupancy_label.setText("Внутри сейчас — " + ", ".join(parts))
+
+    @staticmethod
+    def _format_duration(seconds: float) -> str:
+        minutes, secs = divmod(int(seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+
+    def _insert_passage_row(self, row_index: int, passage: Dict) -> None:
+        self.passages_table.insertRow(row_index)
+        values = [
+            passage["pair"],
+            passage["plate"],
+            passage["started_at"],
+            passage["finished_at"],
+            self._format_duration(passage["duration_seconds"]),
+        ]
+        for column, value in enumerate(values):
+            self.passages_table.setItem(row_index, column, QtWidgets.QTableWidgetItem(value))
+
+    def _refresh_passages_table(self) -> None:
+        self.passages_table.setRowCount(0)
+        for row_data in self.db.fetch_passages(self.PASSAGES_LIMIT):
+            self._insert_passage_row(self.passages_table.rowCount(), row_data)
+
+    def _handle_passage(self, passage: Dict) -> None:
+        self._insert_passage_row(0, passage)
+        if self.passages_table.rowCount() > self.PASSAGES_LIMIT:
+            self.passages_table.removeRow(self.passages_table.rowCount() - 1)
+        self._update_occupancy_label()
+
+    # ------------------ Статистика ------------------
+    # Диапазоны вкладки: подпись, период агрегатов и глубина от текущего момента.
+    DASHBOARD_RANGES = [
+        ("Последний час, по минутам", "minute", timedelta(hours=1)),
+        ("Последние сутки, по часам", "hour", timedelta(days=1)),
+        ("Последние 30 дней, по дням", "day", timedelta(days=30)),
+        ("Последний год, по дням", "day", timedelta(days=365)),
+    ]
+
+    def _build_dashboard_tab(self) -> QtWidgets.QWidget:
+        widget = QtWidgets.QWidget()
+        layout = QtWidgets.QVBoxLayout(widget)
+
+        controls = QtWidgets.QHBoxLayout()
+        self.dashboard_range = QtWidgets.QComboBox()
+        for title, _, _ in self.DASHBOARD_RANGES:
+            self.dashboard_range.addItem(title)
+        self.dashboard_range.setCurrentIndex(1)
+        self.dashboard_range.currentIndexChanged.connect(self._refresh_dashboard)
+        controls.addWidget(self.dashboard_range)
+        controls.addWidget(QtWidgets.QLabel("Канал:"))
+        self.dashboard_channel = QtWidgets.QComboBox()
+        self.dashboard_channel.addItem("Все", ALL_CHANNELS)
+        for channel in self.settings.get_channels():
+            self.dashboard_channel.addItem(channel.get("name", ""), channel.get("name", ""))
+        self.dashboard_channel.currentIndexChanged.connect(self._refresh_dashboard)
+        controls.addWidget(self.dashboard_channel)
+        refresh_btn = QtWidgets.QPushButton("Обновить")
+        refresh_btn.clicked.connect(self._refresh_dashboard)
+        controls.addWidget(refresh_btn)
+        controls.addStretch()
+        layout.addLayout(controls)
+
+        self.dashboard_summary = QtWidgets.QLabel()
+        layout.addWidget(self.dashboard_summary)
+
+        charts = QtWidgets.QVBoxLayout()
+        self.events_chart = BarChart("События", "#3c8dde")
+        self.unique_chart = BarChart("Уникальные номера", "#4caf50")
+        self.unreadable_chart = BarChart("Нечитаемые машины", "#e0a030", "%")
+        for chart in (self.events_chart, self.unique_chart, self.unreadable_chart):
+            charts.addWidget(chart)
+
+        self.top_plates_table = QtWidgets.QTableWidget(0, 3)
+        self.top_plates_table.setHorizontalHeaderLabels(["Номер", "Событий", "Дней"])
+        self.top_plates_table.horizontalHeader().setStretchLastSection(True)
+        self.top_plates_table.setMaximumWidth(320)
+
+        body = QtWidgets.QHBoxLayout()
+        body.addLayout(charts, stretch=1)
+        body.addWidget(self.top_plates_table)
+        layout.addLayout(body)
+
+        # Пока вкладка открыта, графики обновляются с частотой фоновой задачи агрегатов.
+        self.dashboard_timer = QtCore.QTimer(self)
+        self.dashboard_timer.timeout.connect(self._on_dashboard_timer)
+        if self.rollups is not None:
+            self.dashboard_timer.start(int(max(1.0, self.rollups.interval) * 1000))
+        return widget
+
+    def _on_dashboard_timer(self) -> None:
+        if self.tabs.currentWidget() is self.dashboard_tab:
+            self._refresh_dashboard()
+
+    def _refresh_dashboard(self) -> None:
+        """Перерисовывает графики по таблицам агрегатов, не обращаясь к таблице событий."""
+        if self.rollups is None:
+            self.dashboard_summary.setText("Агрегаты выключены (раздел rollups в settings.json)")
+            return
+        _, period, depth = self.DASHBOARD_RANGES[self.dashboard_range.currentIndex()]
+        channel = self.dashboard_channel.currentData() or ALL_CHANNELS
+        now = datetime.now().astimezone()
+        buckets = bucket_range(period, now - depth, now)
+        rows = {row["bucket"]: row for row in self.db.fetch_rollups(period, buckets[0], channel)}
+        events, unique, unreadable = [], [], []
+        for bucket in buckets:
+            row = rows.get(bucket)
+            count = row["events"] if row else 0
+            failed = row["unreadable"] if row else 0
+            events.append(count)
+            unique.append(row["unique_plates"] if row else 0)
+            unreadable.append(100.0 * failed / (count + failed) if count + failed else 0.0)
+        for chart, values in ((self.events_chart, events), (self.unique_chart, unique), (self.unreadable_chart, unreadable)):
+            chart.set_data(buckets, values)
+
+        total = sum(events)
+        failed_total = sum(row["unreadable"] for row in rows.values())
+        ratio = 100.0 * failed_total / (total + failed_total) if total + failed_total else 0.0
+        self.dashboard_summary.setText(
+            f"Событий: {total}, нечитаемых машин: {failed_total} ({ratio:.1f}%). "
+            f"Агрегаты обновляются раз в {self.rollups.interval:.0f} с."
+        )
+
+        top_start = bucket_start(now - max(depth, timedelta(days=1)), "day")
+        self.top_plates_table.setRowCount(0)
+        for row_data in self.db.fetch_top_plates(top_start, channel):
+            row_index = self.top_plates_table.rowCount()
+            self.top_plates_table.insertRow(row_index)
+            self.top_plates_table.setItem(row_index, 0, QtWidgets.QTableWidgetItem(row_data["plate"]))
+            self.top_plates_table.setItem(row_index, 1, QtWidgets.QTableWidgetItem(str(row_data["events"])))
+            self.top_plates_table.setItem(row_index, 2, QtWidgets.QTableWidgetItem(str(row_data["days"])))
+
     # ------------------ Поиск ------------------
     def _build_search_tab(self) -> QtWidgets.QWidget:
         widget = QtWidgets.QWidget()
@@ -473,6 +937,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.channel_name_input = QtWidgets.QLineEdit()
         self.channel_source_input = QtWidgets.QLineEdit()
         channel_form.addRow("Название:", self.channel_name_input)
+        self.channel_source_input.setPlaceholderText("0, rtsp://..., файл, synthetic://fps=25&res=1280x720, loop://файл")
         channel_form.addRow("Источник/RTSP:", self.channel_source_input)
 
         preview_layout = QtWidgets.QVBoxLayout()
@@ -485,6 +950,32 @@ class MainWindow(QtWidgets.QMainWindow):
         channel_form.addRow(preview_layout)
         form_container.addWidget(channel_box)
 
+        decode_box = QtWidgets.QGroupBox("Декодирование видео")
+        decode_form = QtWidgets.QFormLayout(decode_box)
+        self.decode_backend_input = QtWidgets.QComboBox()
+        self.decode_backend_input.addItem("Авто", "auto")
+        self.decode_backend_input.addItem("FFmpeg", "ffmpeg")
+        self.decode_backend_input.addItem("GStreamer", "gstreamer")
+        decode_form.addRow("Бэкенд:", self.decode_backend_input)
+
+        self.decode_threads_input = QtWidgets.QSpinBox()
+        self.decode_threads_input.setRange(0, 16)
+        self.decode_threads_input.setToolTip("Потоки декодера FFmpeg (0 — по умолчанию)")
+        decode_form.addRow("Потоки декодера:", self.decode_threads_input)
+
+        self.decode_width_input = QtWidgets.QSpinBox()
+        self.decode_width_input.setRange(0, 3840)
+        self.decode_width_input.setSingleStep(160)
+        self.decode_width_input.setToolTip("Уменьшать кадр до этой ширины сразу после декодирования (0 — исходный размер)")
+        decode_form.addRow("Ширина кадра:", self.decode_width_input)
+
+        self.decode_hw_input = QtWidgets.QCheckBox("Аппаратное ускорение")
+        decode_form.addRow("", self.decode_hw_input)
+        self.decode_keyframes_input = QtWidgets.QCheckBox("Только опорные кадры")
+        self.decode_keyframes_input.setToolTip("Декодировать только ключевые кадры (FFmpeg) — для каналов с редкими проездами")
+        decode_form.addRow("", self.decode_keyframes_input)
+        form_container.addWidget(decode_box)
+
         detection_box = QtWidgets.QGroupBox("Детектор движения и область")
         detection_form = QtWidgets.QFormLayout(detection_box)
         self.detection_mode_input = QtWidgets.QComboBox()
@@ -549,10 +1040,36 @@ class MainWindow(QtWidgets.QMainWindow):
         self.motion_noise_ema_input.setDecimals(2)
         self.motion_noise_ema_input.setToolTip("EMA шумовой базы для адаптивного порога")
         detection_form.addRow("Сглаживание шума EMA:", self.motion_noise_ema_input)
+
+        self.detector_imgsz_input = QtWidgets.QSpinBox()
+        self.detector_imgsz_input.setRange(160, 1920)
+        self.detector_imgsz_input.setSingleStep(32)
+        self.detector_imgsz_input.setToolTip(
+            "Длинная сторона входа YOLO (кратно 32). Меньше — быстрее, но мелкие номера теряются"
+        )
+        detection_form.addRow("Размер входа детектора:", self.detector_imgsz_input)
+
+        self.detector_rect_input = QtWidgets.QCheckBox("Прямоугольный вход по пропорциям области")
+        self.detector_rect_input.setToolTip("Широкая область не дополняется до квадрата, меньше лишних пикселей")
+        detection_form.addRow("", self.detector_rect_input)
+
+        self.detector_half_input = QtWidgets.QCheckBox("Половинное разрешение")
+        self.detector_half_input.setToolTip(
+            "Кадр уменьшается вдвое перед детекцией — для камер на въезде с крупными номерами"
+        )
+        detection_form.addRow("", self.detector_half_input)
         form_container.addWidget(detection_box)
 
         recognition_box = QtWidgets.QGroupBox("Распознавание и трекинг")
         recognition_form = QtWidgets.QFormLayout(recognition_box)
+        self.tracker_input = QtWidgets.QComboBox()
+        self.tracker_input.addItem("Встроенный (ByteTrack)", "builtin")
+        self.tracker_input.addItem("Ultralytics", "ultralytics")
+        self.tracker_input.setToolTip(
+            "Встроенный трекер работает на NumPy поверх детекций и не зависит от состояния модели"
+        )
+        recognition_form.addRow("Трекер:", self.tracker_input)
+
         self.best_shots_input = QtWidgets.QSpinBox()
         self.best_shots_input.setRange(1, 50)
         self.best_shots_input.setToolTip("Количество бестшотов, участвующих в консенсусе трека")
@@ -573,6 +1090,41 @@ class MainWindow(QtWidgets.QMainWindow):
             "Минимальная уверенность OCR (0-1) для приема результата; ниже — помечается как нечитаемое"
         )
         recognition_form.addRow("Мин. уверенность OCR:", self.min_conf_input)
+
+        self.consensus_threshold_input = QtWidgets.QDoubleSpinBox()
+        self.consensus_threshold_input.setRange(0.5, 1.0)
+        self.consensus_threshold_input.setSingleStep(0.01)
+        self.consensus_threshold_input.setDecimals(2)
+        self.consensus_threshold_input.setToolTip(
+            "Апостериорная вероятность посимвольного консенсуса, при которой номер фиксируется "
+            "досрочно, не дожидаясь всех бестшотов (1.0 — только по кворуму)"
+        )
+        recognition_form.addRow("Порог консенсуса:", self.consensus_threshold_input)
+
+        self.ocr_top_k_input = QtWidgets.QSpinBox()
+        self.ocr_top_k_input.setRange(0, 50)
+        self.ocr_top_k_input.setToolTip(
+            "Сколько лучших по качеству кропов трека отправлять в OCR (0 — распознавать каждый кадр)"
+        )
+        recognition_form.addRow("OCR на лучших кропах:", self.ocr_top_k_input)
+
+        self.min_quality_input = QtWidgets.QDoubleSpinBox()
+        self.min_quality_input.setRange(0.0, 1.0)
+        self.min_quality_input.setSingleStep(0.05)
+        self.min_quality_input.setDecimals(2)
+        self.min_quality_input.setToolTip(
+            "Минимальная оценка качества кропа (размер, резкость, уверенность детектора, пропорции)"
+        )
+        recognition_form.addRow("Мин. качество кропа:", self.min_quality_input)
+
+        self.reverify_input = QtWidgets.QDoubleSpinBox()
+        self.reverify_input.setRange(0.0, 600.0)
+        self.reverify_input.setSingleStep(1.0)
+        self.reverify_input.setDecimals(1)
+        self.reverify_input.setToolTip(
+            "Как часто перепроверять номер у трека с зафиксированным консенсусом (0 — не перепроверять)"
+        )
+        recognition_form.addRow("Перепроверка трека (сек):", self.reverify_input)
         form_container.addWidget(recognition_box)
 
         save_btn = QtWidgets.QPushButton("Сохранить")
@@ -600,16 +1152,31 @@ class MainWindow(QtWidgets.QMainWindow):
             self.best_shots_input.setValue(int(channel.get("best_shots", 3)))
             self.cooldown_input.setValue(int(channel.get("cooldown_seconds", 5)))
             self.min_conf_input.setValue(float(channel.get("ocr_min_confidence", 0.6)))
+            self.consensus_threshold_input.setValue(float(channel.get("consensus_threshold", 0.9)))
+            self.ocr_top_k_input.setValue(int(channel.get("ocr_top_k", 5)))
+            self.min_quality_input.setValue(float(channel.get("min_plate_quality", 0.3)))
+            self.reverify_input.setValue(float(channel.get("ocr_reverify_seconds", 0.0)))
 
             mode = channel.get("detection_mode", "continuous")
             mode_index = max(0, self.detection_mode_input.findData(mode))
             self.detection_mode_input.setCurrentIndex(mode_index)
+            tracker_index = max(0, self.tracker_input.findData(channel.get("tracker", "builtin")))
+            self.tracker_input.setCurrentIndex(tracker_index)
+            decode_index = max(0, self.decode_backend_input.findData(channel.get("decode_backend", "auto")))
+            self.decode_backend_input.setCurrentIndex(decode_index)
+            self.decode_threads_input.setValue(int(channel.get("decode_threads", 0)))
+            self.decode_width_input.setValue(int(channel.get("decode_width", 0)))
+            self.decode_hw_input.setChecked(bool(channel.get("decode_hw_accel", False)))
+            self.decode_keyframes_input.setChecked(bool(channel.get("decode_keyframes_only", False)))
 
             self.motion_threshold_input.setValue(float(channel.get("motion_threshold", 0.01)))
             self.motion_min_threshold_input.setValue(float(channel.get("motion_min_threshold", 0.003)))
             self.motion_scale_input.setValue(float(channel.get("motion_adaptive_scale", 3.0)))
             self.motion_hold_input.setValue(float(channel.get("motion_hold_seconds", 2.5)))
             self.motion_noise_ema_input.setValue(float(channel.get("motion_noise_ema", 0.1)))
+            self.detector_imgsz_input.setValue(int(channel.get("detector_imgsz", 640)))
+            self.detector_rect_input.setChecked(bool(channel.get("detector_rect", True)))
+            self.detector_half_input.setChecked(bool(channel.get("detector_half_resolution", False)))
 
             region = channel.get("region", {})
             self.roi_x_input.setValue(int(region.get("x", 0)))
@@ -660,12 +1227,27 @@ class MainWindow(QtWidgets.QMainWindow):
             channels[index]["best_shots"] = int(self.best_shots_input.value())
             channels[index]["cooldown_seconds"] = int(self.cooldown_input.value())
             channels[index]["ocr_min_confidence"] = float(self.min_conf_input.value())
+            channels[index]["consensus_threshold"] = float(self.consensus_threshold_input.value())
+            channels[index]["ocr_top_k"] = int(self.ocr_top_k_input.value())
+            channels[index]["min_plate_quality"] = float(self.min_quality_input.value())
+            channels[index]["ocr_reverify_seconds"] = float(self.reverify_input.value())
             channels[index]["detection_mode"] = self.detection_mode_input.currentData()
+            channels[index]["tracker"] = self.tracker_input.currentData()
+            channels[index]["decode_backend"] = self.decode_backend_input.currentData()
+            channels[index]["decode_threads"] = int(self.decode_threads_input.value())
+            channels[index]["decode_width"] = int(self.decode_width_input.value())
+            channels[index]["decode_hw_accel"] = self.decode_hw_input.isChecked()
+            channels[index]["decode_keyframes_only"] = self.decode_keyframes_input.isChecked()
             channels[index]["motion_threshold"] = float(self.motion_threshold_input.value())
             channels[index]["motion_min_threshold"] = float(self.motion_min_threshold_input.value())
             channels[index]["motion_adaptive_scale"] = float(self.motion_scale_input.value())
             channels[index]["motion_hold_seconds"] = float(self.motion_hold_input.value())
             channels[index]["motion_noise_ema"] = float(self.motion_noise_ema_input.value())
+            # Вход YOLO должен быть кратен шагу сети.
+            imgsz = int(self.detector_imgsz_input.value())
+            channels[index]["detector_imgsz"] = max(32, imgsz - imgsz % 32)
+            channels[index]["detector_rect"] = self.detector_rect_input.isChecked()
+            channels[index]["detector_half_resolution"] = self.detector_half_input.isChecked()
 
             region = {
                 "x": int(self.roi_x_input.value()),
@@ -715,7 +1297,7 @@ class MainWindow(QtWidgets.QMainWindow):
         if not source:
             self.preview.setPixmap(None)
             return
-        capture = cv2.VideoCapture(int(source) if source.isnumeric() else source)
+        capture = open_source(source, decode_options(channels[index]))
         ret, frame = capture.read()
         capture.release()
         if not ret or frame is None:
@@ -732,4 +1314,11 @@ class MainWindow(QtWidgets.QMainWindow):
     # ------------------ Жизненный цикл ------------------
     def closeEvent(self, event: QtGui.QCloseEvent) -> None:  # noqa: N802
         self._stop_workers()
+        if self.snapshots is not None:
+            self.snapshots.close()
+        if self.watchlist is not None:
+            self.watchlist.stop()
+        if self.rollups is not None:
+            self.rollups.close()
+        self.settings.flush()
         event.accept()
@@ -0,0 +1,633 @@
+"""Цикл обработки одного канала без зависимостей от Qt.
+
+``ChannelRunner`` захватывает кадры, запускает детектор, трекер и ANPR-пайплайн и сообщает о
+результатах через обычные callback-функции. Его используют как GUI-поток ``ChannelWorker``,
+так и headless-режим (``anpr.headless``), где превью не строится вовсе.
+
+``detector`` (torch, ultralytics) импортируется только при сборке пайплайна, чтобы импорт
+UI не тянул тяжелые зависимости.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from clips import ClipRecorder
+from correlator import Correlator
+from logging_manager import RateLimiter, get_logger
+from metrics import REGISTRY, ChannelStats
+from model_pool import MODEL_POOL
+from rollups import RollupStore
+from snapshots import SnapshotStore
+from storage import AsyncEventDatabase
+from tracker import ByteTracker
+from video_sources import decode_options, open_source
+from watchlist import Watchlist
+
+if TYPE_CHECKING:
+    from detector import ANPR_Pipeline, CRNNRecognizer, YOLODetector
+
+logger = get_logger(__name__)
+
+FrameCallback = Callable[[str, np.ndarray, list], None]
+EventCallback = Callable[[Dict[str, Any]], None]
+AlertCallback = Callable[[Dict[str, Any]], None]
+PassageCallback = Callable[[Dict[str, Any]], None]
+StatusCallback = Callable[[str, str], None]
+StatsCallback = Callable[[str, Dict[str, Any]], None]
+
+
+def region_rect(frame_shape: Tuple[int, ...], region: Dict[str, Any]) -> Tuple[int, int, int, int]:
+    """Прямоугольник области распознавания (проценты ``region`` канала) в пикселях кадра."""
+    height, width = frame_shape[:2]
+    x_pct = max(0, min(100, int(region.get("x", 0))))
+    y_pct = max(0, min(100, int(region.get("y", 0))))
+    w_pct = max(1, min(100, int(region.get("width", 100))))
+    h_pct = max(1, min(100, int(region.get("height", 100))))
+
+    x2_pct = min(100, x_pct + w_pct)
+    y2_pct = min(100, y_pct + h_pct)
+
+    x1 = int(width * x_pct / 100)
+    y1 = int(height * y_pct / 100)
+    x2 = max(x1 + 1, int(width * x2_pct / 100))
+    y2 = max(y1 + 1, int(height * y2_pct / 100))
+    return x1, y1, x2, y2
+
+
+def extract_region(frame: cv2.Mat, region: Dict[str, Any]) -> Tuple[cv2.Mat, Tuple[int, int, int, int]]:
+    """Вырезает область распознавания; возвращает кроп и его прямоугольник в кадре."""
+    x1, y1, x2, y2 = region_rect(frame.shape, region)
+    return frame[y1:y2, x1:x2], (x1, y1, x2, y2)
+
+
+def offset_detections(detections: list[dict], roi_rect: Tuple[int, int, int, int]) -> list[dict]:
+    """Переводит рамки детекций из координат области в координаты всего кадра."""
+    x1, y1, _, _ = roi_rect
+    adjusted: list[dict] = []
+    for det in detections:
+        box = det.get("bbox")
+        if not box:
+            continue
+        det_copy = det.copy()
+        det_copy["bbox"] = [int(box[0] + x1), int(box[1] + y1), int(box[2] + x1), int(box[3] + y1)]
+        adjusted.append(det_copy)
+    return adjusted
+
+
+class ChannelRunner:
+    """Захват кадров и ANPR-пайплайн одного канала на asyncio.
+
+    Все callback-функции необязательны и вызываются из потока, в котором крутится цикл.
+    Если ``on_frame`` не задан, кадр не передается наружу и не тратит время на превью.
+    """
+
+    # Как часто (сек) отправлять снимок метрик в on_stats.
+    STATS_INTERVAL = 1.0
+    # Пауза между попытками переподключения живого источника: удваивается до максимума.
+    RECONNECT_INITIAL_DELAY = 1.0
+    RECONNECT_MAX_DELAY = 30.0
+    # Ключи настроек, смена которых требует переоткрыть источник или пересоздать детектор.
+    # Остальные параметры (ROI, пороги, движение) применяются к работающему пайплайну на лету.
+    SOURCE_KEYS = frozenset(
+        {"source", "decode_backend", "decode_threads", "decode_hw_accel", "decode_width", "decode_keyframes_only"}
+    )
+    DETECTOR_KEYS = frozenset({"detector_imgsz", "detector_rect", "detector_half_resolution"})
+    MOTION_KEYS = frozenset({"region", "detection_mode"})
+
+    def __init__(
+        self,
+        channel_conf: Dict,
+        db_path: str,
+        on_frame: Optional[FrameCallback] = None,
+        on_event: Optional[EventCallback] = None,
+        on_status: Optional[StatusCallback] = None,
+        on_stats: Optional[StatsCallback] = None,
+        snapshots: Optional[SnapshotStore] = None,
+        clip_config: Optional[Dict] = None,
+        watchlist: Optional[Watchlist] = None,
+        on_alert: Optional[AlertCallback] = None,
+        correlator: Optional[Correlator] = None,
+        on_passage: Optional[PassageCallback] = None,
+        rollups: Optional[RollupStore] = None,
+    ) -> None:
+        self.db_path = db_path
+        # Общее для каналов хранилище снимков событий; None — снимки не сохраняются.
+        self.snapshots = snapshots
+        # Раздел настроек clips: буфер фрагментов создается на время работы канала.
+        self.clip_config = clip_config
+        self._clips: Optional[ClipRecorder] = None
+        # Общий список розыска: каждое событие проверяется по нему в памяти.
+        self.watchlist = watchlist
+        self.on_alert = on_alert
+        # Общий для каналов коррелятор проездов между парами камер.
+        self.correlator = correlator
+        self.on_passage = on_passage
+        # Агрегаты статистики: события берутся из БД, нечитаемые треки сообщает канал.
+        self.rollups = rollups
+        self.on_frame = on_frame
+        self.on_event = on_event
+        self.on_status = on_status
+        self.on_stats = on_stats
+        self._running = True
+        self.name = channel_conf.get("name", "Канал")
+        self._load_conf(channel_conf)
+        # Состояние трекера принадлежит каналу, а не модели; создается вместе с пайплайном.
+        self._tracker: Optional[ByteTracker] = None
+        self._prev_motion_frame: Optional[cv2.Mat] = None
+        self._noise_floor = 0.0
+        self._last_motion_ts: Optional[float] = None
+        self._capture: Optional[cv2.VideoCapture] = None
+        # Источник и его позиция (CAP_PROP_POS_FRAMES) после прошлого чтения.
+        self._last_position: Tuple[Any, float] = (None, 0.0)
+        # Новая конфигурация из UI-потока; забирается циклом канала между кадрами.
+        self._pending_conf: Optional[Dict] = None
+        self._conf_lock = threading.Lock()
+        # Частые отладочные сообщения канала (нечитаемые номера) пишутся не чаще раза в интервал.
+        self._log_limiter = RateLimiter()
+        self.stats = ChannelStats(self.name)
+        # Модели загружены, источник открыт: дальше идет обработка кадров.
+        self.ready = threading.Event()
+
+    def _load_conf(self, channel_conf: Dict) -> None:
+        self.channel_conf = channel_conf
+        self.best_shots = int(channel_conf.get("best_shots", 3))
+        self.cooldown_seconds = int(channel_conf.get("cooldown_seconds", 5))
+        self.min_confidence = float(channel_conf.get("ocr_min_confidence", 0.6))
+        self.consensus_threshold = float(channel_conf.get("consensus_threshold", 0.9))
+        self.ocr_top_k = int(channel_conf.get("ocr_top_k", 5))
+        self.min_plate_quality = float(channel_conf.get("min_plate_quality", 0.3))
+        self.ocr_reverify_seconds = float(channel_conf.get("ocr_reverify_seconds", 0.0))
+        self.detection_mode = channel_conf.get("detection_mode", "continuous")
+        self.tracker_type = channel_conf.get("tracker", "builtin")
+        self.detector_imgsz = int(channel_conf.get("detector_imgsz", 640))
+        self.detector_rect = bool(channel_conf.get("detector_rect", True))
+        self.detector_half_resolution = bool(channel_conf.get("detector_half_resolution", False))
+        self.decode = decode_options(channel_conf)
+        self.motion_threshold = float(channel_conf.get("motion_threshold", 0.01))
+        self.motion_min_threshold = float(channel_conf.get("motion_min_threshold", 0.003))
+        self.motion_adaptive_scale = float(channel_conf.get("motion_adaptive_scale", 3.0))
+        self.motion_hold_seconds = float(channel_conf.get("motion_hold_seconds", 2.5))
+        self.motion_noise_ema = float(channel_conf.get("motion_noise_ema", 0.1))
+
+    def _status(self, status: str) -> None:
+        if self.on_status is not None:
+            self.on_status(self.name, status)
+
+    def _open_capture(self, source: str) -> Optional[cv2.VideoCapture]:
+        capture = open_source(source, self.decode)
+        if not capture.isOpened():
+            return None
+        return capture
+
+    def _read_frame(self, capture: cv2.VideoCapture) -> Tuple[bool, Optional[np.ndarray]]:
+        """Читает кадр и учитывает процессорное время декодирования (без ожидания сети).
+
+        Учитывается только время потока канала: работа потоков декодера FFmpeg
+        (``decode_threads``) в стадию ``decode`` не попадает. Скачок позиции источника больше
+        чем на кадр учитывается как кадры, пропущенные источником (``frames_lost``).
+        """
+        cpu_started = time.thread_time()
+        ret, frame = capture.read()
+        if ret:
+            self.stats.observe("decode", time.thread_time() - cpu_started)
+            position = capture.get(cv2.CAP_PROP_POS_FRAMES)
+            last_capture, last_position = self._last_position
+            if last_capture is capture and position > last_position + 1:
+                self.stats.frames_lost += int(position - last_position - 1)
+            self._last_position = (capture, position)
+        return ret, frame
+
+    @staticmethod
+    def _is_live_source(source: str) -> bool:
+        return source.isnumeric() or "://" in source
+
+    def _build_pipeline(self) -> Tuple["ANPR_Pipeline", "YOLODetector"]:
+        from detector import Config as ModelConfig
+
+        self._tracker = ByteTracker(high_threshold=ModelConfig.DETECTION_CONFIDENCE_THRESHOLD)
+        detector = MODEL_POOL.detector(
+            imgsz=self.detector_imgsz, rect=self.detector_rect, half_resolution=self.detector_half_resolution
+        )
+        return self.create_pipeline(MODEL_POOL.recognizer()), detector
+
+    def create_pipeline(self, recognizer: "CRNNRecognizer") -> "ANPR_Pipeline":
+        """ANPR-пайплайн с параметрами канала (используется и пакетной обработкой архива)."""
+        from detector import ANPR_Pipeline
+
+        return ANPR_Pipeline(
+            recognizer,
+            self.best_shots,
+            self.cooldown_seconds,
+            min_confidence=self.min_confidence,
+            stats=self.stats,
+            consensus_threshold=self.consensus_threshold,
+            ocr_top_k=self.ocr_top_k,
+            min_plate_quality=self.min_plate_quality,
+            reverify_seconds=self.ocr_reverify_seconds,
+        )
+
+    def _motion_detected(self, roi_frame: cv2.Mat) -> bool:
+        if self.detection_mode != "motion":
+            return True
+
+        if roi_frame.size == 0:
+            return False
+
+        gray = cv2.cvtColor(roi_frame, cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (5, 5), 0)
+
+        if self._prev_motion_frame is None:
+            self._prev_motion_frame = gray
+            return False
+
+        frame_delta = cv2.absdiff(self._prev_motion_frame, gray)
+        self._prev_motion_frame = gray
+
+        _, thresh = cv2.threshold(frame_delta, 25, 255, cv2.THRESH_BINARY)
+        motion_ratio = cv2.countNonZero(thresh) / float(gray.size)
+
+        self._noise_floor = (1 - self.motion_noise_ema) * self._noise_floor + self.motion_noise_ema * motion_ratio
+        adaptive_threshold = max(
+            self.motion_min_threshold,
+            self.motion_threshold,
+            self._noise_floor * self.motion_adaptive_scale,
+        )
+        return motion_ratio > adaptive_threshold
+
+    def _track(self, detector: "YOLODetector", roi_frame: cv2.Mat) -> list[dict]:
+        if self.tracker_type == "ultralytics":
+            return detector.track(roi_frame)
+        return self._tracker.update(detector.detect(roi_frame, min_confidence=self._tracker.low_threshold))
+
+    async def _process_events(
+        self, storage: AsyncEventDatabase, source: str, results: list[dict], channel_name: str, frame: np.ndarray
+    ) -> None:
+        for res in results:
+            if res.get("unreadable"):
+                if logger.isEnabledFor(logging.DEBUG):
+                    suppressed = self._log_limiter.allow("unreadable")
+                    if suppressed is not None:
+                        logger.debug(
+                            "Канал %s: номер помечен как нечитаемый (confidence=%.2f, еще %d с прошлого сообщения)",
+                            channel_name,
+                            res.get("confidence", 0.0),
+                            suppressed,
+                        )
+                continue
+            if res.get("text"):
+                event = {
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "channel": channel_name,
+                    "plate": res.get("text", ""),
+                    "confidence": res.get("confidence", 0.0),
+                    "source": source,
+                }
+                started = time.perf_counter()
+                event["id"] = await storage.insert_event_async(
+                    channel=event["channel"],
+                    plate=event["plate"],
+                    confidence=event["confidence"],
+                    source=event["source"],
+                    timestamp=event["timestamp"],
+                )
+                self.stats.observe("db", time.perf_counter() - started)
+                self.stats.events += 1
+                if self.snapshots is not None:
+                    # Только копия кадра и постановка в очередь: кодирование и запись идут в пуле.
+                    self.snapshots.submit(event["id"], frame, res.get("bbox"), event["timestamp"])
+                if self._clips is not None:
+                    self._clips.trigger(event["id"], time.monotonic(), event["timestamp"])
+                if self.on_event is not None:
+                    self.on_event(event)
+                if self.watchlist is not None:
+                    await self._check_watchlist(storage, event)
+                if self.correlator is not None:
+                    await self._correlate(storage, event)
+                logger.info(
+                    "Канал %s: зафиксирован номер %s (conf=%.2f, track=%s)",
+                    event["channel"],
+                    event["plate"],
+                    event["confidence"],
+                    res.get("track_id", "-"),
+                )
+
+    async def _check_watchlist(self, storage: AsyncEventDatabase, event: Dict[str, Any]) -> None:
+        match = self.watchlist.match(event["plate"])
+        if match is None:
+            return
+        alert = dict(
+            event,
+            event_id=event["id"],
+            listed_plate=match.entry.plate,
+            match_kind=match.kind,
+            note=match.entry.note,
+        )
+        alert["id"] = await storage.insert_alert_async(
+            event_id=alert["event_id"],
+            timestamp=alert["timestamp"],
+            channel=alert["channel"],
+            plate=alert["plate"],
+            listed_plate=alert["listed_plate"],
+            match_kind=alert["match_kind"],
+            note=alert["note"],
+        )
+        if self.on_alert is not None:
+            self.on_alert(alert)
+        logger.warning(
+            "Канал %s: номер %s из списка розыска (%s, совпадение: %s) %s",
+            alert["channel"],
+            alert["plate"],
+            alert["listed_plate"],
+            alert["match_kind"],
+            alert["note"],
+        )
+
+    async def _correlate(self, storage: AsyncEventDatabase, event: Dict[str, Any]) -> None:
+        for passage in self.correlator.observe(event):
+            record = passage.to_dict()
+            record["id"] = await storage.insert_passage_async(**record)
+            if self.on_passage is not None:
+                self.on_passage(record)
+            logger.info(
+                "Пара %s: номер %s, проезд %.1f с (%s → %s)",
+                passage.pair,
+                passage.plate,
+                passage.duration_seconds,
+                passage.started_at,
+                passage.finished_at,
+            )
+
+    async def run(self) -> None:
+        # Источник открывается параллельно с загрузкой моделей.
+        build_task = asyncio.ensure_future(asyncio.to_thread(self._build_pipeline))
+        storage = AsyncEventDatabase(self.db_path)
+
+        source = str(self.channel_conf.get("source", "0"))
+        capture = await asyncio.to_thread(self._open_capture, source)
+        if capture is None:
+            self._status("Нет сигнала")
+            logger.warning("Не удалось открыть источник %s для канала %s", source, self.channel_conf)
+            if self._is_live_source(source):
+                # Камера может появиться позже: ждем ее, пока модели грузятся.
+                self.stats.begin_outage(time.monotonic())
+                capture = await self._reconnect(source)
+            if capture is None:
+                build_task.cancel()
+                return
+
+        channel_name = self.name
+        if not build_task.done() and self.on_frame is not None and self._is_live_source(source):
+            # Живой поток показываем сразу, не дожидаясь моделей; кадры файла не пропускаем.
+            self._status("Загрузка моделей")
+            await self._preview_until_ready(capture, build_task, channel_name)
+        try:
+            pipeline, detector = await build_task
+        except BaseException:
+            capture.release()
+            raise
+        if not self._running:
+            capture.release()
+            return
+
+        logger.info("Канал %s запущен (источник=%s)", channel_name, source)
+        REGISTRY.register_channel(channel_name, self.stats, pipeline=pipeline, database=storage)
+        self._capture = capture
+        self._clips = ClipRecorder.from_config(channel_name, self.clip_config, self.db_path)
+        self.ready.set()
+        try:
+            await self._capture_loop(pipeline, detector, storage, source, channel_name)
+        finally:
+            REGISTRY.unregister_channel(channel_name, self.stats)
+            if self._capture is not None:
+                self._capture.release()
+            if self._clips is not None:
+                # Начатый фрагмент дописывается из уже полученных кадров.
+                await asyncio.to_thread(self._clips.close)
+                self._clips = None
+
+    async def _reconnect(self, source: str) -> Optional[cv2.VideoCapture]:
+        """Переоткрывает живой источник с экспоненциальной паузой; None — канал остановлен.
+
+        Пайплайн и модели канала не пересоздаются, остальные каналы продолжают работу.
+        """
+        delay = self.RECONNECT_INITIAL_DELAY
+        attempt = 0
+        while self._running:
+            await self._sleep(delay)
+            if not self._running:
+                break
+            attempt += 1
+            self._status(f"Переподключение (попытка {attempt})")
+            if self.on_stats is not None:
+                self.on_stats(self.name, self.stats.snapshot())
+            capture = await asyncio.to_thread(self._open_capture, source)
+            if capture is not None:
+                self.stats.end_outage(time.monotonic())
+                # Фон детектора движения строится заново по кадрам после обрыва.
+                self._prev_motion_frame = None
+                self._status("Поток восстановлен")
+                logger.info(
+                    "Канал %s: источник переподключен за %.1f с (попытка %d)",
+                    self.name,
+                    self.stats.last_reconnect_seconds,
+                    attempt,
+                )
+                return capture
+            delay = min(delay * 2, self.RECONNECT_MAX_DELAY)
+        return None
+
+    async def _apply_pending_conf(
+        self, pipeline: "ANPR_Pipeline", detector: "YOLODetector", source: str
+    ) -> Tuple["YOLODetector", str]:
+        """Применяет конфигурацию из ``update_config`` между кадрами; возвращает детектор и источник.
+
+        Пересоздается только то, что затронуто изменением: пороги и ROI меняются в работающем
+        пайплайне, детектор загружается заново при смене входа YOLO, источник переоткрывается
+        при смене адреса или параметров декодирования. Если новый источник не открылся,
+        ``self._capture`` остается None (для живого источника — после попыток переподключения).
+        """
+        with self._conf_lock:
+            conf, self._pending_conf = self._pending_conf, None
+        changed = {key for key in set(conf) | set(self.channel_conf) if conf.get(key) != self.channel_conf.get(key)}
+        if not changed:
+            return detector, source
+        self._load_conf(conf)
+        pipeline.configure(
+            self.best_shots,
+            self.cooldown_seconds,
+            min_confidence=self.min_confidence,
+            consensus_threshold=self.consensus_threshold,
+            ocr_top_k=self.ocr_top_k,
+            min_plate_quality=self.min_plate_quality,
+            reverify_seconds=self.ocr_reverify_seconds,
+        )
+        if changed & self.MOTION_KEYS:
+            # Кадры прежней области не годятся как фон для детектора движения.
+            self._prev_motion_frame = None
+            self._noise_floor = 0.0
+        if changed & self.DETECTOR_KEYS:
+            detector = await asyncio.to_thread(
+                MODEL_POOL.detector,
+                imgsz=self.detector_imgsz,
+                rect=self.detector_rect,
+                half_resolution=self.detector_half_resolution,
+            )
+        if "tracker" in changed or changed & (self.MOTION_KEYS | self.SOURCE_KEYS):
+            # Боксы и фильтры Калмана трекера заданы в координатах прежней области и источника.
+            self._reset_tracking(pipeline)
+        if changed & self.SOURCE_KEYS:
+            source = str(conf.get("source", "0"))
+            self._capture.release()
+            self._prev_motion_frame = None
+            self._capture = await asyncio.to_thread(self._open_capture, source)
+            if self._capture is None:
+                self._status("Нет сигнала")
+                logger.warning("Канал %s: не удалось открыть новый источник %s", self.name, source)
+                if self._is_live_source(source):
+                    self.stats.begin_outage(time.monotonic())
+                    self._capture = await self._reconnect(source)
+        logger.info("Канал %s: применены новые настройки (%s)", self.name, ", ".join(sorted(changed)))
+        return detector, source
+
+    def _reset_tracking(self, pipeline: "ANPR_Pipeline") -> None:
+        """Новый встроенный трекер и сброс треков пайплайна.
+
+        id нового трекера начинаются с 1, поэтому состояние треков пайплайна сбрасывается
+        вместе с ним: иначе новая машина унаследовала бы номер старого трека с тем же id.
+        """
+        if self._tracker is not None:
+            self._tracker = ByteTracker(high_threshold=self._tracker.high_threshold)
+        pipeline.reset_tracks()
+
+    async def _sleep(self, seconds: float) -> None:
+        """Пауза, которую прерывает stop()."""
+        deadline = time.monotonic() + seconds
+        while self._running and time.monotonic() < deadline:
+            await asyncio.sleep(min(0.2, deadline - time.monotonic()))
+
+    async def _preview_until_ready(
+        self, capture: cv2.VideoCapture, build_task: "asyncio.Future", channel_name: str
+    ) -> None:
+        while self._running and not build_task.done():
+            ret, frame = await asyncio.to_thread(self._read_frame, capture)
+            if not ret:
+                return
+            self.stats.mark_frame(time.monotonic())
+            self.on_frame(channel_name, frame, [])
+
+    async def _capture_loop(
+        self,
+        pipeline: "ANPR_Pipeline",
+        detector: "YOLODetector",
+        storage: AsyncEventDatabase,
+        source: str,
+        channel_name: str,
+    ) -> None:
+        waiting_for_motion = False
+        stats = self.stats
+        perf = time.perf_counter
+        last_stats_emit = 0.0
+        while self._running:
+            if self._pending_conf is not None:
+                detector, source = await self._apply_pending_conf(pipeline, detector, source)
+                if self._capture is None:
+                    break
+            read_started = perf()
+            ret, frame = await asyncio.to_thread(self._read_frame, self._capture)
+            read_finished = perf()
+            if not ret:
+                stats.read_failures += 1
+                if not self._is_live_source(source):
+                    self._status("Поток остановлен")
+                    logger.warning("Поток остановлен для канала %s", channel_name)
+                    break
+                logger.warning("Канал %s: обрыв потока, переподключение", channel_name)
+                stats.begin_outage(time.monotonic())
+                self._capture.release()
+                self._capture = await self._reconnect(source)
+                if self._capture is None:
+                    break
+                # После обрыва машины в кадре уже другие, а предсказания Калмана устарели:
+                # треки начинаются заново, как при смене источника.
+                self._reset_tracking(pipeline)
+                self._prev_motion_frame = None
+                continue
+            stats.observe("capture", read_finished - read_started)
+            now_ts = time.monotonic()
+            stats.mark_frame(now_ts)
+            if self._clips is not None:
+                self._clips.push(frame, now_ts)
+
+            results: list[dict] = []
+            roi_frame, roi_rect = extract_region(frame, self.channel_conf.get("region", {}))
+            roi_finished = perf()
+            stats.observe("roi", roi_finished - read_finished)
+            motion_detected = self._motion_detected(roi_frame)
+            stats.observe("motion", perf() - roi_finished)
+            if motion_detected:
+                self._last_motion_ts = now_ts
+
+            motion_active = motion_detected
+            if self.detection_mode == "motion" and not motion_active and self._last_motion_ts:
+                motion_active = (now_ts - self._last_motion_ts) < self.motion_hold_seconds
+
+            if not motion_active and self.detection_mode == "motion":
+                if not waiting_for_motion:
+                    self._status("Ожидание движения")
+                waiting_for_motion = True
+                stats.frames_skipped += 1
+            else:
+                if waiting_for_motion and motion_active:
+                    self._status("Движение обнаружено")
+                waiting_for_motion = False
+                detect_started = perf()
+                detections = await asyncio.to_thread(self._track, detector, roi_frame)
+                stats.observe("detect", perf() - detect_started)
+                detections = offset_detections(detections, roi_rect)
+                results = await asyncio.to_thread(pipeline.process_frame, frame, detections)
+                stats.frames_processed += 1
+                if self.rollups is not None:
+                    lost = pipeline.pop_unreadable_tracks()
+                    if lost:
+                        self.rollups.record_unreadable(channel_name, lost)
+                await self._process_events(storage, source, results, channel_name, frame)
+
+            if self.on_frame is not None:
+                preview_started = perf()
+                self.on_frame(channel_name, frame, results)
+                stats.observe("preview", perf() - preview_started)
+
+            if self.on_stats is not None and now_ts - last_stats_emit >= self.STATS_INTERVAL:
+                last_stats_emit = now_ts
+                self.on_stats(channel_name, stats.snapshot())
+
+    def run_blocking(self) -> None:
+        """Запускает цикл канала в текущем потоке со своим event loop."""
+        try:
+            asyncio.run(self.run())
+        except Exception as exc:  # noqa: BLE001
+            self._status(f"Ошибка: {exc}")
+            logger.exception("Канал %s аварийно остановлен", self.name)
+
+    def get_stats(self) -> Dict:
+        """Снимок метрик канала: FPS, счетчики кадров и перцентили задержек по стадиям."""
+        return self.stats.snapshot()
+
+    def update_config(self, channel_conf: Dict) -> None:
+        """Передает работающему каналу новую конфигурацию; безопасно вызывать из другого потока.
+
+        Изменения применяются перед следующим кадром без остановки канала. Имя канала
+        на лету не меняется: метрики и окна UI привязаны к нему, такой канал перезапускают.
+        """
+        with self._conf_lock:
+            self._pending_conf = dict(channel_conf)
+
+    def stop(self) -> None:
+        self._running = False
@@ -1,221 +1,89 @@
-import asyncio
-import time
-from datetime import datetime, timezone
-from typing import Dict, Optional, Tuple
+from typing import Dict, Optional
 
 import cv2
+import numpy as np
 from PyQt5 import QtCore, QtGui
 
-from detector import ANPR_Pipeline, CRNNRecognizer, YOLODetector, Config as ModelConfig
+from anpr.workers.channel_runner import ChannelRunner
+from correlator import Correlator
 from logging_manager import get_logger
-from storage import AsyncEventDatabase
+from rollups import RollupStore
+from snapshots import SnapshotStore
+from watchlist import Watchlist
 
 logger = get_logger(__name__)
 
 
 class ChannelWorker(QtCore.QThread):
-    """Background worker that captures frames, runs ANPR pipeline and emits UI events."""
+    """Background worker that runs a ChannelRunner and emits UI events as Qt signals."""
 
     frame_ready = QtCore.pyqtSignal(str, QtGui.QImage)
     event_ready = QtCore.pyqtSignal(dict)
+    alert_ready = QtCore.pyqtSignal(dict)
+    passage_ready = QtCore.pyqtSignal(dict)
     status_ready = QtCore.pyqtSignal(str, str)
-
-    def __init__(self, channel_conf: Dict, db_path: str, parent=None) -> None:
+    stats_ready = QtCore.pyqtSignal(str, dict)
+
+    STATS_INTERVAL = ChannelRunner.STATS_INTERVAL
+
+    def __init__(
+        self,
+        channel_conf: Dict,
+        db_path: str,
+        snapshots: Optional[SnapshotStore] = None,
+        clip_config: Optional[Dict] = None,
+        watchlist: Optional[Watchlist] = None,
+        correlator: Optional[Correlator] = None,
+        rollups: Optional[RollupStore] = None,
+        parent=None,
+    ) -> None:
         super().__init__(parent)
         self.channel_conf = channel_conf
         self.db_path = db_path
-        self._running = True
-        self.best_shots = int(channel_conf.get("best_shots", 3))
-        self.cooldown_seconds = int(channel_conf.get("cooldown_seconds", 5))
-        self.min_confidence = float(channel_conf.get("ocr_min_confidence", 0.6))
-        self.detection_mode = channel_conf.get("detection_mode", "continuous")
-        self.motion_threshold = float(channel_conf.get("motion_threshold", 0.01))
-        self.motion_min_threshold = float(channel_conf.get("motion_min_threshold", 0.003))
-        self.motion_adaptive_scale = float(channel_conf.get("motion_adaptive_scale", 3.0))
-        self.motion_hold_seconds = float(channel_conf.get("motion_hold_seconds", 2.5))
-        self.motion_noise_ema = float(channel_conf.get("motion_noise_ema", 0.1))
-        self._prev_motion_frame: Optional[cv2.Mat] = None
-        self._noise_floor = 0.0
-        self._last_motion_ts: Optional[float] = None
-
-    def _open_capture(self, source: str) -> Optional[cv2.VideoCapture]:
-        capture = cv2.VideoCapture(int(source) if source.isnumeric() else source)
-        if not capture.isOpened():
-            return None
-        return capture
-
-    def _build_pipeline(self) -> Tuple[ANPR_Pipeline, YOLODetector]:
-        detector = YOLODetector(ModelConfig.YOLO_MODEL_PATH, ModelConfig.DEVICE)
-        recognizer = CRNNRecognizer(ModelConfig.OCR_MODEL_PATH, ModelConfig.DEVICE)
-        return (
-            ANPR_Pipeline(
-                recognizer,
-                self.best_shots,
-                self.cooldown_seconds,
-                min_confidence=self.min_confidence,
-            ),
-            detector,
-        )
-
-    def _region_rect(self, frame_shape: Tuple[int, int, int]) -> Tuple[int, int, int, int]:
-        height, width, _ = frame_shape
-        region = self.channel_conf.get("region", {})
-        x_pct = max(0, min(100, int(region.get("x", 0))))
-        y_pct = max(0, min(100, int(region.get("y", 0))))
-        w_pct = max(1, min(100, int(region.get("width", 100))))
-        h_pct = max(1, min(100, int(region.get("height", 100))))
-
-        x2_pct = min(100, x_pct + w_pct)
-        y2_pct = min(100, y_pct + h_pct)
-
-        x1 = int(width * x_pct / 100)
-        y1 = int(height * y_pct / 100)
-        x2 = max(x1 + 1, int(width * x2_pct / 100))
-        y2 = max(y1 + 1, int(height * y2_pct / 100))
-        return x1, y1, x2, y2
-
-    def _extract_region(self, frame: cv2.Mat) -> Tuple[cv2.Mat, Tuple[int, int, int, int]]:
-        x1, y1, x2, y2 = self._region_rect(frame.shape)
-        return frame[y1:y2, x1:x2], (x1, y1, x2, y2)
-
-    def _motion_detected(self, roi_frame: cv2.Mat) -> bool:
-        if self.detection_mode != "motion":
-            return True
-
-        if roi_frame.size == 0:
-            return False
-
-        gray = cv2.cvtColor(roi_frame, cv2.COLOR_BGR2GRAY)
-        gray = cv2.GaussianBlur(gray, (5, 5), 0)
-
-        if self._prev_motion_frame is None:
-            self._prev_motion_frame = gray
-            return False
-
-        frame_delta = cv2.absdiff(self._prev_motion_frame, gray)
-        self._prev_motion_frame = gray
-
-        _, thresh = cv2.threshold(frame_delta, 25, 255, cv2.THRESH_BINARY)
-        motion_ratio = cv2.countNonZero(thresh) / float(gray.size)
-
-        self._noise_floor = (1 - self.motion_noise_ema) * self._noise_floor + self.motion_noise_ema * motion_ratio
-        adaptive_threshold = max(
-            self.motion_min_threshold,
-            self.motion_threshold,
-            self._noise_floor * self.motion_adaptive_scale,
+        self.runner = ChannelRunner(
+            channel_conf,
+            db_path,
+            on_frame=self._emit_frame,
+            on_event=self.event_ready.emit,
+            on_status=self.status_ready.emit,
+            on_stats=self.stats_ready.emit,
+            snapshots=snapshots,
+            clip_config=clip_config,
+            watchlist=watchlist,
+            on_alert=self.alert_ready.emit,
+            correlator=correlator,
+            on_passage=self.passage_ready.emit,
+            rollups=rollups,
         )
-        return motion_ratio > adaptive_threshold
-
-    @staticmethod
-    def _offset_detections(detections: list[dict], roi_rect: Tuple[int, int, int, int]) -> list[dict]:
-        x1, y1, _, _ = roi_rect
-        adjusted: list[dict] = []
-        for det in detections:
-            box = det.get("bbox")
-            if not box:
-                continue
-            det_copy = det.copy()
-            det_copy["bbox"] = [int(box[0] + x1), int(box[1] + y1), int(box[2] + x1), int(box[3] + y1)]
-            adjusted.append(det_copy)
-        return adjusted
-
-    async def _process_events(
-        self, storage: AsyncEventDatabase, source: str, results: list[dict], channel_name: str
-    ) -> None:
-        for res in results:
-            if res.get("unreadable"):
-                logger.debug(
-                    "Канал %s: номер помечен как нечитаемый (confidence=%.2f)",
-                    channel_name,
-                    res.get("confidence", 0.0),
-                )
-                continue
-            if res.get("text"):
-                event = {
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                    "channel": channel_name,
-                    "plate": res.get("text", ""),
-                    "confidence": res.get("confidence", 0.0),
-                    "source": source,
-                }
-                event["id"] = await storage.insert_event_async(
-                    channel=event["channel"],
-                    plate=event["plate"],
-                    confidence=event["confidence"],
-                    source=event["source"],
-                    timestamp=event["timestamp"],
-                )
-                self.event_ready.emit(event)
-                logger.info(
-                    "Канал %s: зафиксирован номер %s (conf=%.2f, track=%s)",
-                    event["channel"],
-                    event["plate"],
-                    event["confidence"],
-                    res.get("track_id", "-"),
-                )
-
-    async def _loop(self) -> None:
-        pipeline, detector = await asyncio.to_thread(self._build_pipeline)
-        storage = AsyncEventDatabase(self.db_path)
-
-        source = str(self.channel_conf.get("source", "0"))
-        capture = await asyncio.to_thread(self._open_capture, source)
-        if capture is None:
-            self.status_ready.emit(self.channel_conf.get("name", "Канал"), "Нет сигнала")
-            logger.warning("Не удалось открыть источник %s для канала %s", source, self.channel_conf)
-            return
+        self.stats = self.runner.stats
+
+    def _emit_frame(self, channel_name: str, frame: np.ndarray, results: list) -> None:
+        if results:
+            from detector import Visualizer
+
+            # Зафиксированный по треку номер (locked_text) остается на рамке и после остановки OCR.
+            Visualizer.draw_results(frame, results)
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        height, width, channel = rgb_frame.shape
+        bytes_per_line = 3 * width
+        # Копируем буфер, чтобы предотвратить обращение Qt к уже освобожденной памяти
+        # во время перерисовок окна.
+        q_image = QtGui.QImage(
+            rgb_frame.data, width, height, bytes_per_line, QtGui.QImage.Format_RGB888
+        ).copy()
+        self.frame_ready.emit(channel_name, q_image)
 
-        channel_name = self.channel_conf.get("name", "Канал")
-        logger.info("Канал %s запущен (источник=%s)", channel_name, source)
-        waiting_for_motion = False
-        while self._running:
-            ret, frame = await asyncio.to_thread(capture.read)
-            if not ret:
-                self.status_ready.emit(channel_name, "Поток остановлен")
-                logger.warning("Поток остановлен для канала %s", channel_name)
-                break
-
-            roi_frame, roi_rect = self._extract_region(frame)
-            motion_detected = self._motion_detected(roi_frame)
-            now_ts = time.monotonic()
-            if motion_detected:
-                self._last_motion_ts = now_ts
-
-            motion_active = motion_detected
-            if self.detection_mode == "motion" and not motion_active and self._last_motion_ts:
-                motion_active = (now_ts - self._last_motion_ts) < self.motion_hold_seconds
-
-            if not motion_active and self.detection_mode == "motion":
-                if not waiting_for_motion:
-                    self.status_ready.emit(channel_name, "Ожидание движения")
-                waiting_for_motion = True
-            else:
-                if waiting_for_motion and motion_active:
-                    self.status_ready.emit(channel_name, "Движение обнаружено")
-                waiting_for_motion = False
-                detections = await asyncio.to_thread(detector.track, roi_frame)
-                detections = self._offset_detections(detections, roi_rect)
-                results = await asyncio.to_thread(pipeline.process_frame, frame, detections)
-                await self._process_events(storage, source, results, channel_name)
-
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            height, width, channel = rgb_frame.shape
-            bytes_per_line = 3 * width
-            # Копируем буфер, чтобы предотвратить обращение Qt к уже освобожденной памяти
-            # во время перерисовок окна.
-            q_image = QtGui.QImage(
-                rgb_frame.data, width, height, bytes_per_line, QtGui.QImage.Format_RGB888
-            ).copy()
-            self.frame_ready.emit(channel_name, q_image)
+    def run(self) -> None:
+        self.runner.run_blocking()
 
-        capture.release()
+    def get_stats(self) -> Dict:
+        """Снимок метрик канала: FPS, счетчики кадров и перцентили задержек по стадиям."""
+        return self.runner.get_stats()
 
-    def run(self) -> None:
-        try:
-            asyncio.run(self._loop())
-        except Exception as exc:  # noqa: BLE001
-            self.status_ready.emit(self.channel_conf.get("name", "Канал"), f"Ошибка: {exc}")
-            logger.exception("Канал %s аварийно остановлен", self.channel_conf.get("name", "Канал"))
+    def update_config(self, channel_conf: Dict) -> None:
+        """Применяет измененные настройки к работающему каналу без перезапуска потока."""
+        self.channel_conf = channel_conf
+        self.runner.update_config(channel_conf)
 
     def stop(self) -> None:
-        self._running = False
+        self.runner.stop()
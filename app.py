@@ -1,10 +1,9 @@
 import sys
 import warnings
 
-from PyQt5 import QtWidgets
-
-from anpr.ui.main_window import MainWindow
 from logging_manager import LoggingManager, get_logger
+from metrics import start_exporter
+from model_pool import MODEL_POOL
 from settings_manager import SettingsManager
 
 # Silence noisy quantization warnings emitted by torch on repeated startups.
@@ -25,13 +24,33 @@ logger = get_logger(__name__)
 def main() -> None:
     """Entrypoint that wires settings, logging and the main window."""
 
+    if "--headless" in sys.argv[1:]:
+        # PyQt в headless-режиме не импортируется вовсе.
+        from anpr.headless import main as headless_main
+
+        headless_main(sys.argv[1:])
+        return
+    if "--batch" in sys.argv[1:]:
+        from anpr.batch import main as batch_main
+
+        batch_main(sys.argv[1:])
+        return
+
+    from PyQt5 import QtWidgets
+
+    from anpr.ui.main_window import MainWindow
+
     settings = SettingsManager()
     LoggingManager(settings.get_logging_config())
     logger.info("Запуск ANPR Desktop")
+    start_exporter(settings.get_metrics_config())
+    MODEL_POOL.configure(settings.get_inference_config())
 
     app = QtWidgets.QApplication(sys.argv)
     window = MainWindow(settings)
     window.show()
+    # Модели грузятся в фоне, пока пользователь видит окно.
+    MODEL_POOL.warmup_async()
     sys.exit(app.exec_())
 
 
@@ -0,0 +1,223 @@
+"""Бэкенды инференса YOLO и CRNN: PyTorch, ONNX Runtime и OpenVINO (CPU).
+
+YOLO экспортируется и загружается средствами ultralytics (``YOLO("best.onnx")`` сам
+использует ONNX Runtime, каталог ``best_openvino_model`` — OpenVINO). Для CRNN квантованная
+модель экспортируется в ONNX один раз, а ``CrnnBackend`` скрывает, чем она исполняется.
+Зависимости ``onnxruntime`` и ``openvino`` необязательны: при их отсутствии или без
+экспортированных файлов используется PyTorch.
+
+Экспорт из корня репозитория::
+
+    python -m backends --backend onnxruntime
+    python -m backends --backend openvino
+"""
+
+import abc
+import argparse
+import os
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from logging_manager import get_logger
+
+if TYPE_CHECKING:
+    import torch
+
+logger = get_logger(__name__)
+
+BACKENDS = ("torch", "onnxruntime", "openvino")
+CRNN_INPUT_NAME = "input"
+CRNN_OUTPUT_NAME = "log_probs"
+
+
+def normalize_backend(backend: Optional[str]) -> str:
+    backend = (backend or "torch").lower()
+    if backend not in BACKENDS:
+        logger.warning("Неизвестный бэкенд инференса %s, используется torch", backend)
+        return "torch"
+    return backend
+
+
+# --- YOLO ---
+def yolo_model_path(model_path: str, backend: str) -> str:
+    """Путь к модели YOLO для бэкенда (формат и имена совпадают с ``YOLO.export``)."""
+    base = os.path.splitext(model_path)[0]
+    if backend == "onnxruntime":
+        return f"{base}.onnx"
+    if backend == "openvino":
+        return f"{base}_openvino_model"
+    return model_path
+
+
+def resolve_yolo_model(model_path: str, backend: str) -> str:
+    """Экспортированная модель, если она есть; иначе исходные веса PyTorch."""
+    path = yolo_model_path(model_path, backend)
+    if path != model_path and not os.path.exists(path):
+        logger.warning("Нет экспортированной модели YOLO %s (бэкенд %s), используется PyTorch", path, backend)
+        return model_path
+    return path
+
+
+def exported_yolo_imgsz(path: str) -> Optional[Tuple[int, int]]:
+    """Фиксированный вход (h, w) экспортированной модели YOLO; None, если его не прочитать."""
+    try:
+        if os.path.isdir(path):
+            # OpenVINO: ultralytics кладет параметры экспорта рядом с моделью.
+            import yaml
+
+            with open(os.path.join(path, "metadata.yaml"), encoding="utf-8") as f:
+                height, width = yaml.safe_load(f)["imgsz"]
+            return int(height), int(width)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+        session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        height, width = session.get_inputs()[0].shape[2:4]
+        return int(height), int(width)
+    except Exception:  # noqa: BLE001
+        logger.debug("Не удалось прочитать вход экспортированной модели %s", path, exc_info=True)
+        return None
+
+
+def export_yolo(model_path: str, backend: str, imgsz: int = 640) -> str:
+    from ultralytics import YOLO
+
+    fmt = {"onnxruntime": "onnx", "openvino": "openvino"}[backend]
+    exported = YOLO(model_path).export(format=fmt, imgsz=imgsz)
+    logger.info("YOLO экспортирован (%s): %s", backend, exported)
+    return str(exported)
+
+
+# --- CRNN ---
+def crnn_onnx_path(model_path: str) -> str:
+    return f"{os.path.splitext(model_path)[0]}.onnx"
+
+
+def export_crnn(model: "torch.nn.Module", onnx_path: str, height: int, width: int) -> str:
+    """Экспортирует квантованный CRNN в ONNX (QDQ) с динамическим размером батча."""
+    import torch
+
+    example = torch.randn(1, 1, height, width)
+    tmp_path = f"{onnx_path}.tmp"
+    torch.onnx.export(
+        model,
+        (example,),
+        tmp_path,
+        input_names=[CRNN_INPUT_NAME],
+        output_names=[CRNN_OUTPUT_NAME],
+        dynamic_axes={CRNN_INPUT_NAME: {0: "batch"}, CRNN_OUTPUT_NAME: {1: "batch"}},
+        opset_version=17,
+        dynamo=False,
+    )
+    os.replace(tmp_path, onnx_path)
+    logger.info("CRNN экспортирован в ONNX: %s", onnx_path)
+    return onnx_path
+
+
+class CrnnBackend(abc.ABC):
+    """Исполняет CRNN: принимает тензор (N, 1, H, W), возвращает log-probs (T, N, C)."""
+
+    name = "torch"
+
+    @abc.abstractmethod
+    def __call__(self, batch: "torch.Tensor") -> "torch.Tensor":
+        """Log-probs CRNN для пачки кропов."""
+
+
+class TorchCrnnBackend(CrnnBackend):
+    name = "torch"
+
+    def __init__(self, model: "torch.nn.Module") -> None:
+        self.model = model
+
+    def __call__(self, batch: "torch.Tensor") -> "torch.Tensor":
+        return self.model(batch)
+
+
+class OnnxRuntimeCrnnBackend(CrnnBackend):
+    name = "onnxruntime"
+
+    def __init__(self, onnx_path: str, threads: int = 0) -> None:
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+
+    def __call__(self, batch: "torch.Tensor") -> "torch.Tensor":
+        import torch
+
+        output = self.session.run([CRNN_OUTPUT_NAME], {CRNN_INPUT_NAME: batch.cpu().numpy()})[0]
+        return torch.from_numpy(output)
+
+
+class OpenVinoCrnnBackend(CrnnBackend):
+    name = "openvino"
+
+    def __init__(self, onnx_path: str, threads: int = 0) -> None:
+        import openvino as ov
+
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if threads > 0:
+            config["INFERENCE_NUM_THREADS"] = threads
+        core = ov.Core()
+        self.compiled = core.compile_model(core.read_model(onnx_path), "CPU", config)
+
+    def __call__(self, batch: "torch.Tensor") -> "torch.Tensor":
+        import torch
+
+        # Общий InferRequest не потокобезопасен, а CRNN разделяется каналами, поэтому
+        # каждый вызов идет через скомпилированную модель со своим запросом.
+        output = self.compiled(batch.cpu().numpy())[0]
+        return torch.from_numpy(output)
+
+
+def create_crnn_backend(
+    backend: str, model_path: str, threads: int = 0
+) -> Optional[CrnnBackend]:
+    """Создает ONNX Runtime/OpenVINO-бэкенд CRNN или None, если нужен PyTorch."""
+    if backend == "torch":
+        return None
+    onnx_path = crnn_onnx_path(model_path)
+    if not os.path.exists(onnx_path):
+        logger.warning("Нет ONNX-модели CRNN %s, используется PyTorch (python -m backends)", onnx_path)
+        return None
+    try:
+        if backend == "onnxruntime":
+            return OnnxRuntimeCrnnBackend(onnx_path, threads)
+        return OpenVinoCrnnBackend(onnx_path, threads)
+    except ImportError:
+        logger.warning("Бэкенд %s не установлен, CRNN исполняется PyTorch", backend)
+    except Exception:  # noqa: BLE001
+        logger.exception("Не удалось загрузить CRNN в бэкенд %s, используется PyTorch", backend)
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Экспорт YOLO и CRNN для CPU-бэкендов инференса.")
+    parser.add_argument("--backend", choices=BACKENDS[1:], default="onnxruntime")
+    parser.add_argument("--imgsz", type=int, default=640, help="Размер входа YOLO при экспорте.")
+    parser.add_argument("--skip-yolo", action="store_true")
+    parser.add_argument("--skip-crnn", action="store_true")
+    args = parser.parse_args()
+
+    from detector import Config, CRNNRecognizer
+    from logging_manager import LoggingManager
+
+    LoggingManager()
+    if not args.skip_yolo:
+        print(f"YOLO: {export_yolo(Config.YOLO_MODEL_PATH, args.backend, args.imgsz)}")
+    if not args.skip_crnn:
+        # OpenVINO читает тот же ONNX-файл, отдельный экспорт CRNN не нужен.
+        # Экспортируем FX-модель, а не TorchScript-кэш: замороженный граф хуже переносится в ONNX.
+        model = CRNNRecognizer._build_quantized(Config.OCR_MODEL_PATH, Config.DEVICE)
+        path = export_crnn(
+            model, crnn_onnx_path(Config.OCR_MODEL_PATH), Config.OCR_IMG_HEIGHT, Config.OCR_IMG_WIDTH
+        )
+        print(f"CRNN: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Проверка эквивалентности и пропускной способности бэкендов инференса.
+
+Для каждого доступного бэкенда (``onnxruntime``, ``openvino``) сравнивает выходы с PyTorch:
+для CRNN — максимальное расхождение log-probs и долю совпавших строк, для YOLO — долю
+детекций, сопоставленных с эталонными по IoU. Затем замеряет скорость обоих моделей.
+Модели должны быть предварительно экспортированы: ``python -m backends --backend onnxruntime``.
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.backend_bench --samples 200
+    python -m benchmarks.backend_bench --images-dir data/frames --check
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from tracker import iou_matrix
+from video_sources import random_plate_text, render_plate
+
+# Пороги для --check: выход бэкенда считается эквивалентным PyTorch.
+MIN_TEXT_AGREEMENT = 0.98
+MIN_BOX_AGREEMENT = 0.95
+BOX_MATCH_IOU = 0.9
+
+
+def synthetic_plates(rng: np.random.Generator, count: int) -> List[np.ndarray]:
+    plates = []
+    for _ in range(count):
+        width = int(rng.integers(90, 260))
+        plates.append(render_plate(random_plate_text(rng), width, max(20, width * 112 // 520)))
+    return plates
+
+
+def synthetic_frames(rng: np.random.Generator, count: int, size=(720, 1280)) -> List[np.ndarray]:
+    frames = []
+    for _ in range(count):
+        frame = rng.integers(30, 200, size=(*size, 3), dtype=np.uint8)
+        for plate in synthetic_plates(rng, int(rng.integers(1, 4))):
+            h, w = plate.shape[:2]
+            y = int(rng.integers(0, size[0] - h))
+            x = int(rng.integers(0, size[1] - w))
+            frame[y : y + h, x : x + w] = plate
+        frames.append(frame)
+    return frames
+
+
+def load_images(images_dir: str) -> List[np.ndarray]:
+    images = [cv2.imread(path) for path in sorted(glob.glob(os.path.join(images_dir, "*")))]
+    return [image for image in images if image is not None]
+
+
+def compare_crnn(reference, candidate, plates: List[np.ndarray]) -> Dict[str, float]:
+    import torch
+
+    max_diff = 0.0
+    agree = 0
+    with torch.no_grad():
+        for plate in plates:
+            tensor = reference.transform(plate).unsqueeze(0)
+            ref_out = reference.backend(tensor)
+            cand_out = candidate.backend(tensor)
+            max_diff = max(max_diff, float((ref_out - cand_out).abs().max()))
+            agree += reference._decode_chars(ref_out)[0] == candidate._decode_chars(cand_out)[0]
+    return {"crnn_max_logprob_diff": max_diff, "crnn_text_agreement": agree / len(plates)}
+
+
+def compare_yolo(reference, candidate, frames: List[np.ndarray]) -> Dict[str, float]:
+    matched = total = 0
+    for frame in frames:
+        ref = np.array([det["bbox"] for det in reference.detect(frame)], dtype=float).reshape(-1, 4)
+        cand = np.array([det["bbox"] for det in candidate.detect(frame)], dtype=float).reshape(-1, 4)
+        total += max(len(ref), len(cand))
+        if len(ref) and len(cand):
+            matched += int((iou_matrix(ref, cand).max(axis=1) >= BOX_MATCH_IOU).sum())
+    return {"yolo_box_agreement": matched / total if total else 1.0}
+
+
+def throughput(func, items: List, repeats: int) -> float:
+    for item in items[:5]:
+        func(item)
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for item in items:
+            func(item)
+    return repeats * len(items) / (time.perf_counter() - started)
+
+
+def run(samples: int, frames_count: int, repeats: int, images_dir: Optional[str], threads: int) -> Dict:
+    from detector import Config, CRNNRecognizer, YOLODetector
+
+    import backends
+
+    rng = np.random.default_rng(0)
+    plates = synthetic_plates(rng, samples)
+    frames = load_images(images_dir) if images_dir else synthetic_frames(rng, frames_count)
+
+    results: Dict[str, Dict] = {}
+    reference_crnn = CRNNRecognizer(Config.OCR_MODEL_PATH, Config.DEVICE, backend="torch")
+    reference_yolo = YOLODetector(Config.YOLO_MODEL_PATH, Config.DEVICE, backend="torch")
+    results["torch"] = {
+        "crnn_plates_per_s": throughput(reference_crnn.recognize, plates, repeats),
+        "yolo_frames_per_s": throughput(reference_yolo.detect, frames, 1),
+    }
+
+    for backend in backends.BACKENDS[1:]:
+        crnn = CRNNRecognizer(Config.OCR_MODEL_PATH, Config.DEVICE, backend=backend, threads=threads)
+        yolo = YOLODetector(Config.YOLO_MODEL_PATH, Config.DEVICE, backend=backend)
+        entry: Dict[str, float] = {}
+        if crnn.backend.name == backend:
+            entry.update(compare_crnn(reference_crnn, crnn, plates))
+            entry["crnn_plates_per_s"] = throughput(crnn.recognize, plates, repeats)
+        if yolo.backend == backend:
+            entry.update(compare_yolo(reference_yolo, yolo, frames))
+            entry["yolo_frames_per_s"] = throughput(yolo.detect, frames, 1)
+        if entry:
+            results[backend] = entry
+        else:
+            results[backend] = {"skipped": "бэкенд не установлен или модели не экспортированы"}
+    return results
+
+
+def check(results: Dict) -> List[str]:
+    failures = []
+    for backend, entry in results.items():
+        if entry.get("crnn_text_agreement", 1.0) < MIN_TEXT_AGREEMENT:
+            failures.append(f"{backend}: совпадение строк CRNN {entry['crnn_text_agreement']:.3f}")
+        if entry.get("yolo_box_agreement", 1.0) < MIN_BOX_AGREEMENT:
+            failures.append(f"{backend}: совпадение рамок YOLO {entry['yolo_box_agreement']:.3f}")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Эквивалентность и скорость бэкендов инференса.")
+    parser.add_argument("--samples", type=int, default=200, help="Число синтетических пластин для CRNN.")
+    parser.add_argument("--frames", type=int, default=30, help="Число синтетических кадров для YOLO.")
+    parser.add_argument("--images-dir", help="Каталог реальных кадров вместо синтетики.")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=0, help="Потоки ONNX Runtime/OpenVINO (0 — авто).")
+    parser.add_argument("--check", action="store_true", help="Код возврата 1, если бэкенды расходятся с PyTorch.")
+    parser.add_argument("--json", action="store_true", help="Вывести результат в JSON.")
+    args = parser.parse_args()
+
+    results = run(args.samples, args.frames, args.repeats, args.images_dir, args.threads)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        for backend, entry in results.items():
+            print(f"[{backend}]")
+            for key, value in entry.items():
+                print(f"{key:>24}: {value:.4f}" if isinstance(value, float) else f"{key:>24}: {value}")
+    if args.check:
+        failures = check(results)
+        for failure in failures:
+            print(f"РАСХОЖДЕНИЕ: {failure}", file=sys.stderr)
+        sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
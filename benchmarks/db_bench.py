@@ -0,0 +1,163 @@
+"""Бенчмарк базы событий: скорость вставки и запросов на 1M/10M строк.
+
+База наполняется синтетическими событиями (16 каналов, год истории) через
+``EventDatabase.insert_events`` ступенями до каждого размера из ``--rows``; на каждой
+ступени замеряются одиночные вставки (синхронная и ``AsyncEventDatabase``) и запросы,
+которые выполняют вкладки «События» и «Поиск».
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.db_bench --rows 1000000 10000000 --json
+    python -m benchmarks.db_bench --rows 100000 --db /tmp/events.db
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from video_sources import PLATE_ALPHABET
+from storage import AsyncEventDatabase, EventDatabase
+
+CHANNELS = 16
+HISTORY_DAYS = 365
+CHUNK_ROWS = 50_000
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def synthetic_rows(rng: np.random.Generator, start_index: int, count: int, total: int) -> List[tuple]:
+    """События с равномерно растущим временем и номерами из ограниченного «парка» машин."""
+    letters = np.array(list(PLATE_ALPHABET))
+    fleet = max(1000, total // 20)
+    vehicles = rng.integers(0, fleet, count)
+    channels = rng.integers(1, CHANNELS + 1, count)
+    confidences = rng.uniform(0.6, 1.0, count)
+    step = HISTORY_DAYS * 86400 / max(1, total)
+    rows = []
+    for offset, (vehicle, channel, confidence) in enumerate(zip(vehicles, channels, confidences)):
+        vehicle = int(vehicle)
+        plate = (
+            f"{letters[vehicle % 12]}{vehicle // 12 % 1000:03d}"
+            f"{letters[vehicle // 12000 % 12]}{letters[vehicle // 144000 % 12]}{vehicle % 97 + 1:02d}"
+        )
+        timestamp = (EPOCH + timedelta(seconds=(start_index + offset) * step)).isoformat()
+        rows.append((timestamp, f"Канал {channel}", plate, float(confidence), "bench"))
+    return rows
+
+
+def timed(func: Callable[[], Any], repeats: int) -> Dict[str, float]:
+    durations = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - started)
+    return {"median_ms": statistics.median(durations) * 1000, "max_ms": max(durations) * 1000}
+
+
+def single_insert_rate(database: EventDatabase, count: int) -> float:
+    started = time.perf_counter()
+    for _ in range(count):
+        database.insert_event("Канал 1", "A123BC77", 0.9, "bench")
+    return count / (time.perf_counter() - started)
+
+
+def async_insert_rate(db_path: str, count: int) -> float:
+    database = AsyncEventDatabase(db_path)
+
+    async def insert_all() -> None:
+        for _ in range(count):
+            await database.insert_event_async("Канал 1", "A123BC77", 0.9, "bench")
+
+    started = time.perf_counter()
+    asyncio.run(insert_all())
+    return count / (time.perf_counter() - started)
+
+
+def query_timings(database: EventDatabase, repeats: int) -> Dict[str, Dict[str, float]]:
+    last_day = EPOCH + timedelta(days=HISTORY_DAYS - 1)
+    start, end = last_day.isoformat(), (last_day + timedelta(days=1)).isoformat()
+    return {
+        "fetch_recent": timed(lambda: database.fetch_recent(100), repeats),
+        "fetch_filtered_day_channel": timed(
+            lambda: database.fetch_filtered(start=start, end=end, channel="Канал 3", limit=100), repeats
+        ),
+        "fetch_filtered_plates": timed(
+            lambda: database.fetch_filtered(plates=["A001AA02", "B002AA03"], limit=100), repeats
+        ),
+        "search_by_plate": timed(lambda: database.search_by_plate("123"), repeats),
+        "list_channels": timed(database.list_channels, repeats),
+    }
+
+
+def run(rows: List[int], db_path: str, repeats: int, single_inserts: int) -> Dict[str, Any]:
+    database = EventDatabase(db_path)
+    # Логирование каждой вставки искажает замер, оставляем только предупреждения.
+    database.logger.setLevel("WARNING")
+    rng = np.random.default_rng(0)
+    target_total = max(rows)
+    inserted = 0
+    steps = []
+    for target in sorted(rows):
+        fill_started = time.perf_counter()
+        filled = 0
+        while inserted < target:
+            chunk = synthetic_rows(rng, inserted, min(CHUNK_ROWS, target - inserted), target_total)
+            database.insert_events(chunk)
+            inserted += len(chunk)
+            filled += len(chunk)
+        fill_seconds = time.perf_counter() - fill_started
+        steps.append(
+            {
+                "rows": target,
+                "bulk_insert_rows_per_s": filled / fill_seconds if filled else None,
+                "single_insert_per_s": single_insert_rate(database, single_inserts),
+                "async_insert_per_s": async_insert_rate(db_path, single_inserts),
+                "queries": query_timings(database, repeats),
+                "db_size_mb": os.path.getsize(db_path) / 2**20,
+            }
+        )
+        inserted += 2 * single_inserts
+    return {"steps": steps}
+
+
+def run_temporary(rows: List[int], repeats: int, single_inserts: int) -> Dict[str, Any]:
+    """Прогон на временной базе, которая удаляется после замеров."""
+    with tempfile.TemporaryDirectory() as tmp:
+        return run(rows, os.path.join(tmp, "events.db"), repeats, single_inserts)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Скорость вставки и запросов базы событий.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--db", help="Файл базы (по умолчанию — временный, удаляется после прогона).")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--single-inserts", type=int, default=200, help="Одиночных вставок на ступень.")
+    parser.add_argument("--json", action="store_true", help="Вывести результат в JSON.")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        report = run(args.rows, args.db, args.repeats, args.single_inserts)
+    else:
+        report = run_temporary(args.rows, args.repeats, args.single_inserts)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+    for step in report["steps"]:
+        print(
+            f"[{step['rows']} строк, {step['db_size_mb']:.0f} МБ] пакетная вставка: "
+            f"{step['bulk_insert_rows_per_s'] or 0:.0f} строк/с, одиночная: {step['single_insert_per_s']:.0f}/с, "
+            f"async: {step['async_insert_per_s']:.0f}/с"
+        )
+        for name, timing in step["queries"].items():
+            print(f"{name:>28}: {timing['median_ms']:.1f} мс (max {timing['max_ms']:.1f})")
+
+
+if __name__ == "__main__":
+    main()
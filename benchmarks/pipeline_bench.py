@@ -0,0 +1,251 @@
+"""Сквозной бенчмарк каналов: N ``ChannelRunner`` на одном ролике, как в GUI.
+
+Каждый канал крутит тот же цикл, что ``ChannelWorker`` (захват, ROI, детектор, трекер,
+ANPR-пайплайн, запись событий в SQLite), а при ``--preview`` еще и отрисовку рамок с
+конвертацией в RGB. Замеряются кадры/с (суммарно и по каналам), перцентили задержек по
+стадиям и память процесса (RSS). Без ``--clip`` генерируется синтетический ролик с
+движущимися пластинами (``video_sources.SyntheticSource``); ``--clip`` принимает и любой
+источник канала, например ``synthetic://fps=25&res=1920x1080`` или ``loop://data/gate.mp4``
+(такие источники бесконечны, прогон ограничивает ``--timeout``). Без весов моделей
+(или с ``--stub-models``) используются заглушки из ``benchmarks.stub_models``. Заглушки
+заменяют только модели: ANPR-пайплайн из ``detector.py`` настоящий, но torch и ultralytics
+он импортирует лишь при загрузке весов, поэтому прогон на заглушках идет на CPU без них.
+
+Время прогона отсчитывается с момента, когда все каналы загрузили модели и перешли
+к обработке кадров: загрузка моделей пишется отдельно (``load_seconds``) и в кадры/с не входят. Падение канала
+или прогон без единого прочитанного кадра — ошибка с ненулевым кодом возврата, а не замер.
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.pipeline_bench --channels 4 --seconds 20
+    python -m benchmarks.pipeline_bench --clip data/gate.mp4 --channels 8 --preview --json
+    python -m benchmarks.pipeline_bench --clip "synthetic://fps=25&res=1920x1080&plates=4" --channels 16 --timeout 60
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import tempfile
+import threading
+import time
+import traceback
+from typing import Any, Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from benchmarks.stub_models import install_stub_models, weights_available
+from video_sources import SyntheticSource
+
+
+def write_synthetic_clip(
+    path: str, seconds: float, fps: int = 25, size: Tuple[int, int] = (1280, 720), plates: int = 3, seed: int = 0
+) -> str:
+    """Записывает кадры ``SyntheticSource`` в файл, чтобы в замер попало декодирование видео."""
+    source = SyntheticSource(fps=fps, size=size, plates=plates, seed=seed, frames=int(seconds * fps), realtime=False)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    if not writer.isOpened():
+        raise SystemExit(f"Не удалось создать ролик {path}")
+    while True:
+        ret, frame = source.read()
+        if not ret:
+            break
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def rss_mb() -> float:
+    """Текущий RSS процесса (Linux, /proc)."""
+    with open("/proc/self/status", encoding="ascii") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+class MemorySampler(threading.Thread):
+    """Периодически снимает RSS процесса, чтобы поймать пик во время прогона."""
+
+    def __init__(self, interval: float = 0.25) -> None:
+        super().__init__(name="rss-sampler", daemon=True)
+        self.interval = interval
+        self.samples: List[float] = []
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            self.samples.append(rss_mb())
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> Dict[str, float]:
+        self._stop_event.set()
+        self.join()
+        samples = self.samples or [rss_mb()]
+        return {
+            "rss_mean_mb": sum(samples) / len(samples),
+            "rss_peak_mb": max(samples),
+            # ru_maxrss в Linux — в килобайтах.
+            "maxrss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }
+
+
+def merge_stages(snapshots: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Сводит задержки стадий по каналам: сумма вызовов, средняя p50 и худшие p95/p99."""
+    merged: Dict[str, Dict[str, float]] = {}
+    for snapshot in snapshots:
+        for stage, values in snapshot["stages"].items():
+            if not values["count"]:
+                continue
+            entry = merged.setdefault(stage, {"count": 0, "p50_ms": [], "p95_ms": 0.0, "p99_ms": 0.0})
+            entry["count"] += values["count"]
+            entry["p50_ms"].append(values["p50_ms"])
+            entry["p95_ms"] = max(entry["p95_ms"], values["p95_ms"])
+            entry["p99_ms"] = max(entry["p99_ms"], values["p99_ms"])
+    for entry in merged.values():
+        entry["p50_ms"] = sum(entry["p50_ms"]) / len(entry["p50_ms"])
+    return merged
+
+
+def make_preview(stats_by_channel: Dict[str, Any]):
+    """Превью как в ``ChannelWorker._emit_frame`` без Qt: рамки и конвертация в RGB."""
+    from detector import Visualizer
+
+    def on_frame(channel: str, frame: np.ndarray, results: list) -> None:
+        started = time.perf_counter()
+        if results:
+            Visualizer.draw_results(frame, results)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        stats_by_channel[channel].observe("preview", time.perf_counter() - started)
+
+    return on_frame
+
+
+def run(clip: str, channels: int, db_path: str, preview: bool, timeout: float) -> Dict[str, Any]:
+    from anpr.workers.channel_runner import ChannelRunner
+    from settings_manager import SettingsManager
+
+    stats_by_channel: Dict[str, Any] = {}
+    on_frame = make_preview(stats_by_channel) if preview else None
+    runners = []
+    for index in range(channels):
+        conf = SettingsManager._channel_defaults({})
+        conf.update({"name": f"Канал {index + 1}", "source": clip})
+        runner = ChannelRunner(conf, db_path, on_frame=on_frame)
+        stats_by_channel[runner.name] = runner.stats
+        runners.append(runner)
+
+    errors: Dict[str, str] = {}
+
+    def run_channel(runner: Any) -> None:
+        # Не run_blocking: он только пишет падение в лог, а здесь оно делает прогон недействительным.
+        try:
+            asyncio.run(runner.run())
+        except Exception as exc:  # noqa: BLE001
+            errors[runner.name] = f"{type(exc).__name__}: {exc}"
+            traceback.print_exc()
+
+    sampler = MemorySampler()
+    rss_before = rss_mb()
+    sampler.start()
+    launched = time.perf_counter()
+    deadline = launched + timeout
+    threads = [threading.Thread(target=run_channel, args=(runner,), daemon=True) for runner in runners]
+    for thread in threads:
+        thread.start()
+    # Загрузка моделей не входит в замер: ждем, пока каждый канал перейдет к обработке кадров.
+    while time.perf_counter() < deadline and any(
+        thread.is_alive() and not runner.ready.is_set() for thread, runner in zip(threads, runners)
+    ):
+        time.sleep(0.01)
+    started = time.perf_counter()
+    frames_before = [runner.stats.frames_read for runner in runners]
+    processed_before = [runner.stats.frames_processed for runner in runners]
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.perf_counter()))
+    for runner in runners:
+        runner.stop()
+    for thread in threads:
+        thread.join(5)
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    memory = sampler.stop()
+    memory["rss_before_mb"] = rss_before
+
+    snapshots = [runner.get_stats() for runner in runners]
+    if errors:
+        raise SystemExit("Прогон не удался, каналы упали: " + "; ".join(f"{k}: {v}" for k, v in errors.items()))
+    if not sum(s["frames_read"] for s in snapshots):
+        raise SystemExit("Прогон не удался: каналы не прочитали ни одного кадра")
+    frames = [s["frames_read"] - before for s, before in zip(snapshots, frames_before)]
+    frames_read = sum(frames)
+    frames_processed = sum(s["frames_processed"] for s in snapshots) - sum(processed_before)
+    return {
+        "channels": channels,
+        "load_seconds": started - launched,
+        "seconds": elapsed,
+        "frames_read": frames_read,
+        "frames_processed": frames_processed,
+        "events": sum(s["events"] for s in snapshots),
+        "fps_total": frames_read / elapsed,
+        "fps_per_channel": [count / elapsed for count in frames],
+        "processed_fps_total": frames_processed / elapsed,
+        "stages": merge_stages(snapshots),
+        "memory": memory,
+    }
+
+
+def run_with_args(args: argparse.Namespace) -> Dict[str, Any]:
+    """Готовит ролик и модели по аргументам CLI и запускает прогон (используется и ``benchmarks.suite``)."""
+    models = "stub" if args.stub_models or not weights_available() else "real"
+    if models == "stub":
+        install_stub_models()
+    else:
+        try:
+            import torch  # noqa: F401
+            import ultralytics  # noqa: F401
+        except ImportError as exc:
+            raise SystemExit(f"Для прогона на весах нужны torch и ultralytics (или --stub-models): {exc}")
+    with tempfile.TemporaryDirectory() as tmp:
+        clip = args.clip
+        if clip is None:
+            width, height = (int(part) for part in args.resolution.split("x"))
+            clip = write_synthetic_clip(
+                os.path.join(tmp, "synthetic.mp4"), args.seconds, size=(width, height), plates=args.plates
+            )
+        report = run(clip, args.channels, os.path.join(tmp, "events.db"), args.preview, args.timeout)
+    report["models"] = models
+    report["clip"] = args.clip or f"synthetic:{args.resolution}x{args.seconds:g}s"
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Сквозной бенчмарк N каналов на ролике.")
+    parser.add_argument("--clip", help="Записанный ролик; по умолчанию генерируется синтетический.")
+    parser.add_argument("--channels", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=20.0, help="Длина синтетического ролика.")
+    parser.add_argument("--resolution", default="1280x720", help="Разрешение синтетического ролика.")
+    parser.add_argument("--plates", type=int, default=3, help="Пластин в синтетическом ролике.")
+    parser.add_argument("--preview", action="store_true", help="Рисовать превью, как GUI.")
+    parser.add_argument("--stub-models", action="store_true", help="Заглушки вместо моделей даже при наличии весов.")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--json", action="store_true", help="Вывести результат в JSON.")
+    args = parser.parse_args()
+
+    report = run_with_args(args)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+    print(
+        f"Каналов: {report['channels']} ({report['models']}), кадров: {report['frames_read']}, "
+        f"{report['fps_total']:.1f} кадр/с всего, событий: {report['events']}, "
+        f"загрузка моделей {report['load_seconds']:.1f} с"
+    )
+    for stage, entry in report["stages"].items():
+        print(f"{stage:>12}: p50={entry['p50_ms']:.2f} мс, p95={entry['p95_ms']:.2f} мс, p99={entry['p99_ms']:.2f} мс")
+    print(", ".join(f"{key}={value:.1f}" for key, value in report["memory"].items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""Микробенчмарк и проверка точности коррекции перспективы номерной пластины.
+
+Сравнивает исходный алгоритм (``PlateRectifier.rectify_reference``) с быстрым
+``PlateRectifier.rectify`` на синтетической выборке с известными углами пластины
+или на каталоге реальных кропов (тогда считается только согласие методов).
+С ``--check`` код возврата 1, если быстрый путь медленнее порога или находит
+пластину реже (или ошибочнее) исходного алгоритма.
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.rectify_benchmark --samples 500 --check
+    python -m benchmarks.rectify_benchmark --crops-dir data/plate_crops
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from preprocessing import PlateRectifier, four_point_transform, order_points
+from video_sources import random_plate_text, render_plate
+
+# Угол считается найденным верно, если средняя ошибка углов меньше этой доли ширины пластины.
+CORRECT_CORNER_ERROR = 0.08
+
+# Пороги для --check. Ускорение — по лучшему из повторов, без кэша и с кэшем по треку.
+MIN_SPEEDUP = 1.2
+MIN_SPEEDUP_TRACKED = 1.5
+# Насколько доля найденных/верных углов быстрого пути может уступать исходному алгоритму.
+MAX_DETECTION_DROP = 0.02
+# Допуск на отличие выхода от истины: углы быстрого пути ищутся на уменьшенной копии.
+MAX_OUTPUT_ERROR_EXCESS = 0.02
+
+
+def make_sample(
+    rng: np.random.Generator, skew: float, width_range: Tuple[int, int] = (80, 260)
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Возвращает кроп детектора с пластиной под случайной перспективой и истинные углы."""
+    plate_w = int(rng.integers(*width_range))
+    plate_h = max(12, int(plate_w * 112 / 520))
+    plate = render_plate(random_plate_text(rng), plate_w, plate_h)
+
+    margin_x, margin_y = int(plate_w * 0.12) + 2, int(plate_h * 0.3) + 2
+    crop_w, crop_h = plate_w + 2 * margin_x, plate_h + 2 * margin_y
+    dst = np.array(
+        [
+            [margin_x, margin_y],
+            [margin_x + plate_w, margin_y],
+            [margin_x + plate_w, margin_y + plate_h],
+            [margin_x, margin_y + plate_h],
+        ],
+        dtype="float32",
+    )
+    dst += rng.uniform(-skew, skew, size=(4, 2)).astype("float32") * np.array([plate_w, plate_h], dtype="float32")
+    src = np.array([[0, 0], [plate_w, 0], [plate_w, plate_h], [0, plate_h]], dtype="float32")
+
+    background = rng.integers(40, 120, size=(crop_h, crop_w, 3), dtype=np.uint8)
+    matrix = cv2.getPerspectiveTransform(src, dst)
+    warped = cv2.warpPerspective(plate, matrix, (crop_w, crop_h))
+    mask = cv2.warpPerspective(np.full((plate_h, plate_w), 255, np.uint8), matrix, (crop_w, crop_h))
+    crop = np.where(mask[..., None] > 0, warped, background)
+    crop = cv2.GaussianBlur(crop, (3, 3), 0)
+    noise = rng.normal(0, 4, crop.shape)
+    crop = np.clip(crop.astype(np.float32) + noise, 0, 255).astype(np.uint8)
+    return crop, dst
+
+
+def corner_error(found: Optional[np.ndarray], truth: np.ndarray) -> Optional[float]:
+    """Средняя ошибка углов, нормированная на ширину пластины."""
+    if found is None:
+        return None
+    found_ordered = order_points(found.astype("float32"))
+    truth_ordered = order_points(truth)
+    plate_width = float(np.linalg.norm(truth_ordered[1] - truth_ordered[0]))
+    return float(np.linalg.norm(found_ordered - truth_ordered, axis=1).mean() / max(plate_width, 1.0))
+
+
+def output_agreement(reference: np.ndarray, fast: np.ndarray) -> float:
+    """Средняя абсолютная разница (0..1) выходов, приведенных к серому входу CRNN 128x32."""
+    size = (128, 32)
+
+    def to_input(image: np.ndarray) -> np.ndarray:
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    return float(np.abs(to_input(reference) - to_input(fast)).mean() / 255.0)
+
+
+def time_per_call(funcs: Dict[str, Callable[[], int]], repeats: int) -> Dict[str, float]:
+    """Лучшее из ``repeats`` время вызова (мкс) для каждого прохода.
+
+    Проходы чередуются внутри повтора, а минимум отсекает фоновые всплески нагрузки:
+    иначе шум одного ядра перекрывает разницу между методами. Проход возвращает
+    число выполненных вызовов.
+    """
+    for run_pass in funcs.values():
+        run_pass()  # прогрев кэшей OpenCV
+    best = {name: float("inf") for name in funcs}
+    for _ in range(repeats):
+        for name, run_pass in funcs.items():
+            start = time.perf_counter()
+            calls = run_pass()
+            best[name] = min(best[name], (time.perf_counter() - start) / max(calls, 1) * 1e6)
+    return best
+
+
+def load_crops(crops_dir: str) -> List[np.ndarray]:
+    crops = []
+    for path in sorted(glob.glob(os.path.join(crops_dir, "*"))):
+        image = cv2.imread(path)
+        if image is not None:
+            crops.append(image)
+    return crops
+
+
+def run(
+    samples: int,
+    skew: float,
+    repeats: int,
+    frames_per_track: int,
+    crops_dir: Optional[str],
+    width_range: Tuple[int, int] = (80, 260),
+) -> Dict:
+    rng = np.random.default_rng(0)
+    if crops_dir:
+        crops = load_crops(crops_dir)
+        truths: List[Optional[np.ndarray]] = [None] * len(crops)
+    else:
+        # Каждый третий кроп без перспективы — проверяет пропуск выравнивания.
+        pairs = [make_sample(rng, skew if i % 3 else 0.0, width_range) for i in range(samples)]
+        crops = [crop for crop, _ in pairs]
+        truths = [truth for _, truth in pairs]
+    if not crops:
+        raise SystemExit("Нет кропов для проверки")
+
+    rectifier = PlateRectifier(cache_max_age=0)
+    tracked = PlateRectifier()
+    track_frames = [(idx, crop) for idx, crop in enumerate(crops) for _ in range(frames_per_track)]
+    results: Dict[str, Dict] = {"samples": len(crops)}
+
+    def reference_pass() -> int:
+        for crop in crops:
+            PlateRectifier.rectify_reference(crop)
+        return len(crops)
+
+    def fast_pass() -> int:
+        for crop in crops:
+            rectifier.rectify(crop)
+        return len(crops)
+
+    def tracked_pass() -> int:
+        tracked.reset()
+        for track_id, crop in track_frames:
+            tracked.rectify(crop, track_id)
+        return len(track_frames)
+
+    # 1. Скорость без кэша (одиночные кропы) и с кэшем по треку (последовательные кадры).
+    timings = time_per_call({"reference": reference_pass, "fast": fast_pass, "fast_tracked": tracked_pass}, repeats)
+    for name, value in timings.items():
+        results[f"{name}_us"] = value
+    results["speedup"] = results["reference_us"] / max(results["fast_us"], 1e-9)
+    results["speedup_tracked"] = results["reference_us"] / max(results["fast_tracked_us"], 1e-9)
+
+    # 2. Точность: доля верно/ошибочно найденных углов относительно истины, отличие
+    #    выхода от выпрямления по истинным углам и согласие выходов двух методов.
+    methods = {"reference": PlateRectifier.locate_reference, "fast": rectifier.locate}
+    counters = {name: {"found": 0, "correct": 0, "wrong": 0, "errors": []} for name in methods}
+    output_errors: Dict[str, List[float]] = {name: [] for name in methods}
+    agreement: List[float] = []
+    for crop, truth in zip(crops, truths):
+        outputs = {"reference": PlateRectifier.rectify_reference(crop), "fast": rectifier.rectify(crop)}
+        if truth is not None:
+            expected = four_point_transform(crop, truth)
+            for name, output in outputs.items():
+                output_errors[name].append(output_agreement(expected, output))
+        for name, locate in methods.items():
+            quad = locate(crop)
+            stats = counters[name]
+            stats["found"] += quad is not None
+            error = corner_error(quad, truth) if truth is not None else None
+            if error is None:
+                continue
+            stats["errors"].append(error)
+            if error < CORRECT_CORNER_ERROR:
+                stats["correct"] += 1
+            else:
+                stats["wrong"] += 1
+        agreement.append(output_agreement(outputs["reference"], outputs["fast"]))
+
+    for name, stats in counters.items():
+        results[f"{name}_found"] = stats["found"] / len(crops)
+        if truths[0] is not None:
+            results[f"{name}_correct"] = stats["correct"] / len(crops)
+            results[f"{name}_wrong"] = stats["wrong"] / len(crops)
+        if stats["errors"]:
+            results[f"{name}_median_corner_error"] = float(np.median(stats["errors"]))
+        if output_errors[name]:
+            results[f"{name}_output_error"] = float(np.mean(output_errors[name]))
+    results["output_mean_abs_diff"] = float(np.mean(agreement))
+    return results
+
+
+def check(results: Dict) -> List[str]:
+    failures = []
+    if results["speedup"] < MIN_SPEEDUP:
+        failures.append(f"ускорение без кэша {results['speedup']:.2f} < {MIN_SPEEDUP}")
+    if results["speedup_tracked"] < MIN_SPEEDUP_TRACKED:
+        failures.append(f"ускорение с кэшем трека {results['speedup_tracked']:.2f} < {MIN_SPEEDUP_TRACKED}")
+    for metric in ("found", "correct"):
+        reference, fast = results.get(f"reference_{metric}"), results.get(f"fast_{metric}")
+        if reference is not None and fast < reference - MAX_DETECTION_DROP:
+            failures.append(f"доля {metric}: {fast:.3f} против {reference:.3f} у исходного алгоритма")
+    if "reference_wrong" in results and results["fast_wrong"] > results["reference_wrong"] + MAX_DETECTION_DROP:
+        failures.append(f"доля wrong: {results['fast_wrong']:.3f} против {results['reference_wrong']:.3f}")
+    if (
+        "reference_output_error" in results
+        and results["fast_output_error"] > results["reference_output_error"] + MAX_OUTPUT_ERROR_EXCESS
+    ):
+        failures.append(
+            f"отличие выхода от истины {results['fast_output_error']:.3f} > {results['reference_output_error']:.3f}"
+        )
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк коррекции перспективы номерной пластины.")
+    parser.add_argument("--samples", type=int, default=300, help="Размер синтетической выборки.")
+    parser.add_argument("--skew", type=float, default=0.08, help="Максимальный сдвиг углов (доля размера пластины).")
+    parser.add_argument("--repeats", type=int, default=7, help="Повторов замера; берется лучший.")
+    parser.add_argument("--frames-per-track", type=int, default=5, help="Кадров на трек для замера кэша.")
+    parser.add_argument("--min-width", type=int, default=80, help="Минимальная ширина синтетической пластины.")
+    parser.add_argument("--max-width", type=int, default=260, help="Максимальная ширина синтетической пластины.")
+    parser.add_argument("--crops-dir", help="Каталог реальных кропов вместо синтетики.")
+    parser.add_argument("--check", action="store_true", help="Код возврата 1 при регрессии скорости или точности.")
+    parser.add_argument("--json", action="store_true", help="Вывести результат в JSON.")
+    args = parser.parse_args()
+
+    results = run(
+        args.samples,
+        args.skew,
+        args.repeats,
+        args.frames_per_track,
+        args.crops_dir,
+        (args.min_width, args.max_width),
+    )
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        for key, value in results.items():
+            print(f"{key:>24}: {value:.4f}" if isinstance(value, float) else f"{key:>24}: {value}")
+    if args.check:
+        failures = check(results)
+        for failure in failures:
+            print(f"РЕГРЕССИЯ: {failure}", file=sys.stderr)
+        sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
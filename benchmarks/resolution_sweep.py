@@ -0,0 +1,140 @@
+"""Перебор входного разрешения детектора: полнота против скорости на записанном ролике.
+
+Разметки нет, поэтому эталоном служат детекции YOLO на большом входе (``--reference-imgsz``):
+для каждого варианта ``imgsz`` (квадратный/прямоугольный вход, половинное разрешение)
+считается доля эталонных номеров, найденных с IoU ≥ ``--iou``, число лишних рамок и
+среднее время детекции кадра.
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.resolution_sweep --clip data/gate.mp4 --imgsz 320 416 512 640 --half
+"""
+
+import argparse
+import json
+import time
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from tracker import iou_matrix
+
+
+def read_frames(clip: str, max_frames: int, step: int, region: Tuple[int, int, int, int]) -> List[np.ndarray]:
+    capture = cv2.VideoCapture(clip)
+    if not capture.isOpened():
+        raise SystemExit(f"Не удалось открыть ролик {clip}")
+    x, y, w, h = region
+    frames: List[np.ndarray] = []
+    index = 0
+    while len(frames) < max_frames:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        if index % step == 0:
+            height, width = frame.shape[:2]
+            x1, y1 = width * x // 100, height * y // 100
+            x2, y2 = max(x1 + 1, width * min(100, x + w) // 100), max(y1 + 1, height * min(100, y + h) // 100)
+            frames.append(frame[y1:y2, x1:x2].copy())
+        index += 1
+    capture.release()
+    return frames
+
+
+def boxes_of(detections: List[Dict]) -> np.ndarray:
+    return np.array([det["bbox"] for det in detections], dtype=float).reshape(-1, 4)
+
+
+def evaluate(detector, frames: List[np.ndarray], reference: List[np.ndarray], iou: float) -> Dict[str, float]:
+    found = total = extra = 0
+    detector.detect(frames[0])  # прогрев под новый размер входа
+    started = time.perf_counter()
+    predictions = [boxes_of(detector.detect(frame)) for frame in frames]
+    elapsed = time.perf_counter() - started
+    for ref, pred in zip(reference, predictions):
+        total += len(ref)
+        if len(ref) and len(pred):
+            overlap = iou_matrix(ref, pred)
+            found += int((overlap.max(axis=1) >= iou).sum())
+            extra += int((overlap.max(axis=0) < iou).sum())
+        else:
+            extra += len(pred)
+    return {
+        "recall": found / total if total else 1.0,
+        "extra_boxes": extra,
+        "ms_per_frame": elapsed / len(frames) * 1000,
+    }
+
+
+def run(args: argparse.Namespace) -> Dict:
+    from detector import Config, YOLODetector
+
+    frames = read_frames(args.clip, args.max_frames, args.step, tuple(args.region))
+    if not frames:
+        raise SystemExit("В ролике нет кадров")
+
+    reference_detector = YOLODetector(
+        Config.YOLO_MODEL_PATH, Config.DEVICE, backend="torch", imgsz=args.reference_imgsz, rect=True
+    )
+    reference = [boxes_of(reference_detector.detect(frame)) for frame in frames]
+    report: Dict = {
+        "frames": len(frames),
+        "reference_imgsz": args.reference_imgsz,
+        "reference_plates": int(sum(len(ref) for ref in reference)),
+        "runs": [],
+    }
+
+    variants = [(imgsz, rect, False) for imgsz in args.imgsz for rect in (True, False)]
+    if args.half:
+        variants += [(imgsz, True, True) for imgsz in args.imgsz]
+    for imgsz, rect, half in variants:
+        detector = YOLODetector(
+            Config.YOLO_MODEL_PATH, Config.DEVICE, backend="torch", imgsz=imgsz, rect=rect, half_resolution=half
+        )
+        entry = {
+            "imgsz": imgsz,
+            "rect": rect,
+            "half_resolution": half,
+            "input": detector.input_size(frames[0].shape),
+            **evaluate(detector, frames, reference, args.iou),
+        }
+        report["runs"].append(entry)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Полнота и скорость детектора при разных размерах входа.")
+    parser.add_argument("--clip", required=True, help="Записанный ролик с камеры.")
+    parser.add_argument("--imgsz", type=int, nargs="+", default=[320, 416, 512, 640, 800])
+    parser.add_argument("--reference-imgsz", type=int, default=1280, help="Вход эталонного прогона.")
+    parser.add_argument("--half", action="store_true", help="Добавить варианты с половинным разрешением.")
+    parser.add_argument(
+        "--region", type=int, nargs=4, default=[0, 0, 100, 100], metavar=("X", "Y", "W", "H"),
+        help="Область распознавания в процентах, как в настройках канала.",
+    )
+    parser.add_argument("--max-frames", type=int, default=300)
+    parser.add_argument("--step", type=int, default=5, help="Брать каждый N-й кадр ролика.")
+    parser.add_argument("--iou", type=float, default=0.5, help="IoU для сопоставления с эталоном.")
+    parser.add_argument("--json", action="store_true", help="Вывести результат в JSON.")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+    print(
+        f"Кадров: {report['frames']}, эталонных номеров: {report['reference_plates']} "
+        f"(imgsz={report['reference_imgsz']})"
+    )
+    print(f"{'imgsz':>6} {'rect':>5} {'half':>5} {'вход':>12} {'полнота':>8} {'лишние':>7} {'мс/кадр':>8}")
+    for run_entry in report["runs"]:
+        print(
+            f"{run_entry['imgsz']:>6} {str(run_entry['rect']):>5} {str(run_entry['half_resolution']):>5} "
+            f"{str(run_entry['input']):>12} {run_entry['recall']:>8.3f} {run_entry['extra_boxes']:>7} "
+            f"{run_entry['ms_per_frame']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
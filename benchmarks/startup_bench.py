@@ -0,0 +1,126 @@
+"""Время запуска: импорт UI, время до первого кадра и до первого инференса по каналам.
+
+Импорт модулей замеряется в отдельном процессе (холодный старт интерпретатора), затем
+в текущем процессе запускаются ``ChannelRunner`` для заданных источников и фиксируется,
+когда каждый канал выдал первый кадр и первый кадр, прошедший детектор.
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.startup_bench --source data/sample.mp4 --channels 4
+    python -m benchmarks.startup_bench --source rtsp://camera/stream --no-warmup --json
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+IMPORT_PROBE = (
+    "import time; started = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def measure_import(module: str) -> Optional[float]:
+    """Время импорта модуля в свежем интерпретаторе (None, если импорт не удался)."""
+    completed = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE.format(module=module)],
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        return None
+    return float(completed.stdout.strip().splitlines()[-1])
+
+
+def run_channels(sources: List[str], db_path: str, warmup: bool, timeout: float) -> Dict[str, Dict]:
+    from anpr.workers.channel_runner import ChannelRunner
+    from model_pool import MODEL_POOL
+
+    started = time.perf_counter()
+    if warmup:
+        MODEL_POOL.warmup_async()
+
+    results: Dict[str, Dict] = {}
+    done = threading.Event()
+    lock = threading.Lock()
+    runners: List[ChannelRunner] = []
+
+    def make_on_frame(name: str, runner_ref: List[ChannelRunner]):
+        def on_frame(_channel: str, _frame, _results) -> None:
+            now = time.perf_counter() - started
+            with lock:
+                entry = results.setdefault(name, {})
+                entry.setdefault("first_frame_s", now)
+                if "first_inference_s" not in entry and runner_ref[0].stats.frames_processed:
+                    entry["first_inference_s"] = now
+                if len(results) == len(sources) and all("first_inference_s" in e for e in results.values()):
+                    done.set()
+
+        return on_frame
+
+    threads = []
+    for idx, source in enumerate(sources):
+        name = f"Канал {idx + 1}"
+        runner_ref: List[ChannelRunner] = []
+        runner = ChannelRunner(
+            {"name": name, "source": source},
+            db_path,
+            on_frame=make_on_frame(name, runner_ref),
+        )
+        runner_ref.append(runner)
+        runners.append(runner)
+        thread = threading.Thread(target=runner.run_blocking, daemon=True)
+        threads.append(thread)
+        thread.start()
+
+    done.wait(timeout)
+    for runner in runners:
+        runner.stop()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк запуска приложения и каналов.")
+    parser.add_argument("--source", action="append", dest="sources", help="Источник канала (можно несколько).")
+    parser.add_argument("--channels", type=int, default=1, help="Сколько каналов открыть на каждый источник.")
+    parser.add_argument("--no-warmup", action="store_true", help="Не прогревать модели в фоне заранее.")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--json", action="store_true", help="Вывести результат в JSON.")
+    args = parser.parse_args()
+
+    report: Dict = {
+        "import_channel_runner_s": measure_import("anpr.workers.channel_runner"),
+        "import_main_window_s": measure_import("anpr.ui.main_window"),
+        "import_detector_s": measure_import("detector"),
+    }
+    if args.sources:
+        sources = [source for source in args.sources for _ in range(max(1, args.channels))]
+        with tempfile.TemporaryDirectory() as tmp:
+            channels = run_channels(sources, f"{tmp}/events.db", not args.no_warmup, args.timeout)
+        report["channels"] = channels
+        for key in ("first_frame_s", "first_inference_s"):
+            values = [entry[key] for entry in channels.values() if key in entry]
+            report[f"max_{key}"] = max(values) if values else None
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+    for key, value in report.items():
+        if key == "channels":
+            for name, entry in value.items():
+                print(f"{name:>24}: " + ", ".join(f"{k}={v:.3f}" for k, v in entry.items()))
+        elif isinstance(value, float):
+            print(f"{key:>24}: {value:.3f}")
+        else:
+            print(f"{key:>24}: {value}")
+
+
+if __name__ == "__main__":
+    main()
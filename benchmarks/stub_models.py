@@ -0,0 +1,87 @@
+"""Заглушки YOLO и CRNN для бенчмарков на машине без весов моделей.
+
+``StubDetector`` находит светлые прямоугольники с пропорциями номерной пластины
+(порог + контуры OpenCV), поэтому трекер, отбор бестшотов и препроцессинг работают
+на настоящих рамках. ``StubRecognizer`` возвращает постоянный номер с высокой уверенностью.
+Стоимость заглушек не равна стоимости нейросетей: их цифры сравнимы только между собой.
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+YOLO_WEIGHTS = "models/yolo/best.pt"
+OCR_WEIGHTS = "models/ocr_crnn/cnn.pth"
+STUB_PLATE_TEXT = "A123BC77"
+
+
+def weights_available() -> bool:
+    return os.path.exists(YOLO_WEIGHTS) and os.path.exists(OCR_WEIGHTS)
+
+
+class StubDetector:
+    """Детектор светлых прямоугольников с интерфейсом ``YOLODetector``."""
+
+    backend = "stub"
+
+    def __init__(
+        self, imgsz: Optional[int] = None, rect: bool = True, half_resolution: bool = False, **_: Any
+    ) -> None:
+        self.imgsz = imgsz or 640
+        self.rect = rect
+        self.half_resolution = half_resolution
+
+    def input_size(self, frame_shape: Tuple[int, ...]) -> Tuple[int, int]:
+        return tuple(frame_shape[:2])
+
+    def detect(self, frame: np.ndarray, min_confidence: Optional[float] = None) -> List[Dict[str, Any]]:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        _, mask = cv2.threshold(gray, 215, 255, cv2.THRESH_BINARY)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        results = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            if w >= 24 and h >= 6 and 2.0 <= w / h <= 7.0:
+                results.append({"bbox": [x, y, x + w, y + h], "confidence": 0.9})
+        return results
+
+    def detect_batch(
+        self, frames: Sequence[np.ndarray], min_confidence: Optional[float] = None
+    ) -> List[List[Dict[str, Any]]]:
+        return [self.detect(frame, min_confidence) for frame in frames]
+
+    def track(self, frame: np.ndarray) -> List[Dict[str, Any]]:
+        return self.detect(frame)
+
+
+class StubRecognizer:
+    """OCR-заглушка с интерфейсом ``CRNNRecognizer``: приводит кроп к входу CRNN и выдает постоянный номер."""
+
+    backend = "stub"
+
+    def __init__(self, width: int = 128, height: int = 32) -> None:
+        self.size = (width, height)
+
+    def recognize_batch(self, plate_images: Sequence[np.ndarray]) -> List[Tuple[str, float, List[float]]]:
+        results = []
+        for image in plate_images:
+            # Та же подготовка входа, что у CRNN, чтобы заглушка не была бесплатной.
+            cv2.resize(image, self.size, interpolation=cv2.INTER_AREA)
+            results.append((STUB_PLATE_TEXT, 0.95, [0.95] * len(STUB_PLATE_TEXT)))
+        return results
+
+    def recognize_detailed(self, plate_image: np.ndarray) -> Tuple[str, float, List[float]]:
+        return self.recognize_batch([plate_image])[0]
+
+    def recognize(self, plate_image: np.ndarray) -> Tuple[str, float]:
+        text, confidence, _ = self.recognize_detailed(plate_image)
+        return text, confidence
+
+
+def install_stub_models() -> None:
+    """Подменяет модели в общем пуле заглушками."""
+    from model_pool import MODEL_POOL
+
+    MODEL_POOL.install(StubRecognizer(), StubDetector)
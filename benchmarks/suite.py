@@ -0,0 +1,160 @@
+"""Воспроизводимый набор бенчмарков с машиночитаемым результатом и сравнением версий.
+
+Прогоняет ``pipeline_bench`` для нескольких чисел каналов и ``db_bench`` на заданных
+размерах базы, сохраняет JSON с окружением (коммит, Python, CPU, заглушки или модели)
+и, если указан ``--compare``, сравнивает с прошлым результатом: кадры/с и строк/с
+не должны падать, задержки (``*_ms``) и память (``*_mb``) — расти больше ``--tolerance``.
+Работает на CPU-only Linux; без весов моделей используются заглушки. Неудачный прогон
+``pipeline_bench`` завершает набор с ненулевым кодом, и результат не сохраняется.
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.suite --channels 1 4 16 --rows 1000000 10000000
+    python -m benchmarks.suite --quick --compare benchmarks/results/baseline.json --check
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks import db_bench, pipeline_bench
+
+RESULTS_DIR = "benchmarks/results"
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def flatten(data: Any, prefix: str = "") -> Dict[str, float]:
+    """Числовые листья отчета с путями вида ``pipeline.4.stages.detect.p95_ms``."""
+    if isinstance(data, dict):
+        items = data.items()
+    elif isinstance(data, list) and all(isinstance(item, dict) for item in data):
+        # Ступени и прогоны идентифицируются своим размером, а не позицией в списке.
+        items = ((str(item.get("rows", item.get("channels", index))), item) for index, item in enumerate(data))
+    else:
+        return {prefix: float(data)} if isinstance(data, (int, float)) and not isinstance(data, bool) else {}
+    flat: Dict[str, float] = {}
+    for key, value in items:
+        flat.update(flatten(value, f"{prefix}.{key}" if prefix else str(key)))
+    return flat
+
+
+def direction(metric: str) -> int:
+    """+1 — чем больше, тем лучше; -1 — чем меньше, тем лучше; 0 — не сравнивается."""
+    name = metric.rsplit(".", 1)[-1]
+    if "fps" in name or name.endswith("per_s"):
+        return 1
+    if name.endswith("_ms") or name.endswith("_mb"):
+        return -1
+    return 0
+
+
+def compare(
+    baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float
+) -> List[Tuple[str, float, float, float]]:
+    """Ухудшения больше ``tolerance``: (метрика, было, стало, относительное изменение)."""
+    before = flatten(baseline["results"])
+    after = flatten(current["results"])
+    regressions = []
+    for metric, old in before.items():
+        sign = direction(metric)
+        new = after.get(metric)
+        if not sign or new is None or old <= 0:
+            continue
+        change = (new - old) / old
+        if -sign * change > tolerance:
+            regressions.append((metric, old, new, change))
+    return regressions
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    results: Dict[str, Any] = {"pipeline": []}
+    for channels in args.channels:
+        pipeline_args = argparse.Namespace(
+            clip=args.clip,
+            channels=channels,
+            seconds=args.seconds,
+            resolution=args.resolution,
+            plates=args.plates,
+            preview=args.preview,
+            stub_models=args.stub_models,
+            timeout=args.timeout,
+        )
+        print(f"pipeline_bench: {channels} каналов", file=sys.stderr, flush=True)
+        results["pipeline"].append(pipeline_bench.run_with_args(pipeline_args))
+    if args.rows:
+        print(f"db_bench: {args.rows} строк", file=sys.stderr, flush=True)
+        results["db"] = db_bench.run_temporary(args.rows, args.repeats, args.single_inserts)
+    return {"environment": environment(), "config": vars(args), "results": results}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Набор сквозных бенчмарков с сохранением результата.")
+    parser.add_argument("--channels", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--clip", help="Записанный ролик; по умолчанию синтетический.")
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--resolution", default="1280x720")
+    parser.add_argument("--plates", type=int, default=3)
+    parser.add_argument("--preview", action="store_true")
+    parser.add_argument("--stub-models", action="store_true")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--rows", type=int, nargs="*", default=[1_000_000, 10_000_000])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--single-inserts", type=int, default=200)
+    parser.add_argument("--quick", action="store_true", help="Короткий прогон: 1 и 4 канала, 5 с, база 100k.")
+    parser.add_argument("--output", help=f"Файл результата (по умолчанию {RESULTS_DIR}/<дата>-<коммит>.json).")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения.")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Допустимое ухудшение (доля).")
+    parser.add_argument("--check", action="store_true", help="Код возврата 1 при ухудшениях.")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.channels, args.seconds, args.rows = [1, 4], 5.0, [100_000]
+
+    report = run(args)
+    output = args.output or os.path.join(
+        RESULTS_DIR,
+        f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{report['environment']['commit'] or 'nogit'}.json",
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, ensure_ascii=False, indent=2)
+    print(f"Результат: {output}")
+
+    for entry in report["results"]["pipeline"]:
+        print(
+            f"{entry['channels']:>3} каналов ({entry['models']}): {entry['fps_total']:.1f} кадр/с, "
+            f"RSS пик {entry['memory']['rss_peak_mb']:.0f} МБ"
+        )
+    if not args.compare:
+        return
+    with open(args.compare, encoding="utf-8") as handle:
+        baseline = json.load(handle)
+    regressions = compare(baseline, report, args.tolerance)
+    print(f"Сравнение с {args.compare} (коммит {baseline['environment'].get('commit')}): ухудшений {len(regressions)}")
+    for metric, old, new, change in regressions:
+        print(f"  {metric}: {old:.3f} -> {new:.3f} ({change:+.1%})")
+    if args.check and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""Видеофрагменты событий: несколько секунд до и после распознавания номера.
+
+``ClipRecorder`` держит для канала кольцевой буфер последних кадров в JPEG. Цикл канала
+только уменьшает кадр и кладет его в ограниченную очередь; сжатие, буфер и сборка
+фрагментов выполняются в потоке кодировщика канала, а запись MP4 — в отдельном потоке.
+Если кодировщик не успевает, кадры отбрасываются (``frames_dropped``), а не копятся;
+если не успевает запись, новые фрагменты пропускаются (``clips_skipped``).
+
+``max_bytes`` — общий лимит канала: в него входят кольцевой буфер, собираемый фрагмент
+и фрагменты в очереди записи. Кадры, общие для буфера и фрагмента, считаются дважды,
+поэтому фактически занятая память лимит не превышает.
+"""
+
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from logging_manager import get_logger
+from storage import EventDatabase
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class _Clip:
+    """Собираемый фрагмент: кадры из буфера до события и новые кадры до ``end``."""
+
+    start: float
+    end: float
+    timestamp: str
+    event_ids: List[int]
+    frames: List[Tuple[float, bytes]] = field(default_factory=list)
+    size: int = 0
+
+    def add(self, ts: float, data: bytes) -> None:
+        self.frames.append((ts, data))
+        self.size += len(data)
+
+
+class ClipRecorder:
+    """Кольцевой буфер кадров канала и запись фрагментов вокруг событий."""
+
+    # Недописанных фрагментов в очереди записи, после которых новые пропускаются.
+    MAX_PENDING_WRITES = 2
+    # Во сколько раз серия близких событий может растянуть фрагмент относительно pre + post.
+    MAX_EXTENSION = 3
+
+    def __init__(
+        self,
+        channel: str,
+        root: str = "data/clips",
+        db_path: Optional[str] = None,
+        pre_seconds: float = 5.0,
+        post_seconds: float = 5.0,
+        fps: float = 10.0,
+        width: int = 640,
+        quality: int = 70,
+        max_bytes: int = 64 * 1024**2,
+    ) -> None:
+        self.channel = channel
+        self.root = root
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.fps = max(1.0, fps)
+        self.width = width
+        self.quality = quality
+        self.max_bytes = max_bytes
+        self.database = EventDatabase(db_path) if db_path else None
+        self.frames_dropped = 0
+        self.clips_written = 0
+        self.clips_skipped = 0
+        self._interval = 1.0 / self.fps
+        self._last_push = float("-inf")
+        # Около секунды несжатых кадров: дальше кодировщик считается отстающим.
+        self._queue: "queue.Queue[Tuple[float, np.ndarray]]" = queue.Queue(maxsize=max(2, int(self.fps)))
+        self._ring: Deque[Tuple[float, bytes]] = deque()
+        self._ring_bytes = 0
+        self._active: Optional[_Clip] = None
+        self._triggers: List[Tuple[int, float, str]] = []
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._pending_writes = 0
+        self._pending_bytes = 0
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"clip-writer-{channel}")
+        self._thread = threading.Thread(target=self._run, name=f"clip-encoder-{channel}", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_config(
+        cls, channel: str, config: Optional[Dict[str, Any]], db_path: Optional[str] = None
+    ) -> Optional["ClipRecorder"]:
+        """Рекордер по разделу ``clips`` настроек; None, если фрагменты выключены."""
+        if not config or not config.get("enabled", False):
+            return None
+        return cls(
+            channel,
+            root=config.get("dir", "data/clips"),
+            db_path=db_path,
+            pre_seconds=float(config.get("pre_seconds", 5.0)),
+            post_seconds=float(config.get("post_seconds", 5.0)),
+            fps=float(config.get("fps", 10.0)),
+            width=int(config.get("width", 640)),
+            quality=int(config.get("quality", 70)),
+            max_bytes=int(float(config.get("max_mb_per_channel", 64)) * 1024**2),
+        )
+
+    # --- Вызывается из цикла канала ---
+    def push(self, frame: np.ndarray, ts: float) -> None:
+        """Передает кадр в буфер с частотой не выше ``fps``; не блокирует."""
+        if ts - self._last_push < self._interval:
+            return
+        self._last_push = ts
+        if self._queue.full():
+            # Кодировщик отстает: не тратим время на уменьшение кадра, который все равно не влезет.
+            self.frames_dropped += 1
+            return
+        height, width = frame.shape[:2]
+        if self.width and width > self.width:
+            size = (self.width, max(2, int(height * self.width / width) // 2 * 2))
+            # resize возвращает новый массив: превью может рисовать на исходном кадре.
+            small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        else:
+            small = frame.copy()
+        try:
+            self._queue.put_nowait((ts, small))
+        except queue.Full:
+            self.frames_dropped += 1
+
+    def trigger(self, event_id: int, ts: float, timestamp: str) -> None:
+        """Отмечает событие: фрагмент соберется из буфера и следующих ``post_seconds`` секунд."""
+        with self._lock:
+            self._triggers.append((event_id, ts, timestamp))
+
+    # --- Поток кодировщика ---
+    def _run(self) -> None:
+        while not self._closed.is_set() or not self._queue.empty():
+            try:
+                ts, frame = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            if not ok:
+                continue
+            data = buffer.tobytes()
+            if self._active is not None:
+                self._active.add(ts, data)
+            self._ring.append((ts, data))
+            self._ring_bytes += len(data)
+            self._handle_triggers()
+            active = self._active
+            if active is not None:
+                # Буфер можно сократить ради фрагмента, поэтому фрагмент ограничен тем,
+                # что не занято очередью записи.
+                over_limit = active.size + self._pending_bytes > self.max_bytes
+                if over_limit:
+                    logger.warning("Канал %s: фрагмент обрезан по лимиту памяти", self.channel)
+                if over_limit or ts >= active.end:
+                    self._finish()
+            while self._ring and (ts - self._ring[0][0] > self.pre_seconds or self.buffered_bytes() > self.max_bytes):
+                self._ring_bytes -= len(self._ring.popleft()[1])
+        self._handle_triggers()
+        if self._active is not None:
+            self._finish()
+
+    def _handle_triggers(self) -> None:
+        with self._lock:
+            triggers, self._triggers = self._triggers, []
+        for event_id, ts, timestamp in triggers:
+            active = self._active
+            if active is not None:
+                # Близкие события попадают в один фрагмент, который продлевается до предела.
+                limit = active.start + self.MAX_EXTENSION * (self.pre_seconds + self.post_seconds)
+                active.end = min(max(active.end, ts + self.post_seconds), limit)
+                active.event_ids.append(event_id)
+                continue
+            clip = _Clip(ts - self.pre_seconds, ts + self.post_seconds, timestamp, [event_id])
+            for frame_ts, data in self._ring:
+                if frame_ts >= clip.start:
+                    clip.add(frame_ts, data)
+            self._active = clip
+
+    def _finish(self) -> None:
+        clip, self._active = self._active, None
+        if not clip.frames:
+            return
+        with self._lock:
+            if self._pending_writes >= self.MAX_PENDING_WRITES:
+                self.clips_skipped += 1
+                logger.warning("Канал %s: запись фрагментов не успевает, фрагмент пропущен", self.channel)
+                return
+            self._pending_writes += 1
+            self._pending_bytes += clip.size
+        self._writer.submit(self._write, clip)
+
+    # --- Поток записи ---
+    def _clip_path(self, clip: _Clip) -> str:
+        try:
+            moment = datetime.fromisoformat(clip.timestamp)
+        except ValueError:
+            moment = datetime.now(timezone.utc)
+        directory = os.path.join(self.root, moment.strftime("%Y"), moment.strftime("%m"), moment.strftime("%d"))
+        os.makedirs(directory, exist_ok=True)
+        safe_channel = "".join(ch if ch.isalnum() else "_" for ch in self.channel)
+        return os.path.join(directory, f"{safe_channel}_{moment.strftime('%H%M%S')}_{clip.event_ids[0]}.mp4")
+
+    def _write(self, clip: _Clip) -> None:
+        try:
+            first = cv2.imdecode(np.frombuffer(clip.frames[0][1], np.uint8), cv2.IMREAD_COLOR)
+            height, width = first.shape[:2]
+            duration = clip.frames[-1][0] - clip.frames[0][0]
+            # Частота по фактическим меткам времени: пропуски кадров не ускоряют видео.
+            fps = (len(clip.frames) - 1) / duration if duration > 0 else self.fps
+            path = self._clip_path(clip)
+            writer = cv2.VideoWriter(
+                path, cv2.VideoWriter_fourcc(*"mp4v"), min(self.fps, max(1.0, fps)), (width, height)
+            )
+            try:
+                for _, data in clip.frames:
+                    writer.write(cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR))
+            finally:
+                writer.release()
+            if self.database is not None:
+                self.database.attach_clip(clip.event_ids, path)
+            self.clips_written += 1
+            logger.info(
+                "Канал %s: записан фрагмент %s (%.1f с, событий: %d)", self.channel, path, duration, len(clip.event_ids)
+            )
+        except Exception:  # noqa: BLE001
+            logger.exception("Канал %s: не удалось записать фрагмент", self.channel)
+        finally:
+            with self._lock:
+                self._pending_writes -= 1
+                self._pending_bytes -= clip.size
+
+    def buffered_bytes(self) -> int:
+        """Память канала в счет ``max_bytes``: буфер, собираемый фрагмент и очередь записи."""
+        active = self._active
+        return self._ring_bytes + self._pending_bytes + (active.size if active is not None else 0)
+
+    def close(self) -> None:
+        """Дописывает начатый фрагмент из уже полученных кадров и останавливает потоки."""
+        self._closed.set()
+        self._thread.join()
+        self._writer.shutdown(wait=True)
@@ -0,0 +1,208 @@
+"""Сопоставление событий разных каналов: проезды между парами камер.
+
+Пайплайн канала подавляет повторы только внутри себя, поэтому машина, прошедшая въезд
+и выезд, дает два несвязанных события. ``Correlator`` связывает их по настроенным парам
+каналов (``from`` → ``to``): событие на первом канале открывает проезд, событие с тем же
+номером на втором в пределах ``max_seconds`` закрывает его. Для пары камер на дороге
+длительность проезда — время в пути, для въезда и выезда зоны — время пребывания.
+
+Открытые проезды каждой пары хранятся в словаре «номер → вход» в порядке входа, поэтому
+проверка «машина внутри», число машин внутри (заполненность) и вытеснение просроченных
+записей с начала словаря стоят O(1). Номера сравниваются в канонической форме списка
+розыска: путаницы OCR между камерами (``0``/``O``, ``8``/``B``…) не разрывают проезд.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from logging_manager import get_logger
+from storage import EventDatabase
+from watchlist import canonical_plate, normalize_plate
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class ChannelPair:
+    """Пара каналов: проезд начинается на ``start`` и заканчивается на ``end``."""
+
+    name: str
+    start: str
+    end: str
+    max_seconds: float = 86400.0
+
+
+@dataclass(frozen=True)
+class Passage:
+    """Завершенный проезд: номер, события начала и конца и длительность."""
+
+    pair: str
+    plate: str
+    started_at: str
+    finished_at: str
+    duration_seconds: float
+    start_event_id: Optional[int] = None
+    end_event_id: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class _Entry(NamedTuple):
+    ts: float
+    timestamp: str
+    event_id: Optional[int]
+    plate: str
+
+
+class _PairState:
+    def __init__(self, pair: ChannelPair) -> None:
+        self.pair = pair
+        # Открытые проезды по канонической форме номера; первый — самый старый.
+        self.inside: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    def expire(self, now: float) -> None:
+        deadline = now - self.pair.max_seconds
+        while self.inside:
+            entry = next(iter(self.inside.values()))
+            if entry.ts >= deadline:
+                break
+            self.inside.popitem(last=False)
+
+
+def _epoch(timestamp: str) -> float:
+    moment = datetime.fromisoformat(timestamp)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+class Correlator:
+    """Потоковое сопоставление событий каналов по парам; один экземпляр на процесс.
+
+    ``observe`` вызывается из потоков каналов для каждого зафиксированного события
+    и возвращает завершенные им проезды.
+    """
+
+    def __init__(self, pairs: Iterable[ChannelPair]) -> None:
+        self._pairs: Dict[str, _PairState] = {}
+        self._by_start: Dict[str, List[_PairState]] = {}
+        self._by_end: Dict[str, List[_PairState]] = {}
+        for pair in pairs:
+            if pair.start == pair.end:
+                raise ValueError(f"Пара {pair.name}: начало и конец проезда — один канал {pair.start}")
+            if pair.name in self._pairs:
+                raise ValueError(f"Пара {pair.name} задана дважды")
+            state = _PairState(pair)
+            self._pairs[pair.name] = state
+            self._by_start.setdefault(pair.start, []).append(state)
+            self._by_end.setdefault(pair.end, []).append(state)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["Correlator"]:
+        """Коррелятор по разделу ``correlation`` настроек; None, если пары не заданы."""
+        if not config.get("enabled", False):
+            return None
+        pairs = [
+            ChannelPair(
+                name=str(item.get("name") or f"{item['from']} → {item['to']}"),
+                start=str(item["from"]),
+                end=str(item["to"]),
+                max_seconds=float(item.get("max_seconds", 86400.0)),
+            )
+            for item in config.get("pairs", [])
+        ]
+        if not pairs:
+            return None
+        return cls(pairs)
+
+    @property
+    def pairs(self) -> List[ChannelPair]:
+        return [state.pair for state in self._pairs.values()]
+
+    @staticmethod
+    def plate_key(plate: str) -> str:
+        return canonical_plate(normalize_plate(plate))
+
+    def observe(self, event: Dict[str, Any]) -> List[Passage]:
+        """Учитывает событие канала; возвращает проезды, которые оно завершило."""
+        channel = event.get("channel")
+        closing = self._by_end.get(channel, ())
+        opening = self._by_start.get(channel, ())
+        if not closing and not opening:
+            return []
+        key = self.plate_key(event["plate"])
+        ts = _epoch(event["timestamp"])
+        entry = _Entry(ts, event["timestamp"], event.get("id"), event["plate"])
+        passages = []
+        with self._lock:
+            # Сначала закрываем: канал может завершать одну пару и начинать следующую (A → B → C).
+            for state in closing:
+                state.expire(ts)
+                started = state.inside.pop(key, None)
+                if started is None or started.ts > ts:
+                    continue
+                passages.append(
+                    Passage(
+                        pair=state.pair.name,
+                        plate=event["plate"],
+                        started_at=started.timestamp,
+                        finished_at=entry.timestamp,
+                        duration_seconds=round(ts - started.ts, 3),
+                        start_event_id=started.event_id,
+                        end_event_id=entry.event_id,
+                    )
+                )
+            for state in opening:
+                state.expire(ts)
+                # Повторный вход без выхода (выезд не распознан) открывает проезд заново.
+                state.inside.pop(key, None)
+                state.inside[key] = entry
+        return passages
+
+    def is_inside(self, pair: str, plate: str) -> bool:
+        state = self._pairs[pair]
+        with self._lock:
+            state.expire(time.time())
+            return self.plate_key(plate) in state.inside
+
+    def inside(self, pair: str) -> List[Dict[str, Any]]:
+        """Открытые проезды пары (машины внутри) от самых старых к новым."""
+        state = self._pairs[pair]
+        with self._lock:
+            state.expire(time.time())
+            return [
+                {"plate": entry.plate, "started_at": entry.timestamp, "event_id": entry.event_id}
+                for entry in state.inside.values()
+            ]
+
+    def occupancy(self) -> Dict[str, int]:
+        """Число открытых проездов по парам."""
+        now = time.time()
+        with self._lock:
+            for state in self._pairs.values():
+                state.expire(now)
+            return {name: len(state.inside) for name, state in self._pairs.items()}
+
+    def restore(self, database: EventDatabase) -> int:
+        """Восстанавливает открытые проезды по событиям из БД после перезапуска."""
+        if not self._pairs:
+            return 0
+        window = max(state.pair.max_seconds for state in self._pairs.values())
+        since = (datetime.now(timezone.utc) - timedelta(seconds=window)).isoformat()
+        channels = sorted(set(self._by_start) | set(self._by_end))
+        rows = database.fetch_since(since, channels)
+        for row in rows:
+            # Проезды, завершенные при восстановлении, уже записаны в БД в прошлом запуске.
+            self.observe(dict(row))
+        logger.info("Коррелятор каналов: восстановлено по %d событиям, внутри: %s", len(rows), self.occupancy())
+        return len(rows)
+
+    def metrics(self) -> Dict[str, float]:
+        """Показатели для ``REGISTRY.register_gauge`` (заполненность по парам)."""
+        return self.occupancy()
@@ -0,0 +1,72 @@
+"""Архитектура CRNN (CNN + двунаправленный LSTM) для распознавания символов номера.
+
+Вынесена из ``detector.py``: torch нужен только при сборке модели, а сам пайплайн
+импортируется и без него (например, бенчмарком с ``--stub-models``).
+"""
+
+import torch.nn as nn
+
+
+class CRNN(nn.Module):
+    def __init__(self, num_classes):
+        super(CRNN, self).__init__()
+        
+        # --- CNN часть (Глаза) ---
+        self.cnn = nn.Sequential(
+            nn.Conv2d(1, 64, kernel_size=3, padding=1), 
+            nn.ReLU(True), 
+            nn.MaxPool2d(2, 2), # -> height: 16
+            
+            nn.Conv2d(64, 128, kernel_size=3, padding=1), 
+            nn.ReLU(True), 
+            nn.MaxPool2d(2, 2), # -> height: 8
+            
+            nn.Conv2d(128, 256, kernel_size=3, padding=1), 
+            nn.BatchNorm2d(256), 
+            nn.ReLU(True),
+            
+            nn.Conv2d(256, 256, kernel_size=3, padding=1), 
+            nn.ReLU(True), 
+            nn.MaxPool2d((2, 1), (2, 1)), # -> height: 4
+            
+            nn.Conv2d(256, 512, kernel_size=3, padding=1), 
+            nn.BatchNorm2d(512), 
+            nn.ReLU(True),
+            
+            nn.Conv2d(512, 512, kernel_size=3, padding=1), 
+            nn.ReLU(True), 
+            nn.MaxPool2d((2, 1), (2, 1)) # -> height: 2. ЭТОГО СЛОЯ НЕ БЫЛО, ДОБАВЛЯЕМ ЕГО!
+        )
+        
+        # --- RNN часть (Мозг) ---
+        
+        self.rnn = nn.LSTM(512 * 2, 256, bidirectional=True, num_layers=2, batch_first=True)
+        
+        # --- Classifier (Рот) ---
+        self.classifier = nn.Linear(512, num_classes)
+
+    def forward(self, x):
+        # Прогоняем через CNN
+        x = self.cnn(x) # -> (batch, 512, 2, 32)
+        
+        
+        # "Распрямляем" выход CNN для подачи в RNN
+        # объединяем каналы и высоту
+        batch, channels, height, width = x.size()
+        # Заменяем .view() на .reshape() для большей надежности
+        x = x.reshape(batch, channels * height, width) 
+        
+        # Меняем оси местами для RNN, который ожидает (batch, seq_len, features)
+        x = x.permute(0, 2, 1) # -> (batch, 32, 1024)
+        
+        # Прогоняем через RNN
+        x, _ = self.rnn(x) # -> (batch, 32, 512)
+        
+        # Прогоняем через классификатор
+        x = self.classifier(x) # -> (batch, 32, num_classes)
+        
+        # Для CTCLoss нам нужен формат (sequence_length, batch, num_classes)
+        x = x.permute(1, 0, 2) # -> (32, batch, num_classes)
+        x = nn.functional.log_softmax(x, dim=2)
+        
+        return x
@@ -1,20 +1,25 @@
 import argparse
+import glob
+import hashlib
 import os
+import tempfile
 import time
-from typing import List, Dict, Any, Tuple
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Sequence, Tuple
 import logging
 
 import cv2
-import torch
-import torch.nn as nn
-from torchvision import transforms
-from ultralytics import YOLO
-import torch.ao.quantization.quantize_fx as quantize_fx
-from torch.ao.quantization import QConfigMapping
 import numpy as np
 
+import backends
 from logging_manager import LoggingManager, get_logger
+from preprocessing import PlateRectifier
+from tracker import ByteTracker
 
+# torch, torchvision и ultralytics импортируются в YOLODetector и CRNNRecognizer: сам
+# пайплайн (ANPR_Pipeline, агрегатор, Config) работает и без них, например с заглушками моделей.
+if TYPE_CHECKING:
+    import torch
+    import torch.nn as nn
 
 
 class Config:
@@ -26,104 +31,164 @@ class Config:
     OCR_IMG_WIDTH: int = 128
     OCR_ALPHABET: str = '0123456789ABCEHKMOPTXY'
     OCR_CONFIDENCE_THRESHOLD: float = 0.6
+    # Кэшировать квантованный CRNN как TorchScript рядом с весами (ключ — хэш весов и версия torch).
+    OCR_SCRIPTED_CACHE: bool = True
 
     DETECTION_CONFIDENCE_THRESHOLD: float = 0.5
+    # Длинная сторона входа YOLO; для экспортированных моделей задается при экспорте.
+    DETECTOR_IMGSZ: int = 640
 
     TRACK_BEST_SHOTS: int = 3
+    # Апостериорная вероятность консенсуса, после которой номер выдается досрочно.
+    CONSENSUS_THRESHOLD: float = 0.9
 
-    DEVICE: torch.device = torch.device("cpu")
+    # Отбор бестшотов: OCR запускается только для K лучших по качеству кропов трека.
+    OCR_TOP_K: int = 5
+    MIN_PLATE_QUALITY: float = 0.3
 
+    # Перепроверка номера у трека с зафиксированным консенсусом (0 — не перепроверять).
+    OCR_REVERIFY_SECONDS: float = 0.0
+    # Трек, не появлявшийся дольше этого времени, удаляется вместе с буферами.
+    TRACK_TTL_SECONDS: float = 30.0
 
-logger = get_logger(__name__)
+    # Строка вида "cpu"/"cuda:0": torch и ultralytics принимают ее наравне с torch.device.
+    DEVICE: str = "cpu"
+    # Бэкенд инференса: torch, onnxruntime или openvino (см. backends.py и settings.json → inference).
+    INFERENCE_BACKEND: str = "torch"
+    INFERENCE_THREADS: int = 0
 
 
-class CRNN(nn.Module):
-    def __init__(self, num_classes):
-        super(CRNN, self).__init__()
-        
-        # --- CNN часть (Глаза) ---
-        self.cnn = nn.Sequential(
-            nn.Conv2d(1, 64, kernel_size=3, padding=1), 
-            nn.ReLU(True), 
-            nn.MaxPool2d(2, 2), # -> height: 16
-            
-            nn.Conv2d(64, 128, kernel_size=3, padding=1), 
-            nn.ReLU(True), 
-            nn.MaxPool2d(2, 2), # -> height: 8
-            
-            nn.Conv2d(128, 256, kernel_size=3, padding=1), 
-            nn.BatchNorm2d(256), 
-            nn.ReLU(True),
-            
-            nn.Conv2d(256, 256, kernel_size=3, padding=1), 
-            nn.ReLU(True), 
-            nn.MaxPool2d((2, 1), (2, 1)), # -> height: 4
-            
-            nn.Conv2d(256, 512, kernel_size=3, padding=1), 
-            nn.BatchNorm2d(512), 
-            nn.ReLU(True),
-            
-            nn.Conv2d(512, 512, kernel_size=3, padding=1), 
-            nn.ReLU(True), 
-            nn.MaxPool2d((2, 1), (2, 1)) # -> height: 2. ЭТОГО СЛОЯ НЕ БЫЛО, ДОБАВЛЯЕМ ЕГО!
-        )
-        
-        # --- RNN часть (Мозг) ---
-        
-        self.rnn = nn.LSTM(512 * 2, 256, bidirectional=True, num_layers=2, batch_first=True)
-        
-        # --- Classifier (Рот) ---
-        self.classifier = nn.Linear(512, num_classes)
-
-    def forward(self, x):
-        # Прогоняем через CNN
-        x = self.cnn(x) # -> (batch, 512, 2, 32)
-        
-        
-        # "Распрямляем" выход CNN для подачи в RNN
-        # объединяем каналы и высоту
-        batch, channels, height, width = x.size()
-        # Заменяем .view() на .reshape() для большей надежности
-        x = x.reshape(batch, channels * height, width) 
-        
-        # Меняем оси местами для RNN, который ожидает (batch, seq_len, features)
-        x = x.permute(0, 2, 1) # -> (batch, 32, 1024)
-        
-        # Прогоняем через RNN
-        x, _ = self.rnn(x) # -> (batch, 32, 512)
-        
-        # Прогоняем через классификатор
-        x = self.classifier(x) # -> (batch, 32, num_classes)
-        
-        # Для CTCLoss нам нужен формат (sequence_length, batch, num_classes)
-        x = x.permute(1, 0, 2) # -> (32, batch, num_classes)
-        x = nn.functional.log_softmax(x, dim=2)
-        
-        return x
+logger = get_logger(__name__)
 
 
 class YOLODetector:
-    """Обертка для модели детекции YOLO."""
+    """Обертка для модели детекции YOLO.
 
-    def __init__(self, model_path: str, device: torch.device):
-        self.model = YOLO(model_path)
-        self.model.to(device)
+    ``imgsz`` — длинная сторона входа сети. При ``rect`` размер входа подбирается под
+    пропорции ROI (кратно шагу сети), поэтому широкая область не дополняется до квадрата.
+    ``half_resolution`` уменьшает кадр вдвое (INTER_AREA) и вдвое уменьшает вход сети —
+    для камер на въезде, где номер занимает большую часть кадра.
+    """
+
+    STRIDE: int = 32
+
+    def __init__(
+        self,
+        model_path: str,
+        device: "torch.device | str",
+        backend: str = Config.INFERENCE_BACKEND,
+        imgsz: int = Config.DETECTOR_IMGSZ,
+        rect: bool = True,
+        half_resolution: bool = False,
+    ):
+        self.imgsz = max(self.STRIDE, int(imgsz))
+        self.rect = rect
+        self.half_resolution = half_resolution
+        from ultralytics import YOLO
+
+        resolved_path = backends.resolve_yolo_model(model_path, backends.normalize_backend(backend))
+        self.model = YOLO(resolved_path)
+        if resolved_path == model_path:
+            # Экспортированные ONNX/OpenVINO-модели исполняются вне PyTorch и .to() не поддерживают.
+            self.model.to(device)
+        self.backend = "torch" if resolved_path == model_path else backend
         self.device = device
+        if self.backend != "torch":
+            self._check_exported_input(resolved_path)
         self._tracking_supported = True
-        logger.info("Детектор YOLO успешно загружен (model=%s, device=%s)", model_path, device)
+        # Встроенный трекер подхватывает ID треков, если трекинг ultralytics недоступен.
+        self._fallback_tracker = ByteTracker(high_threshold=Config.DETECTION_CONFIDENCE_THRESHOLD)
+        logger.info(
+            "Детектор YOLO успешно загружен (model=%s, device=%s, backend=%s)", resolved_path, device, self.backend
+        )
 
-    def detect(self, frame: np.ndarray) -> List[Dict[str, Any]]:
-        """Обнаруживает номера на ОДНОМ кадре (для изображений)."""
-        detections = self.model.predict(frame, verbose=False, device=self.device)
-        results = []
-        for det in detections[0].boxes.data:
-            x1, y1, x2, y2, conf, _ = det.cpu().numpy()
-            if conf >= Config.DETECTION_CONFIDENCE_THRESHOLD:
-                results.append({"bbox": [int(x1), int(y1), int(x2), int(y2)], "confidence": float(conf)})
-        return results
+    def _check_exported_input(self, path: str) -> None:
+        """Предупреждает, если вход экспортированной модели не совпадает с ``imgsz`` канала."""
+        exported = backends.exported_yolo_imgsz(path)
+        imgsz = self._network_imgsz()
+        if exported is not None and max(exported) != imgsz:
+            logger.warning(
+                "Модель YOLO %s экспортирована с входом %dx%d, а канал задает imgsz=%d: вход канала "
+                "не применяется к ONNX/OpenVINO, переэкспортируйте модель (python -m backends --imgsz %d)",
+                path,
+                exported[0],
+                exported[1],
+                imgsz,
+                imgsz,
+            )
+
+    def detect(self, frame: np.ndarray, min_confidence: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Обнаруживает номера на ОДНОМ кадре (для изображений).
+
+        ``min_confidence`` позволяет получить и неуверенные детекции (нужны второму этапу ByteTracker).
+        """
+        return self.detect_batch([frame], min_confidence)[0]
+
+    def detect_batch(
+        self, frames: Sequence[np.ndarray], min_confidence: Optional[float] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Детекция на пачке кадров одного источника за один вызов сети (пакетная обработка архива)."""
+        if not frames:
+            return []
+        threshold = Config.DETECTION_CONFIDENCE_THRESHOLD if min_confidence is None else min_confidence
+        prepared = [self._prepare_input(frame) for frame in frames]
+        # Кадры одного источника имеют одинаковый размер, поэтому вход сети общий.
+        predict_kwargs = prepared[0][1]
+        if min_confidence is not None:
+            predict_kwargs["conf"] = min_confidence
+        inputs = [item[0] for item in prepared]
+        detections = self.model.predict(inputs if len(inputs) > 1 else inputs[0], **predict_kwargs)
+        batch_results: List[List[Dict[str, Any]]] = []
+        for result, (_, _, (scale_x, scale_y)) in zip(detections, prepared):
+            results = []
+            for det in result.boxes.data.cpu().numpy():
+                x1, y1, x2, y2, conf, _ = det
+                if conf >= threshold:
+                    results.append(
+                        {
+                            "bbox": [int(x1 * scale_x), int(y1 * scale_y), int(x2 * scale_x), int(y2 * scale_y)],
+                            "confidence": float(conf),
+                        }
+                    )
+            batch_results.append(results)
+        return batch_results
+
+    def _network_imgsz(self) -> int:
+        """Длинная сторона входа сети с учетом ``half_resolution``, кратная шагу сети."""
+        imgsz = self.imgsz // 2 if self.half_resolution else self.imgsz
+        return max(self.STRIDE, imgsz - imgsz % self.STRIDE)
+
+    def input_size(self, frame_shape: Tuple[int, ...]) -> Any:
+        """Размер входа сети для кадра: ``imgsz`` или прямоугольник (h, w) под пропорции ROI."""
+        imgsz = self._network_imgsz()
+        if not self.rect:
+            return imgsz
+        height, width = frame_shape[:2]
+        scale = imgsz / max(height, width, 1)
+        stride = self.STRIDE
+        return (
+            max(stride, int(np.ceil(height * scale / stride)) * stride),
+            max(stride, int(np.ceil(width * scale / stride)) * stride),
+        )
+
+    def _prepare_input(self, frame: np.ndarray) -> Tuple[np.ndarray, Dict[str, Any], Tuple[float, float]]:
+        """Кадр для сети, аргументы ultralytics и множители обратного пересчета рамок."""
+        scale = (1.0, 1.0)
+        if self.half_resolution:
+            height, width = frame.shape[:2]
+            small_w, small_h = max(1, width // 2), max(1, height // 2)
+            frame = cv2.resize(frame, (small_w, small_h), interpolation=cv2.INTER_AREA)
+            scale = (width / small_w, height / small_h)
+        predict_kwargs: Dict[str, Any] = {"verbose": False, "device": self.device}
+        if self.backend == "torch":
+            # Экспортированные модели имеют фиксированный вход, заданный при экспорте.
+            # Пропорции уменьшенного кадра те же, половинный imgsz учитывает input_size.
+            predict_kwargs["imgsz"] = self.input_size(frame.shape)
+        return frame, predict_kwargs, scale
 
     def _track_internal(self, frame: np.ndarray) -> List[Dict[str, Any]]:
-        detections = self.model.track(frame, persist=True, verbose=False, device=self.device)
+        frame, predict_kwargs, (scale_x, scale_y) = self._prepare_input(frame)
+        detections = self.model.track(frame, persist=True, **predict_kwargs)
         results: List[Dict[str, Any]] = []
         if detections[0].boxes.id is None:
             return results
@@ -136,39 +201,58 @@ class YOLODetector:
             if conf >= Config.DETECTION_CONFIDENCE_THRESHOLD:
                 results.append(
                     {
-                        "bbox": [int(box[0]), int(box[1]), int(box[2]), int(box[3])],
+                        "bbox": [
+                            int(box[0] * scale_x),
+                            int(box[1] * scale_y),
+                            int(box[2] * scale_x),
+                            int(box[3] * scale_y),
+                        ],
                         "confidence": float(conf),
                         "track_id": track_id,
                     }
                 )
         return results
 
+    def _track_builtin(self, frame: np.ndarray) -> List[Dict[str, Any]]:
+        tracker = self._fallback_tracker
+        return tracker.update(self.detect(frame, min_confidence=tracker.low_threshold))
+
     def track(self, frame: np.ndarray) -> List[Dict[str, Any]]:
-        """Отслеживает номера в последовательности кадров (для видео) с откатом к детекции."""
+        """Отслеживает номера трекером ultralytics с откатом на встроенный ByteTracker.
+
+        Для многоканальной работы предпочтительнее ``detect`` + собственный ``ByteTracker``
+        на канал: состояние трекера ultralytics хранится внутри модели.
+        """
         if not self._tracking_supported:
-            return self.detect(frame)
+            return self._track_builtin(frame)
 
         try:
             return self._track_internal(frame)
         except ModuleNotFoundError:
             # Отсутствующие зависимости трекера (например, lap/byte-track) ломают поток при повторном
-            # запуске. Запоминаем, что трекинг недоступен, и продолжаем с обычной детекцией.
+            # запуске. Запоминаем, что трекинг недоступен, и продолжаем со встроенным трекером.
             self._tracking_supported = False
-            logger.warning("Отключаем трекинг YOLO: отсутствуют зависимости")
-            return self.detect(frame)
+            logger.warning("Отключаем трекинг YOLO: отсутствуют зависимости, используем встроенный трекер")
+            return self._track_builtin(frame)
         except Exception:
             # Любые другие ошибки трекера (например, при одновременном запуске нескольких каналов)
-            # не должны приводить к падению — отключаем трекинг и продолжаем детекцию.
+            # не должны приводить к падению — переходим на встроенный трекер, ID треков сохраняются.
             self._tracking_supported = False
-            logger.exception("Отключаем трекинг YOLO из-за ошибки, переключаемся на detect")
-            return self.detect(frame)
-    # Ниже оставлены только методы с откатом на детекцию, чтобы избежать падений из-за
-    # необязательных зависимостей трекера.
+            logger.exception("Отключаем трекинг YOLO из-за ошибки, переключаемся на встроенный трекер")
+            return self._track_builtin(frame)
 
 
 class CRNNRecognizer:
     """Обертка для квантованной модели распознавания CRNN."""
-    def __init__(self, model_path: str, device: torch.device):
+    def __init__(
+        self,
+        model_path: str,
+        device: "torch.device | str",
+        backend: str = Config.INFERENCE_BACKEND,
+        threads: int = Config.INFERENCE_THREADS,
+    ):
+        from torchvision import transforms
+
         self.device = device
         self.transform = transforms.Compose([
             transforms.ToPILImage(), transforms.Grayscale(),
@@ -179,6 +263,23 @@ class CRNNRecognizer:
         self.int_to_char[0] = '' # CTC Blank token
         
         
+        runtime = backends.create_crnn_backend(backends.normalize_backend(backend), model_path, threads)
+        if runtime is not None:
+            self.model = None
+            self.backend = runtime
+            logger.info("Распознаватель OCR загружен в бэкенд %s (model=%s)", runtime.name, model_path)
+        else:
+            self.model = self._load_model(model_path, device)
+            self.backend = backends.TorchCrnnBackend(self.model)
+
+    @staticmethod
+    def _build_quantized(model_path: str, device: "torch.device | str") -> "nn.Module":
+        import torch
+        import torch.ao.quantization.quantize_fx as quantize_fx
+        from torch.ao.quantization import QConfigMapping
+
+        from crnn_model import CRNN
+
         num_classes = len(Config.OCR_ALPHABET) + 1
         
         # 1. Создаем "пустой" скелет модели и переводим в режим инференса
@@ -192,43 +293,130 @@ class CRNNRecognizer:
         
         # 3. И только теперь загружаем сохраненные веса
         model_quantized.load_state_dict(torch.load(model_path, map_location=device))
-        self.model = model_quantized
         logger.info("Распознаватель OCR (INT8) успешно загружен (model=%s, device=%s)", model_path, device)
+        return model_quantized
+
+    @staticmethod
+    def scripted_cache_path(model_path: str) -> str:
+        """Путь TorchScript-кэша: рядом с весами, с хэшем весов и версией torch в имени."""
+        with open(model_path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:16]
+        import torch
+
+        torch_tag = torch.__version__.replace("+", "_")
+        return f"{os.path.splitext(model_path)[0]}.{digest}.torch-{torch_tag}.ts"
+
+    @classmethod
+    def _load_model(cls, model_path: str, device: "torch.device | str") -> "nn.Module":
+        if not Config.OCR_SCRIPTED_CACHE:
+            return cls._build_quantized(model_path, device)
+
+        cache_path = cls.scripted_cache_path(model_path)
+        if os.path.exists(cache_path):
+            import torch
+
+            try:
+                model = torch.jit.load(cache_path, map_location=device).eval()
+                logger.info("Распознаватель OCR (INT8, TorchScript) загружен из кэша %s", cache_path)
+                return model
+            except Exception:  # noqa: BLE001
+                logger.warning("Кэш CRNN %s поврежден, собираем модель заново", cache_path, exc_info=True)
+
+        model = cls._build_quantized(model_path, device)
+        cls._save_scripted(model, model_path, cache_path)
+        return model
+
+    @staticmethod
+    def _save_scripted(model: "nn.Module", model_path: str, cache_path: str) -> bool:
+        """Трассирует и замораживает квантованную модель; сохраняет, только если выход совпадает."""
+        import torch
+
+        example = torch.randn(1, 1, Config.OCR_IMG_HEIGHT, Config.OCR_IMG_WIDTH)
+        try:
+            with torch.no_grad():
+                scripted = torch.jit.freeze(torch.jit.trace(model, example).eval())
+                if not torch.allclose(scripted(example), model(example), atol=1e-4):
+                    logger.warning("TorchScript-версия CRNN расходится с исходной, кэш не сохранен")
+                    return False
+            # Уникальное имя: процессы пакетной обработки могут сохранять кэш одновременно.
+            fd, tmp_path = tempfile.mkstemp(
+                prefix=f".{os.path.basename(cache_path)}-", suffix=".tmp", dir=os.path.dirname(cache_path) or "."
+            )
+            os.close(fd)
+            try:
+                torch.jit.save(scripted, tmp_path)
+                os.replace(tmp_path, cache_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except Exception:  # noqa: BLE001
+            logger.warning("Не удалось сохранить TorchScript-кэш CRNN", exc_info=True)
+            return False
+        # Кэши от прежних весов или версий torch больше не подойдут.
+        base = os.path.splitext(model_path)[0]
+        for stale in glob.glob(f"{glob.escape(base)}.*.torch-*.ts"):
+            if stale != cache_path:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+        logger.info("TorchScript-кэш CRNN сохранен: %s", cache_path)
+        return True
 
-    @torch.no_grad()
     def recognize(self, plate_image: np.ndarray) -> tuple[str, float]:
-        preprocessed_plate = self.transform(plate_image).unsqueeze(0).to(self.device)
-        preds = self.model(preprocessed_plate)
-        return self._decode_with_confidence(preds)
+        text, confidence, _ = self.recognize_detailed(plate_image)
+        return text, confidence
+
+    def recognize_detailed(self, plate_image: np.ndarray) -> tuple[str, float, list[float]]:
+        """Возвращает текст, среднюю уверенность и уверенность каждого символа."""
+        return self.recognize_batch([plate_image])[0]
+
+    def recognize_batch(self, plate_images: Sequence[np.ndarray]) -> List[tuple[str, float, list[float]]]:
+        """Распознает несколько кропов одним вызовом CRNN."""
+        if not plate_images:
+            return []
+        import torch
+
+        with torch.no_grad():
+            batch = torch.stack([self.transform(image) for image in plate_images]).to(self.device)
+            preds = self.backend(batch)
+        results = []
+        for index in range(len(plate_images)):
+            text, char_confidences = self._decode_chars(preds, index)
+            results.append((text, self._average_confidence(char_confidences), char_confidences))
+        return results
 
-    def _decode_with_confidence(self, log_probs: torch.Tensor) -> tuple[str, float]:
+    def _decode_with_confidence(self, log_probs: "torch.Tensor") -> tuple[str, float]:
         """Декодирует CTC-выход и возвращает текст и уверенность (0..1)."""
-        # log_probs: (seq_len, batch, num_classes)
-        probs = log_probs.permute(1, 0, 2)[0]  # (seq_len, num_classes)
-        time_steps = probs.size(0)
+        text, char_confidences = self._decode_chars(log_probs)
+        return text, self._average_confidence(char_confidences)
+
+    @staticmethod
+    def _average_confidence(char_confidences: list[float]) -> float:
+        if not char_confidences:
+            return 0.0
+        # Усредняем уверенность по символам, чтобы штрафовать длинные шумные последовательности.
+        return sum(char_confidences) / len(char_confidences)
+
+    def _decode_chars(self, log_probs: "torch.Tensor", index: int = 0) -> tuple[str, list[float]]:
+        """Жадно декодирует CTC-выход элемента батча, сохраняя уверенность каждого символа."""
+        # log_probs: (seq_len, batch, num_classes); максимум по всем шагам берем одним вызовом.
+        best_log_probs, best_indices = log_probs[:, index, :].max(dim=1)
+        char_indices = best_indices.tolist()
+        char_probs = best_log_probs.exp().tolist()
 
         decoded_chars: list[str] = []
         char_confidences: list[float] = []
         last_char_idx = 0
 
-        for t in range(time_steps):
-            timestep_log_probs = probs[t]
-            char_idx = int(torch.argmax(timestep_log_probs).item())
-            char_conf = float(torch.exp(torch.max(timestep_log_probs)).item())
-
+        for char_idx, char_conf in zip(char_indices, char_probs):
             if char_idx != 0 and char_idx != last_char_idx:
                 decoded_chars.append(self.int_to_char.get(char_idx, ''))
                 char_confidences.append(char_conf)
 
             last_char_idx = char_idx
 
-        text = "".join(decoded_chars)
-        if not char_confidences:
-            return text, 0.0
-
-        # Усредняем уверенность по символам, чтобы штрафовать длинные шумные последовательности.
-        avg_confidence = sum(char_confidences) / len(char_confidences)
-        return text, avg_confidence
+        return "".join(decoded_chars), char_confidences
 
 class Visualizer:
     """Отвечает за отрисовку результатов."""
@@ -236,43 +424,258 @@ class Visualizer:
     def draw_results(frame: np.ndarray, results: List[Dict[str, Any]]) -> np.ndarray:
         for res in results:
             x1, y1, x2, y2 = res['bbox']
-            text = res.get('text', '')
+            text = res.get('text') or res.get('locked_text', '')
             cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
             cv2.putText(frame, text, (x1, y1 - 10), 
                         cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
         return frame
 
 
+import heapq
+import math
 from collections import Counter
 
 class TrackAggregator:
-    """Агрегирует результаты распознавания в рамках одного трека."""
+    """Агрегирует результаты распознавания в рамках одного трека.
+
+    Кандидаты выравниваются посимвольно, а голоса взвешиваются уверенностью OCR
+    для каждого символа (наивный байесовский консенсус). Номер выдается досрочно,
+    как только апостериорная вероятность превышает ``consensus_threshold``, либо
+    по классическому кворуму после набора ``best_shots`` кадров.
+    """
+
+    # Ограничение уверенности символа, чтобы один «уверенный» кадр не обнулял остальные голоса.
+    _CONFIDENCE_EPS = 1e-3
+    # Минимальное число кадров для досрочной выдачи консенсуса.
+    _EARLY_MIN_SHOTS = 2
 
-    def __init__(self, best_shots: int):
+    def __init__(
+        self,
+        best_shots: int,
+        consensus_threshold: float = Config.CONSENSUS_THRESHOLD,
+        alphabet_size: int = len(Config.OCR_ALPHABET),
+    ):
         self.best_shots = max(1, best_shots)
-        self.track_texts: Dict[int, List[str]] = {}
+        self.consensus_threshold = max(0.0, min(1.0, consensus_threshold))
+        self.alphabet_size = max(2, alphabet_size)
+        self.track_candidates: Dict[int, List[Tuple[str, List[float]]]] = {}
         self.last_emitted: Dict[int, str] = {}
+        self.last_posterior: Dict[int, float] = {}
 
-    def add_result(self, track_id: int, text: str) -> str:
+    def add_result(
+        self,
+        track_id: int,
+        text: str,
+        char_confidences: Optional[Sequence[float]] = None,
+        confidence: float = 1.0,
+    ) -> str:
         """Сохраняет промежуточный результат и возвращает консенсус, если он сформирован."""
         if not text:
             return ""
 
-        bucket = self.track_texts.setdefault(track_id, [])
-        bucket.append(text)
+        if char_confidences is None or len(char_confidences) != len(text):
+            char_confidences = [confidence] * len(text)
+
+        bucket = self.track_candidates.setdefault(track_id, [])
+        bucket.append((text, [float(c) for c in char_confidences]))
         if len(bucket) > self.best_shots:
             bucket.pop(0)
 
-        counts = Counter(bucket)
-        consensus, freq = counts.most_common(1)[0]
-        # Консенсус выдается, когда собраны заданное число бестшотов и есть большинство.
+        consensus, posterior = self._consensus(bucket)
+        self.last_posterior[track_id] = posterior
+
+        early_shots = min(self._EARLY_MIN_SHOTS, self.best_shots)
+        is_confident = (
+            self.consensus_threshold < 1.0
+            and len(bucket) >= early_shots
+            and posterior >= self.consensus_threshold
+        )
+        # Классический кворум сохраняется как запасной путь, когда апостериорная вероятность
+        # не набрана (например, при разнобое в длине кандидатов).
+        freq = Counter(candidate for candidate, _ in bucket)[consensus]
         quorum = max(1, (self.best_shots + 1) // 2)
         has_quorum = len(bucket) >= self.best_shots and freq >= quorum
-        if has_quorum and self.last_emitted.get(track_id) != consensus:
+        if (is_confident or has_quorum) and self.last_emitted.get(track_id) != consensus:
             self.last_emitted[track_id] = consensus
             return consensus
         return ""
 
+    def drop_track(self, track_id: int) -> None:
+        """Удаляет накопленное состояние трека."""
+        self.track_candidates.pop(track_id, None)
+        self.last_emitted.pop(track_id, None)
+        self.last_posterior.pop(track_id, None)
+
+    def reset(self) -> None:
+        """Удаляет состояние всех треков."""
+        self.track_candidates.clear()
+        self.last_emitted.clear()
+        self.last_posterior.clear()
+
+    @staticmethod
+    def _mean(values: Sequence[float]) -> float:
+        return sum(values) / len(values) if values else 0.0
+
+    def _consensus(self, bucket: List[Tuple[str, List[float]]]) -> Tuple[str, float]:
+        """Возвращает консенсусный текст и его апостериорную вероятность."""
+        # 1. Длина номера: голосование, взвешенное средней уверенностью кандидата.
+        length_weights: Dict[int, float] = {}
+        for text, confs in bucket:
+            length_weights[len(text)] = length_weights.get(len(text), 0.0) + self._mean(confs)
+        total_weight = sum(length_weights.values())
+        length, length_weight = max(length_weights.items(), key=lambda item: item[1])
+        posterior = length_weight / total_weight if total_weight > 0 else 0.0
+
+        # 2. Посимвольное голосование среди кандидатов выбранной длины.
+        aligned = [(text, confs) for text, confs in bucket if len(text) == length]
+        chars: List[str] = []
+        for pos in range(length):
+            char, char_posterior = self._vote_position(
+                [(text[pos], confs[pos]) for text, confs in aligned]
+            )
+            chars.append(char)
+            posterior *= char_posterior
+        return "".join(chars), posterior
+
+    def _vote_position(self, votes: List[Tuple[str, float]]) -> Tuple[str, float]:
+        """Наивный Байес для одной позиции: каждый голос — независимое зашумленное наблюдение."""
+        eps = self._CONFIDENCE_EPS
+        others = self.alphabet_size - 1
+        log_hit: List[float] = []
+        log_miss: List[float] = []
+        for _, conf in votes:
+            conf = min(1.0 - eps, max(eps, conf))
+            log_hit.append(math.log(conf))
+            log_miss.append(math.log((1.0 - conf) / others))
+
+        miss_total = sum(log_miss)
+        scores: Dict[str, float] = {}
+        for idx, (char, _) in enumerate(votes):
+            # Символ, за который голосовал кадр idx, получает log(conf) вместо log(miss).
+            scores[char] = scores.get(char, miss_total) + log_hit[idx] - log_miss[idx]
+
+        unseen = max(0, self.alphabet_size - len(scores))
+        best_char, best_score = max(scores.items(), key=lambda item: item[1])
+        normalizer = sum(math.exp(score - best_score) for score in scores.values())
+        normalizer += unseen * math.exp(miss_total - best_score)
+        return best_char, 1.0 / normalizer
+
+
+class PlateQualityScorer:
+    """Дешевая оценка качества кропа номера (0..1) до запуска препроцессинга и OCR."""
+
+    # Ширина кропа (px), начиная с которой CRNN уверенно различает символы.
+    TARGET_WIDTH: int = 120
+    # Пропорции российского номера 520x112 мм.
+    TARGET_ASPECT: float = 520 / 112
+    # Дисперсия лапласиана, которую считаем «резким» кадром.
+    SHARPNESS_REF: float = 150.0
+    # Резкость оценивается на уменьшенной копии, чтобы не платить за большие кропы.
+    ANALYSIS_WIDTH: int = 96
+
+    WEIGHTS: Dict[str, float] = {"size": 0.3, "sharpness": 0.35, "detector": 0.2, "aspect": 0.15}
+
+    def score(self, plate_image: np.ndarray, detector_confidence: float = 1.0) -> float:
+        height, width = plate_image.shape[:2]
+        if height < 2 or width < 2:
+            return 0.0
+
+        size_score = min(1.0, width / self.TARGET_WIDTH)
+        aspect_score = math.exp(-abs(math.log((width / height) / self.TARGET_ASPECT)))
+
+        gray = plate_image if plate_image.ndim == 2 else cv2.cvtColor(plate_image, cv2.COLOR_BGR2GRAY)
+        if width > self.ANALYSIS_WIDTH:
+            scaled_height = max(2, int(height * self.ANALYSIS_WIDTH / width))
+            gray = cv2.resize(gray, (self.ANALYSIS_WIDTH, scaled_height), interpolation=cv2.INTER_AREA)
+        sharpness_score = min(1.0, float(cv2.Laplacian(gray, cv2.CV_64F).var()) / self.SHARPNESS_REF)
+
+        detector_score = max(0.0, min(1.0, float(detector_confidence)))
+        return (
+            self.WEIGHTS["size"] * size_score
+            + self.WEIGHTS["sharpness"] * sharpness_score
+            + self.WEIGHTS["detector"] * detector_score
+            + self.WEIGHTS["aspect"] * aspect_score
+        )
+
+
+class BestShotSelector:
+    """Пропускает в OCR только кропы, входящие в top-K по качеству для своего трека.
+
+    Нечитаемый результат освобождает место (``release``), а если K прочтений так и не дали
+    консенсуса, трек раз в ``REOPEN_SECONDS`` получает еще одно прочтение независимо от
+    качества: стоящая машина, чей кроп больше не улучшается, все равно будет распознана.
+    """
+
+    # Интервал дополнительных прочтений трека с заполненным top-K и без консенсуса.
+    REOPEN_SECONDS: float = 1.0
+
+    def __init__(self, top_k: int = Config.OCR_TOP_K, min_quality: float = Config.MIN_PLATE_QUALITY):
+        # top_k <= 0 отключает отбор: OCR выполняется на каждом кадре.
+        self.top_k = max(0, top_k)
+        self.min_quality = max(0.0, min(1.0, min_quality))
+        self._track_scores: Dict[int, List[float]] = {}
+
+    def should_process(self, track_id: int, score: float, reopen: bool = False) -> bool:
+        """``reopen`` — с прошлого прочтения трека прошло ``REOPEN_SECONDS``."""
+        if self.top_k <= 0:
+            return True
+        if score < self.min_quality:
+            return False
+
+        # Мин-куча оценок кропов, уже отправленных в OCR: новый кроп проходит, если лучше худшего.
+        heap = self._track_scores.setdefault(track_id, [])
+        if len(heap) < self.top_k:
+            heapq.heappush(heap, score)
+            return True
+        if score > heap[0] or reopen:
+            heapq.heapreplace(heap, max(score, heap[0]))
+            return True
+        return False
+
+    def release(self, track_id: int, score: float) -> None:
+        """Возвращает место кропа, чье прочтение оказалось нечитаемым."""
+        heap = self._track_scores.get(track_id)
+        if heap and score in heap:
+            heap.remove(score)
+            heapq.heapify(heap)
+
+    def drop_track(self, track_id: int) -> None:
+        self._track_scores.pop(track_id, None)
+
+    def reset(self) -> None:
+        self._track_scores.clear()
+
+
+class TrackState:
+    """Состояние трека в пайплайне: зафиксированный номер и статистика OCR."""
+
+    __slots__ = ("track_id", "text", "confidence", "finalized", "last_seen", "last_ocr", "ocr_runs", "unreadable")
+
+    def __init__(self, track_id: int) -> None:
+        self.track_id = track_id
+        self.text = ""
+        self.confidence = 0.0
+        self.finalized = False
+        self.last_seen = 0.0
+        self.last_ocr = 0.0
+        self.ocr_runs = 0
+        # Было прочтение ниже порога уверенности.
+        self.unreadable = False
+
+    def finalize(self, text: str, confidence: float) -> None:
+        self.text = text
+        self.confidence = confidence
+        self.finalized = True
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "track_id": self.track_id,
+            "text": self.text,
+            "confidence": self.confidence,
+            "finalized": self.finalized,
+            "ocr_runs": self.ocr_runs,
+        }
+
 
 class ANPR_Pipeline:
     """Главный класс, управляющий процессом распознавания."""
@@ -283,98 +686,231 @@ class ANPR_Pipeline:
         best_shots: int,
         cooldown_seconds: int = 0,
         min_confidence: float = Config.OCR_CONFIDENCE_THRESHOLD,
+        consensus_threshold: float = Config.CONSENSUS_THRESHOLD,
+        ocr_top_k: int = Config.OCR_TOP_K,
+        min_plate_quality: float = Config.MIN_PLATE_QUALITY,
+        reverify_seconds: float = Config.OCR_REVERIFY_SECONDS,
+        stats: Optional[Any] = None,
     ):
         self.recognizer = recognizer
-        self.aggregator = TrackAggregator(best_shots)
+        self.aggregator = TrackAggregator(best_shots, consensus_threshold)
+        self.quality_scorer = PlateQualityScorer()
+        self.best_shot_selector = BestShotSelector(ocr_top_k, min_plate_quality)
+        self.rectifier = PlateRectifier()
         self.cooldown_seconds = max(0, cooldown_seconds)
         self.min_confidence = max(0.0, min(1.0, min_confidence))
+        self.reverify_seconds = max(0.0, reverify_seconds)
+        # Необязательный приемник задержек стадий (metrics.ChannelStats или совместимый объект).
+        self.stats = stats
+        # Накопительные счетчики OCR; читаются экспортером метрик только при опросе.
+        self.ocr_runs = 0
+        self.ocr_skipped = 0
+        self.ocr_unreadable = 0
+        # Треки, ушедшие без зафиксированного номера после нечитаемых прочтений; забирает канал.
+        self._unreadable_tracks = 0
         self._last_seen: Dict[str, float] = {}
+        self._tracks: Dict[int, TrackState] = {}
+        self._last_prune = 0.0
 
-    def _on_cooldown(self, plate: str) -> bool:
+    def configure(
+        self,
+        best_shots: int,
+        cooldown_seconds: int,
+        min_confidence: float,
+        consensus_threshold: float,
+        ocr_top_k: int,
+        min_plate_quality: float,
+        reverify_seconds: float,
+    ) -> None:
+        """Меняет пороги на лету, сохраняя треки, кандидатов и кулдауны номеров."""
+        self.aggregator.best_shots = max(1, best_shots)
+        self.aggregator.consensus_threshold = max(0.0, min(1.0, consensus_threshold))
+        self.best_shot_selector.top_k = max(0, ocr_top_k)
+        self.best_shot_selector.min_quality = max(0.0, min(1.0, min_plate_quality))
+        self.cooldown_seconds = max(0, cooldown_seconds)
+        self.min_confidence = max(0.0, min(1.0, min_confidence))
+        self.reverify_seconds = max(0.0, reverify_seconds)
+
+    def _on_cooldown(self, plate: str, now: float) -> bool:
         last_seen = self._last_seen.get(plate)
         if last_seen is None:
             return False
-        return (time.monotonic() - last_seen) < self.cooldown_seconds
-
-    def _touch_plate(self, plate: str) -> None:
-        self._last_seen[plate] = time.monotonic()
-
-    # --- МЕТОДЫ ДЛЯ КОРРЕКЦИИ ПЕРСПЕКТИВЫ ---
-    def _order_points(self, pts: np.ndarray) -> np.ndarray:
-        rect = np.zeros((4, 2), dtype="float32")
-        s = pts.sum(axis=1)
-        rect[0] = pts[np.argmin(s)]
-        rect[2] = pts[np.argmax(s)]
-        diff = np.diff(pts, axis=1)
-        rect[1] = pts[np.argmin(diff)]
-        rect[3] = pts[np.argmax(diff)]
-        return rect
-
-    def _four_point_transform(self, image: np.ndarray, pts: np.ndarray) -> np.ndarray:
-        rect = self._order_points(pts)
-        (tl, tr, br, bl) = rect
-        widthA = np.sqrt(((br[0] - bl[0]) ** 2) + ((br[1] - bl[1]) ** 2))
-        widthB = np.sqrt(((tr[0] - tl[0]) ** 2) + ((tr[1] - tl[1]) ** 2))
-        maxWidth = max(int(widthA), int(widthB))
-        heightA = np.sqrt(((tr[0] - br[0]) ** 2) + ((tr[1] - br[1]) ** 2))
-        heightB = np.sqrt(((tl[0] - bl[0]) ** 2) + ((tl[1] - bl[1]) ** 2))
-        maxHeight = max(int(heightA), int(heightB))
-        if maxWidth <= 0 or maxHeight <= 0: return image
-        dst = np.array([[0, 0], [maxWidth-1, 0], [maxWidth-1, maxHeight-1], [0, maxHeight-1]], dtype="float32")
-        M = cv2.getPerspectiveTransform(rect, dst)
-        return cv2.warpPerspective(image, M, (maxWidth, maxHeight))
-
-    def _preprocess_plate(self, plate_image: np.ndarray) -> np.ndarray:
-        gray = cv2.cvtColor(plate_image, cv2.COLOR_BGR2GRAY)
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-        _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        contours, _ = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        if not contours: return plate_image
-        contours = sorted(contours, key=cv2.contourArea, reverse=True)
-        for contour in contours:
-            peri = cv2.arcLength(contour, True)
-            approx = cv2.approxPolyDP(contour, 0.02 * peri, True)
-            if len(approx) == 4:
-                return self._four_point_transform(plate_image, approx.reshape(4, 2))
-        return plate_image
+        return (now - last_seen) < self.cooldown_seconds
+
+    def _touch_plate(self, plate: str, now: float) -> None:
+        self._last_seen[plate] = now
+
+    # --- СОСТОЯНИЕ ТРЕКОВ ---
+    def track_states(self) -> Dict[int, Dict[str, Any]]:
+        """Снимок активных треков (например, чтобы UI рисовал зафиксированный номер на рамке)."""
+        return {track_id: state.as_dict() for track_id, state in list(self._tracks.items())}
+
+    def get_track_state(self, track_id: int) -> Optional[Dict[str, Any]]:
+        state = self._tracks.get(track_id)
+        return state.as_dict() if state else None
+
+    def reset_tracks(self) -> None:
+        """Забывает все треки и их кандидатов, оставляя кулдауны номеров.
+
+        Вызывается вместе с созданием нового трекера: его идентификаторы начинаются заново,
+        и новая машина иначе унаследовала бы зафиксированный номер старого трека с тем же id.
+        """
+        self._unreadable_tracks += sum(1 for state in self._tracks.values() if self._lost_unreadable(state))
+        self._tracks.clear()
+        self.aggregator.reset()
+        self.best_shot_selector.reset()
+        self.rectifier.reset()
+
+    def pop_unreadable_tracks(self) -> int:
+        """Число треков, ушедших нечитаемыми с прошлого вызова (по одному на машину, а не на кадр)."""
+        count, self._unreadable_tracks = self._unreadable_tracks, 0
+        return count
+
+    @staticmethod
+    def _lost_unreadable(state: TrackState) -> bool:
+        return state.unreadable and not state.finalized
+
+    def _touch_track(self, track_id: int, now: float) -> TrackState:
+        state = self._tracks.get(track_id)
+        if state is None:
+            state = self._tracks[track_id] = TrackState(track_id)
+        state.last_seen = now
+        return state
+
+    def _prune_tracks(self, now: float) -> None:
+        if now - self._last_prune < 1.0:
+            return
+        self._last_prune = now
+        stale = [tid for tid, st in self._tracks.items() if now - st.last_seen > Config.TRACK_TTL_SECONDS]
+        for track_id in stale:
+            if self._lost_unreadable(self._tracks.pop(track_id)):
+                self._unreadable_tracks += 1
+            self.aggregator.drop_track(track_id)
+            self.best_shot_selector.drop_track(track_id)
+            self.rectifier.drop_track(track_id)
+
+    @staticmethod
+    def _annotate_track(detection: Dict[str, Any], state: TrackState) -> None:
+        if state.finalized:
+            detection['finalized'] = True
+            detection['locked_text'] = state.text
+
+    # --- КОРРЕКЦИЯ ПЕРСПЕКТИВЫ ---
+    def _preprocess_plate(self, plate_image: np.ndarray, track_id: Optional[int] = None) -> np.ndarray:
+        return self.rectifier.rectify(plate_image, track_id)
 
     # --- ГЛАВНЫЙ МЕТОД ОБРАБОТКИ ---
-    def process_frame(self, frame: np.ndarray, detections: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _select_for_ocr(
+        self, detection: Dict[str, Any], roi: np.ndarray, state: TrackState, now: float
+    ) -> bool:
+        """Решает, стоит ли тратить препроцессинг и CRNN на кроп трека."""
+        if state.finalized:
+            # Консенсус уже сформирован: OCR нужен только для редкой перепроверки, если она включена.
+            return self.reverify_seconds > 0 and (now - state.last_ocr) >= self.reverify_seconds
+        quality = self.quality_scorer.score(roi, detection.get('confidence', 1.0))
+        detection['quality'] = quality
+        reopen = state.ocr_runs > 0 and (now - state.last_ocr) >= BestShotSelector.REOPEN_SECONDS
+        return self.best_shot_selector.should_process(state.track_id, quality, reopen)
+
+    def process_frame(
+        self, frame: np.ndarray, detections: List[Dict[str, Any]], now: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Распознает номера на кадре.
+
+        ``now`` — время кадра в секундах для кулдауна и TTL треков; по умолчанию
+        ``time.monotonic()``, при обработке архива передается время кадра в ролике.
+        """
+        now = time.monotonic() if now is None else now
+        pending: List[Tuple[Dict[str, Any], Optional[TrackState], np.ndarray]] = []
         for detection in detections:
             x1, y1, x2, y2 = detection['bbox']
             roi = frame[y1:y2, x1:x2]
+            state = self._touch_track(detection['track_id'], now) if 'track_id' in detection else None
             
             if roi.size > 0:
+                # 0. ОТБИРАЕМ БЕСТШОТЫ: размытые, мелкие кропы и зафиксированные треки не доходят до OCR
+                if state is not None and not self._select_for_ocr(detection, roi, state, now):
+                    detection['text'] = ""
+                    detection['ocr_skipped'] = True
+                    self.ocr_skipped += 1
+                    self._annotate_track(detection, state)
+                    continue
+
                 # 1. УЛУЧШАЕМ ПРЕПРОЦЕССИНГ
-                processed_plate = self._preprocess_plate(roi)
+                started = time.perf_counter()
+                processed_plate = self._preprocess_plate(roi, state.track_id if state else None)
+                if self.stats is not None:
+                    self.stats.observe("preprocess", time.perf_counter() - started)
                 
                 if processed_plate.size > 0:
-                    # 2. РАСПОЗНАЕМ
-                    current_text, confidence = self.recognizer.recognize(processed_plate)
-
-                    if confidence < self.min_confidence:
-                        detection['text'] = "Нечитаемо"
-                        detection['unreadable'] = True
-                        detection['confidence'] = confidence
-                        continue
-
-                    # 3. Агрегируем по треку или фиксируем напрямую для одиночных фото
-                    if 'track_id' in detection:
-                        detection['text'] = self.aggregator.add_result(
-                            detection['track_id'], current_text
-                        )
-                    else:  # Для одиночных фото
-                        detection['text'] = current_text
-
-                    detection['confidence'] = confidence
-
-                    if self.cooldown_seconds > 0 and detection.get('text'):
-                        if self._on_cooldown(detection['text']):
-                            detection['text'] = ""
-                        else:
-                            self._touch_plate(detection['text'])
+                    pending.append((detection, state, processed_plate))
+                    continue
+
+            if state is not None:
+                self._annotate_track(detection, state)
+
+        if pending:
+            # 2. РАСПОЗНАЕМ все кропы кадра одним вызовом CRNN
+            started = time.perf_counter()
+            recognized = self.recognizer.recognize_batch([plate for _, _, plate in pending])
+            if self.stats is not None:
+                self.stats.observe("recognize", time.perf_counter() - started)
+            for (detection, state, _), result in zip(pending, recognized):
+                self._apply_ocr_result(detection, state, result, now)
+        self._prune_tracks(now)
         return detections
 
+    def _apply_ocr_result(
+        self,
+        detection: Dict[str, Any],
+        state: Optional[TrackState],
+        result: Tuple[str, float, List[float]],
+        now: float,
+    ) -> None:
+        current_text, confidence, char_confidences = result
+        self.ocr_runs += 1
+        if state is not None:
+            state.ocr_runs += 1
+            state.last_ocr = now
+
+        if confidence < self.min_confidence:
+            if state is not None and state.finalized:
+                # Неудачная перепроверка не отменяет уже зафиксированный номер.
+                detection['text'] = ""
+                self._annotate_track(detection, state)
+                return
+            detection['text'] = "Нечитаемо"
+            detection['unreadable'] = True
+            self.ocr_unreadable += 1
+            detection['confidence'] = confidence
+            if state is not None:
+                state.unreadable = True
+            if state is not None and 'quality' in detection:
+                # Неудачное прочтение не должно занимать место в top-K бестшотов трека.
+                self.best_shot_selector.release(state.track_id, detection['quality'])
+            return
+
+        # 3. Агрегируем по треку или фиксируем напрямую для одиночных фото
+        if state is not None:
+            detection['text'] = self.aggregator.add_result(
+                state.track_id, current_text, char_confidences, confidence
+            )
+            if detection['text']:
+                state.finalize(detection['text'], confidence)
+        else:  # Для одиночных фото
+            detection['text'] = current_text
+
+        detection['confidence'] = confidence
+
+        if self.cooldown_seconds > 0 and detection.get('text'):
+            if self._on_cooldown(detection['text'], now):
+                detection['text'] = ""
+            else:
+                self._touch_plate(detection['text'], now)
+
+        if state is not None:
+            self._annotate_track(detection, state)
+
 def process_source(pipeline: ANPR_Pipeline, detector: YOLODetector, source_path: str):
     """Обрабатывает источник, выбирая нужный метод (detect/track)."""
     is_video = source_path.endswith(('.mp4', '.avi', '.mov')) or source_path.isnumeric()
@@ -382,13 +918,14 @@ def process_source(pipeline: ANPR_Pipeline, detector: YOLODetector, source_path:
     if is_video:
         cap = cv2.VideoCapture(int(source_path) if source_path.isnumeric() else source_path)
         if not cap.isOpened(): raise IOError(f"Ошибка...")
+        tracker = ByteTracker(high_threshold=Config.DETECTION_CONFIDENCE_THRESHOLD)
         
         while True:
             ret, frame = cap.read()
             if not ret: break
             
             # --- ИСПОЛЬЗУЕМ ТРЕКИНГ ДЛЯ ВИДЕО ---
-            detections = detector.track(frame)
+            detections = tracker.update(detector.detect(frame, min_confidence=tracker.low_threshold))
             results = pipeline.process_frame(frame, detections) # Передаем detections в пайплайн
             
             frame = Visualizer.draw_results(frame, results)
@@ -416,8 +953,26 @@ def process_source(pipeline: ANPR_Pipeline, detector: YOLODetector, source_path:
 def main():
     """Главная функция, точка входа в программу."""
     parser = argparse.ArgumentParser(description="Распознавание автомобильных номеров.")
-    parser.add_argument("--source", required=True, help="Путь к изображению, видеофайлу или ID веб-камеры (напр., '0').")
+    parser.add_argument("--source", help="Путь к изображению, видеофайлу или ID веб-камеры (напр., '0').")
+    parser.add_argument(
+        "--compile-ocr",
+        action="store_true",
+        help="Однократно собрать TorchScript-кэш квантованного CRNN рядом с весами и выйти.",
+    )
     args = parser.parse_args()
+    if args.compile_ocr:
+        LoggingManager()
+        # Флаг явно просит собрать кэш, поэтому он сохраняется и при выключенном OCR_SCRIPTED_CACHE.
+        model = CRNNRecognizer._build_quantized(Config.OCR_MODEL_PATH, Config.DEVICE)
+        cache_path = CRNNRecognizer.scripted_cache_path(Config.OCR_MODEL_PATH)
+        if not CRNNRecognizer._save_scripted(model, Config.OCR_MODEL_PATH, cache_path):
+            raise SystemExit("Не удалось собрать TorchScript-кэш CRNN, подробности в журнале.")
+        print(f"Кэш CRNN: {cache_path}")
+        if not Config.OCR_SCRIPTED_CACHE:
+            print("Config.OCR_SCRIPTED_CACHE выключен: кэш сохранен, но при запуске использоваться не будет.")
+        return
+    if not args.source:
+        parser.error("требуется --source или --compile-ocr")
 
     try:
         LoggingManager()
@@ -1,18 +1,98 @@
 """Централизованная настройка логирования приложения."""
 
+import atexit
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
-from typing import Any, Dict
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, List, Optional
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Кладет записи в ограниченную очередь и отбрасывает их при переполнении, не блокируя поток."""
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись — одна строка JSON; поля ``extra`` попадают в объект как есть."""
+
+    _RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in self._RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RateLimiter:
+    """Пропускает не больше одного сообщения на ключ за ``interval`` секунд.
+
+    ``allow`` возвращает число подавленных с прошлого раза сообщений или None, если
+    сообщение нужно пропустить. Экземпляр принадлежит одному каналу и одному потоку.
+    """
+
+    # Интервал по умолчанию; задается из настроек логирования (``rate_limit_seconds``).
+    default_interval = 5.0
+
+    def __init__(self, interval: Optional[float] = None) -> None:
+        self.interval = interval
+        self._last: Dict[str, float] = {}
+        self._suppressed: Dict[str, int] = {}
+
+    def allow(self, key: str) -> Optional[int]:
+        interval = self.default_interval if self.interval is None else self.interval
+        now = time.monotonic()
+        last = self._last.get(key)
+        if last is not None and now - last < interval:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return None
+        self._last[key] = now
+        return self._suppressed.pop(key, 0)
 
 
 class LoggingManager:
-    """Создает согласованный стек логирования для GUI, пайплайна и фоновых потоков."""
+    """Создает согласованный стек логирования для GUI, пайплайна и фоновых потоков.
+
+    В асинхронном режиме (``async``, по умолчанию) корневой логгер только кладет запись
+    в ограниченную очередь, а форматирование, запись в файл и ротацию выполняет
+    ``QueueListener`` в отдельном потоке. При переполнении очереди записи отбрасываются
+    и учитываются в ``dropped_records``, потоки захвата и инференса никогда не ждут диск.
+    """
 
     DEFAULT_LEVEL = "INFO"
     DEFAULT_FILE = "data/app.log"
     DEFAULT_MAX_BYTES = 1_048_576
     DEFAULT_BACKUP_COUNT = 5
+    DEFAULT_QUEUE_SIZE = 10_000
+    DEFAULT_RATE_LIMIT_SECONDS = 5.0
+
+    # Активный слушатель очереди; при повторной настройке прежний останавливается.
+    _listener: Optional[QueueListener] = None
+    _queue_handler: Optional[DroppingQueueHandler] = None
+    _lock = threading.Lock()
 
     def __init__(self, config: Dict[str, Any] | None = None) -> None:
         self.config = config or {}
@@ -24,14 +104,22 @@ class LoggingManager:
         log_file = self.config.get("file", self.DEFAULT_FILE)
         max_bytes = int(self.config.get("max_bytes", self.DEFAULT_MAX_BYTES))
         backup_count = int(self.config.get("backup_count", self.DEFAULT_BACKUP_COUNT))
+        use_async = bool(self.config.get("async", True))
+        queue_size = int(self.config.get("queue_size", self.DEFAULT_QUEUE_SIZE))
+        RateLimiter.default_interval = float(
+            self.config.get("rate_limit_seconds", self.DEFAULT_RATE_LIMIT_SECONDS)
+        )
 
         log_dir = os.path.dirname(log_file) or "."
         os.makedirs(log_dir, exist_ok=True)
 
-        formatter = logging.Formatter(
-            fmt="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-            datefmt="%Y-%m-%dT%H:%M:%S",
-        )
+        if self.config.get("format") == "json":
+            formatter: logging.Formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter(
+                fmt="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+                datefmt="%Y-%m-%dT%H:%M:%S",
+            )
 
         file_handler = RotatingFileHandler(
             log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
@@ -40,24 +128,81 @@ class LoggingManager:
 
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(formatter)
+        handlers: List[logging.Handler] = [file_handler, console_handler]
 
         root_logger = logging.getLogger()
         root_logger.setLevel(level)
-        root_logger.handlers.clear()
-        root_logger.addHandler(file_handler)
-        root_logger.addHandler(console_handler)
+        with LoggingManager._lock:
+            root_logger.handlers.clear()
+            dropped = self._stop_listener()
+            if use_async:
+                log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=max(1, queue_size))
+                LoggingManager._queue_handler = DroppingQueueHandler(log_queue)
+                LoggingManager._listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+                LoggingManager._listener.start()
+                root_logger.addHandler(LoggingManager._queue_handler)
+                self._register_metrics()
+            else:
+                for handler in handlers:
+                    root_logger.addHandler(handler)
 
         logging.getLogger(__name__).debug(
-            "Logging configured (level=%s, file=%s, rotation=%s x %s)",
+            "Logging configured (level=%s, file=%s, rotation=%s x %s, async=%s)",
             level_name,
             log_file,
             max_bytes,
             backup_count,
+            use_async,
         )
+        if dropped:
+            logging.getLogger(__name__).warning("Отброшено записей журнала: %d", dropped)
+
+    @staticmethod
+    def _register_metrics() -> None:
+        # metrics импортирует этот модуль, поэтому импорт отложен.
+        from metrics import REGISTRY
+
+        REGISTRY.register_gauge(
+            "anpr_log_records_dropped",
+            "Записи журнала, отброшенные из-за переполнения очереди",
+            LoggingManager.dropped_records,
+        )
+
+    @staticmethod
+    def _stop_listener() -> int:
+        """Дописывает оставшиеся в очереди записи, закрывает файлы; возвращает число отброшенных."""
+        listener, handler = LoggingManager._listener, LoggingManager._queue_handler
+        LoggingManager._listener = None
+        LoggingManager._queue_handler = None
+        if listener is None:
+            return 0
+        listener.stop()
+        for target in listener.handlers:
+            target.close()
+        return handler.dropped if handler is not None else 0
+
+    @staticmethod
+    def dropped_records() -> int:
+        handler = LoggingManager._queue_handler
+        return handler.dropped if handler is not None else 0
+
+    @staticmethod
+    def shutdown() -> None:
+        """Останавливает фоновую запись журнала, дописав очередь (вызывается при выходе)."""
+        with LoggingManager._lock:
+            root_logger = logging.getLogger()
+            if LoggingManager._queue_handler in root_logger.handlers:
+                root_logger.removeHandler(LoggingManager._queue_handler)
+            dropped = LoggingManager._stop_listener()
+        if dropped:
+            # Обработчиков уже нет: сообщение уйдет в stderr через logging.lastResort.
+            logging.getLogger(__name__).warning("Отброшено записей журнала: %d", dropped)
+
+
+atexit.register(LoggingManager.shutdown)
 
 
 def get_logger(name: str) -> logging.Logger:
     """Утилита для получения именованного логгера."""
 
     return logging.getLogger(name)
-
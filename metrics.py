@@ -0,0 +1,346 @@
+"""Легковесные метрики каналов: задержки по стадиям, FPS, счетчики и экспорт в Prometheus."""
+
+import threading
+import time
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from logging_manager import get_logger
+
+logger = get_logger(__name__)
+
+
+class LatencyHistogram:
+    """Скользящее окно длительностей на заранее выделенном кольцевом буфере.
+
+    Запись — одна операция присваивания без аллокаций; перцентили считаются только при чтении.
+    """
+
+    def __init__(self, window: int = 512) -> None:
+        self.window = max(1, window)
+        self._values = array("d", bytes(8 * self.window))
+        self._index = 0
+        self._filled = 0
+        self.count = 0
+        self.total = 0.0
+        self.last = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self._values[self._index] = seconds
+        self._index = (self._index + 1) % self.window
+        if self._filled < self.window:
+            self._filled += 1
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+
+    def percentiles(self, quantiles: Tuple[float, ...] = (0.5, 0.95, 0.99)) -> Tuple[float, ...]:
+        if not self._filled:
+            return tuple(0.0 for _ in quantiles)
+        ordered = sorted(self._values[: self._filled])
+        last_idx = self._filled - 1
+        return tuple(ordered[min(last_idx, int(q * self._filled))] for q in quantiles)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Статистика окна в миллисекундах."""
+        p50, p95, p99 = self.percentiles()
+        window_mean = sum(self._values[: self._filled]) / self._filled if self._filled else 0.0
+        return {
+            "count": self.count,
+            "mean_ms": window_mean * 1000,
+            "p50_ms": p50 * 1000,
+            "p95_ms": p95 * 1000,
+            "p99_ms": p99 * 1000,
+            "last_ms": self.last * 1000,
+        }
+
+
+class ChannelStats:
+    """Метрики одного канала: гистограммы задержек по стадиям, FPS и счетчики кадров."""
+
+    STAGES: Tuple[str, ...] = (
+        "capture",
+        "decode",
+        "roi",
+        "motion",
+        "detect",
+        "preprocess",
+        "recognize",
+        "db",
+        "preview",
+    )
+    FPS_INTERVAL = 1.0
+
+    def __init__(self, channel: str, window: int = 512) -> None:
+        self.channel = channel
+        self.stages: Dict[str, LatencyHistogram] = {name: LatencyHistogram(window) for name in self.STAGES}
+        self.frames_read = 0
+        self.frames_processed = 0
+        self.frames_skipped = 0
+        # Неудачные чтения источника (обрыв, конец файла) и кадры, пропущенные самим источником.
+        self.read_failures = 0
+        self.frames_lost = 0
+        self.events = 0
+        self.fps = 0.0
+        self.started_at = time.monotonic()
+        self.last_frame_at: Optional[float] = None
+        # Переподключения источника: число, длительность последнего и суммарный простой.
+        self.reconnects = 0
+        self.last_reconnect_seconds = 0.0
+        self.downtime_seconds = 0.0
+        self.outage_started_at: Optional[float] = None
+        self._fps_window_start = self.started_at
+        self._fps_window_frames = 0
+
+    def observe(self, stage: str, seconds: float) -> None:
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = LatencyHistogram()
+        histogram.observe(seconds)
+
+    def mark_frame(self, now: float) -> None:
+        """Учитывает прочитанный кадр и раз в секунду пересчитывает FPS."""
+        self.frames_read += 1
+        self.last_frame_at = now
+        self._fps_window_frames += 1
+        elapsed = now - self._fps_window_start
+        if elapsed >= self.FPS_INTERVAL:
+            self.fps = self._fps_window_frames / elapsed
+            self._fps_window_start = now
+            self._fps_window_frames = 0
+
+    def begin_outage(self, now: float) -> None:
+        """Источник пропал; простой считается до ``end_outage``."""
+        if self.outage_started_at is None:
+            self.outage_started_at = now
+
+    def end_outage(self, now: float) -> None:
+        """Источник переоткрыт: учитывает переподключение и длительность простоя."""
+        if self.outage_started_at is None:
+            return
+        duration = now - self.outage_started_at
+        self.outage_started_at = None
+        self.reconnects += 1
+        self.last_reconnect_seconds = duration
+        self.downtime_seconds += duration
+
+    def total_downtime(self, now: Optional[float] = None) -> float:
+        """Суммарный простой, включая текущий обрыв."""
+        if self.outage_started_at is None:
+            return self.downtime_seconds
+        return self.downtime_seconds + (now or time.monotonic()) - self.outage_started_at
+
+    def frame_age(self, now: Optional[float] = None) -> Optional[float]:
+        """Сколько секунд назад пришел последний кадр (растет у зависшей камеры)."""
+        if self.last_frame_at is None:
+            return None
+        return (now or time.monotonic()) - self.last_frame_at
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "channel": self.channel,
+            "fps": self.fps,
+            "frames_read": self.frames_read,
+            "frames_processed": self.frames_processed,
+            "frames_skipped": self.frames_skipped,
+            "read_failures": self.read_failures,
+            "frames_lost": self.frames_lost,
+            "events": self.events,
+            "uptime": time.monotonic() - self.started_at,
+            "frame_age": self.frame_age(),
+            "reconnecting": self.outage_started_at is not None,
+            "reconnects": self.reconnects,
+            "last_reconnect_seconds": self.last_reconnect_seconds,
+            "downtime_seconds": self.total_downtime(),
+            "stages": {name: hist.snapshot() for name, hist in self.stages.items()},
+        }
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Реестр источников метрик для экспорта в формате Prometheus.
+
+    Источники только регистрируются: счетчики живут в самих объектах (``ChannelStats``,
+    ``ANPR_Pipeline``, ``AsyncEventDatabase``) и читаются лишь в момент опроса, поэтому
+    обработка кадра ничего не выделяет ради экспорта.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._channels: Dict[str, Dict[str, Any]] = {}
+        self._gauges: Dict[str, Tuple[str, Callable[[], Any]]] = {}
+
+    def register_channel(
+        self,
+        name: str,
+        stats: ChannelStats,
+        pipeline: Optional[Any] = None,
+        database: Optional[Any] = None,
+    ) -> None:
+        with self._lock:
+            self._channels[name] = {"stats": stats, "pipeline": pipeline, "database": database}
+
+    def unregister_channel(self, name: str, stats: Optional[ChannelStats] = None) -> None:
+        with self._lock:
+            entry = self._channels.get(name)
+            # Не удаляем канал, если его уже перерегистрировал новый экземпляр воркера.
+            if entry and (stats is None or entry["stats"] is stats):
+                del self._channels[name]
+
+    def register_gauge(self, name: str, help_text: str, callback: Callable[[], Any]) -> None:
+        """Произвольная метрика-показатель: callback возвращает число или {метка: число}."""
+        with self._lock:
+            self._gauges[name] = (help_text, callback)
+
+    def channels(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return dict(self._channels)
+
+    def render(self) -> str:
+        """Формирует текстовое представление метрик (Prometheus exposition format 0.0.4)."""
+        with self._lock:
+            channels = list(self._channels.items())
+            gauges = list(self._gauges.items())
+
+        lines: list = []
+        families: Dict[str, Tuple[str, str, list]] = {}
+
+        def add(name: str, kind: str, help_text: str, labels: Dict[str, Any], value: float) -> None:
+            family = families.setdefault(name, (kind, help_text, []))
+            label_text = ",".join(f'{key}="{_escape_label(val)}"' for key, val in labels.items())
+            value_text = str(value) if isinstance(value, int) else repr(float(value))
+            family[2].append(f"{name}{{{label_text}}} {value_text}" if label_text else f"{name} {value_text}")
+
+        def add_summary(name: str, help_text: str, labels: Dict[str, Any], histogram: LatencyHistogram) -> None:
+            for quantile, value in zip(("0.5", "0.95", "0.99"), histogram.percentiles()):
+                add(name, "summary", help_text, {**labels, "quantile": quantile}, value)
+            add(f"{name}_sum", "", "", labels, histogram.total)
+            add(f"{name}_count", "", "", labels, histogram.count)
+
+        now = time.monotonic()
+        for channel, entry in channels:
+            stats: ChannelStats = entry["stats"]
+            labels = {"channel": channel}
+            add("anpr_channel_fps", "gauge", "Кадров в секунду, прочитанных из источника", labels, stats.fps)
+            for state, value in (
+                ("read", stats.frames_read),
+                ("processed", stats.frames_processed),
+                ("skipped", stats.frames_skipped),
+                ("read_failure", stats.read_failures),
+                ("lost", stats.frames_lost),
+            ):
+                add("anpr_channel_frames_total", "counter", "Счетчики кадров канала", {**labels, "state": state}, value)
+            frame_age = stats.frame_age(now)
+            if frame_age is not None:
+                add("anpr_channel_frame_age_seconds", "gauge", "Время с последнего кадра", labels, frame_age)
+            add("anpr_events_total", "counter", "Зафиксированные события распознавания", labels, stats.events)
+            add("anpr_channel_up", "gauge", "Источник канала доступен (0 — переподключение)", labels, int(stats.outage_started_at is None))
+            add("anpr_channel_reconnects_total", "counter", "Успешные переподключения источника", labels, stats.reconnects)
+            add("anpr_channel_reconnect_seconds", "gauge", "Длительность последнего переподключения", labels, stats.last_reconnect_seconds)
+            add("anpr_channel_downtime_seconds_total", "counter", "Суммарный простой источника", labels, stats.total_downtime(now))
+            for stage, histogram in stats.stages.items():
+                if histogram.count:
+                    add_summary(
+                        "anpr_stage_latency_seconds",
+                        "Задержка стадий конвейера канала",
+                        {**labels, "stage": stage},
+                        histogram,
+                    )
+
+            pipeline = entry.get("pipeline")
+            if pipeline is not None:
+                runs = getattr(pipeline, "ocr_runs", 0)
+                unreadable = getattr(pipeline, "ocr_unreadable", 0)
+                add("anpr_ocr_runs_total", "counter", "Запуски CRNN", labels, runs)
+                add("anpr_ocr_skipped_total", "counter", "Кропы, не отправленные в OCR", labels, getattr(pipeline, "ocr_skipped", 0))
+                add("anpr_ocr_unreadable_total", "counter", "Результаты OCR ниже порога уверенности", labels, unreadable)
+                add("anpr_ocr_unreadable_ratio", "gauge", "Доля нечитаемых результатов OCR", labels, unreadable / runs if runs else 0.0)
+
+            database = entry.get("database")
+            if database is not None:
+                add("anpr_db_inserts_total", "counter", "Записанные в БД события", labels, getattr(database, "inserts", 0))
+                add("anpr_db_errors_total", "counter", "Ошибки записи в БД", labels, getattr(database, "failures", 0))
+                add("anpr_db_pending_writes", "gauge", "Записи в БД в процессе выполнения", labels, getattr(database, "pending", 0))
+                latency = getattr(database, "write_latency", None)
+                if latency is not None and latency.count:
+                    add_summary("anpr_db_write_latency_seconds", "Задержка записи события в БД", labels, latency)
+
+        for name, (help_text, callback) in gauges:
+            try:
+                value = callback()
+            except Exception:  # noqa: BLE001
+                continue
+            if isinstance(value, dict):
+                for label_value, item in value.items():
+                    add(name, "gauge", help_text, {"name": label_value}, item)
+            elif value is not None:
+                add(name, "gauge", help_text, {}, value)
+
+        for name, (kind, help_text, samples) in families.items():
+            if kind:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        lines.append("")
+        return "\n".join(lines)
+
+
+REGISTRY = MetricsRegistry()
+
+
+class MetricsExporter:
+    """HTTP-эндпоинт ``/metrics`` в фоновом потоке; не зависит от GUI."""
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, host: str = "127.0.0.1", port: int = 9108) -> None:
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802
+                if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt: str, *args: Any) -> None:
+                logger.debug("metrics: " + fmt, *args)
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-exporter", daemon=True)
+        self._thread.start()
+        logger.info("Экспорт метрик запущен: http://%s:%s/metrics", self.host, self.port)
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def start_exporter(config: Dict[str, Any], registry: MetricsRegistry = REGISTRY) -> Optional[MetricsExporter]:
+    """Запускает экспортер, если он включен в настройках (блок ``metrics``)."""
+    if not config.get("enabled", False):
+        return None
+    exporter = MetricsExporter(registry, str(config.get("host", "127.0.0.1")), int(config.get("port", 9108)))
+    try:
+        exporter.start()
+    except OSError:
+        logger.exception("Не удалось запустить экспорт метрик на %s:%s", exporter.host, exporter.port)
+        return None
+    return exporter
@@ -0,0 +1,101 @@
+"""Общий пул моделей с отложенной загрузкой и прогревом.
+
+Модуль не импортирует torch/ultralytics при импорте: тяжелые зависимости подгружаются
+в ``ModelPool`` при первом обращении (или в фоне через ``warmup_async``), поэтому окно
+приложения открывается сразу, а каналы не квантуют CRNN каждый заново.
+"""
+
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+import numpy as np
+
+from logging_manager import get_logger
+
+if TYPE_CHECKING:
+    from detector import CRNNRecognizer, YOLODetector
+
+logger = get_logger(__name__)
+
+
+class ModelPool:
+    """Загружает модели один раз и прогревает их пробным инференсом.
+
+    Квантованный CRNN не хранит состояния между вызовами и разделяется всеми каналами.
+    YOLO создается на каждый канал: предиктор и трекер ultralytics не потокобезопасны,
+    но веса и первый инференс прогреваются параллельно в потоках каналов.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._recognizer: Optional["CRNNRecognizer"] = None
+        self._warmup_thread: Optional[threading.Thread] = None
+        self._detector_factory: Optional[Callable[..., Any]] = None
+        self.backend = "torch"
+        self.threads = 0
+
+    def configure(self, inference_config: Dict[str, Any]) -> None:
+        """Применяет блок ``inference`` из настроек; вызывать до загрузки моделей."""
+        self.backend = str(inference_config.get("backend", "torch"))
+        self.threads = int(inference_config.get("threads", 0))
+
+    def install(self, recognizer: Any, detector_factory: Callable[..., Any]) -> None:
+        """Подменяет модели готовыми объектами (бенчмарки без весов, см. ``benchmarks.stub_models``).
+
+        ``detector_factory`` вызывается с теми же аргументами, что и ``detector()``.
+        """
+        with self._lock:
+            self._recognizer = recognizer
+            self._detector_factory = detector_factory
+
+    def recognizer(self) -> "CRNNRecognizer":
+        """Общий распознаватель; при первом вызове загружается и прогревается."""
+        with self._lock:
+            if self._recognizer is None:
+                from detector import Config, CRNNRecognizer
+
+                started = time.perf_counter()
+                recognizer = CRNNRecognizer(Config.OCR_MODEL_PATH, Config.DEVICE, self.backend, self.threads)
+                recognizer.recognize(np.zeros((Config.OCR_IMG_HEIGHT, Config.OCR_IMG_WIDTH, 3), dtype=np.uint8))
+                self._recognizer = recognizer
+                logger.info("CRNN загружен и прогрет за %.2f с", time.perf_counter() - started)
+            return self._recognizer
+
+    def detector(self, imgsz: Optional[int] = None, rect: bool = True, half_resolution: bool = False) -> "YOLODetector":
+        """Новый прогретый экземпляр детектора для канала с его параметрами входа."""
+        if self._detector_factory is not None:
+            return self._detector_factory(imgsz=imgsz, rect=rect, half_resolution=half_resolution)
+        from detector import Config, YOLODetector
+
+        started = time.perf_counter()
+        detector = YOLODetector(
+            Config.YOLO_MODEL_PATH,
+            Config.DEVICE,
+            self.backend,
+            imgsz=imgsz or Config.DETECTOR_IMGSZ,
+            rect=rect,
+            half_resolution=half_resolution,
+        )
+        # Первый predict инициализирует предиктор ultralytics; делаем это до первого кадра.
+        detector.detect(np.zeros((detector.imgsz, detector.imgsz, 3), dtype=np.uint8))
+        logger.info("YOLO загружен и прогрет за %.2f с", time.perf_counter() - started)
+        return detector
+
+    def warmup_async(self) -> threading.Thread:
+        """Запускает фоновую загрузку общего распознавателя (и импорт torch/ultralytics)."""
+        with self._lock:
+            if self._warmup_thread is None:
+                self._warmup_thread = threading.Thread(target=self._warmup, name="model-warmup", daemon=True)
+                self._warmup_thread.start()
+            return self._warmup_thread
+
+    def _warmup(self) -> None:
+        try:
+            self.recognizer()
+        except Exception:  # noqa: BLE001
+            # Ошибка повторится и будет показана в статусе канала при запуске.
+            logger.exception("Не удалось прогреть модели")
+
+
+MODEL_POOL = ModelPool()
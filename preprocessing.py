@@ -0,0 +1,196 @@
+"""Коррекция перспективы кропа номерной пластины перед OCR."""
+
+import math
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def order_points(pts: np.ndarray) -> np.ndarray:
+    """Упорядочивает углы: левый верхний, правый верхний, правый нижний, левый нижний."""
+    s = pts.sum(axis=1)
+    diff = pts[:, 1] - pts[:, 0]
+    return pts[[s.argmin(), diff.argmin(), s.argmax(), diff.argmax()]].astype("float32")
+
+
+def four_point_transform(image: np.ndarray, pts: np.ndarray) -> np.ndarray:
+    return _warp_ordered(image, order_points(pts))
+
+
+def _warp_ordered(image: np.ndarray, rect: np.ndarray) -> np.ndarray:
+    """``warpPerspective`` по уже упорядоченным углам (tl, tr, br, bl)."""
+    # Стороны tl-tr, tr-br, br-bl, bl-tl одним вызовом: поэлементная арифметика numpy
+    # по отдельным углам стоила дороже самого warpPerspective на мелких кропах.
+    sides = np.linalg.norm(rect - rect[[1, 2, 3, 0]], axis=1)
+    max_width = int(max(sides[0], sides[2]))
+    max_height = int(max(sides[1], sides[3]))
+    if max_width <= 0 or max_height <= 0:
+        return image
+    dst = np.array(
+        [[0, 0], [max_width - 1, 0], [max_width - 1, max_height - 1], [0, max_height - 1]],
+        dtype="float32",
+    )
+    matrix = cv2.getPerspectiveTransform(rect, dst)
+    return cv2.warpPerspective(image, matrix, (max_width, max_height))
+
+
+class PlateRectifier:
+    """Быстрая коррекция перспективы: анализ на уменьшенной копии и кэш углов по треку.
+
+    Контур пластины ищется на копии шириной ``ANALYSIS_WIDTH``, рассматриваются только
+    ``MAX_CONTOURS`` крупнейших контуров. Углы берутся с выпуклой оболочки контура: символы
+    и блики, касающиеся рамки, не мешают аппроксимации четырехугольником, а точность
+    аппроксимации ослабляется по шагам ``APPROX_EPSILONS``. Оболочка меньше ``MIN_QUAD_AREA``
+    кропа пластиной не считается. Найденный четырехугольник хранится для трека в
+    нормированных координатах и переиспользуется на следующих кадрах, пока размер кропа
+    почти не меняется. Если пластина уже стоит ровно, вместо ``warpPerspective`` берется
+    срез по ограничивающему прямоугольнику.
+
+    Результат — кроп в оттенках серого: CRNN все равно работает с одним каналом, а
+    перевод в серый один раз до анализа втрое удешевляет ``warpPerspective``.
+    """
+
+    ANALYSIS_WIDTH: int = 128
+    MAX_CONTOURS: int = 2
+    # Точность approxPolyDP (доля периметра): от строгой к грубой, пока не получится четыре угла.
+    APPROX_EPSILONS: Tuple[float, ...] = (0.02, 0.03, 0.04)
+    # Минимальная площадь оболочки контура (доля кропа), чтобы считать ее пластиной.
+    MIN_QUAD_AREA: float = 0.2
+    # Допустимое отклонение углов от ограничивающего прямоугольника (доля размера кропа).
+    AXIS_ALIGNED_TOLERANCE: float = 0.04
+    # Сколько кадров подряд переиспользовать углы трека без повторного анализа.
+    CACHE_MAX_AGE: int = 5
+    # Допустимое относительное изменение размеров кропа для переиспользования кэша.
+    CACHE_SIZE_TOLERANCE: float = 0.15
+
+    def __init__(self, skip_axis_aligned: bool = True, cache_max_age: int = CACHE_MAX_AGE) -> None:
+        self.skip_axis_aligned = skip_axis_aligned
+        self.cache_max_age = max(0, cache_max_age)
+        # track_id -> (нормированные углы или None, высота, ширина, возраст)
+        self._cache: Dict[int, Tuple[Optional[np.ndarray], int, int, int]] = {}
+
+    def rectify(self, plate_image: np.ndarray, track_id: Optional[int] = None) -> np.ndarray:
+        """Выровненная пластина в оттенках серого (или весь кроп, если углы не найдены)."""
+        height, width = plate_image.shape[:2]
+        if plate_image.ndim == 3:
+            plate_image = cv2.cvtColor(plate_image, cv2.COLOR_BGR2GRAY)
+        if height < 2 or width < 2:
+            return plate_image
+
+        quad_norm = self._cached_quad(track_id, height, width)
+        if quad_norm is False:
+            quad = self.locate(plate_image)
+            quad_norm = None if quad is None else quad / np.array([width, height], dtype="float32")
+            if track_id is not None and self.cache_max_age > 0:
+                self._cache[track_id] = (quad_norm, height, width, 0)
+
+        if quad_norm is None:
+            return plate_image
+        # Углы упорядочиваются один раз: и проверка на ровную пластину, и warp работают с ними.
+        rect = order_points(quad_norm * np.array([width, height], dtype="float32"))
+        if self.skip_axis_aligned:
+            bounds = self._axis_aligned_bounds(rect, width, height)
+            if bounds is not None:
+                x1, y1, x2, y2 = bounds
+                cropped = plate_image[max(0, y1) : min(height, y2 + 1), max(0, x1) : min(width, x2 + 1)]
+                return cropped if cropped.size else plate_image
+        return _warp_ordered(plate_image, rect)
+
+    def drop_track(self, track_id: int) -> None:
+        self._cache.pop(track_id, None)
+
+    def reset(self) -> None:
+        """Забывает углы всех треков (после сброса трекера идентификаторы начинаются заново)."""
+        self._cache.clear()
+
+    def _cached_quad(self, track_id: Optional[int], height: int, width: int):
+        """Возвращает кэшированные углы (или None, если пластина не найдена), либо False при промахе."""
+        if track_id is None or track_id not in self._cache:
+            return False
+        quad_norm, cached_h, cached_w, age = self._cache[track_id]
+        tol = self.CACHE_SIZE_TOLERANCE
+        if (
+            age >= self.cache_max_age
+            or abs(height - cached_h) > tol * cached_h
+            or abs(width - cached_w) > tol * cached_w
+        ):
+            return False
+        self._cache[track_id] = (quad_norm, cached_h, cached_w, age + 1)
+        return quad_norm
+
+    def locate(self, plate_image: np.ndarray) -> Optional[np.ndarray]:
+        """Ищет четыре угла пластины (BGR или серый кроп) на уменьшенной копии; углы — в координатах кропа."""
+        height, width = plate_image.shape[:2]
+        gray = plate_image if plate_image.ndim == 2 else cv2.cvtColor(plate_image, cv2.COLOR_BGR2GRAY)
+        scale = min(1.0, self.ANALYSIS_WIDTH / width)
+        if scale < 1.0:
+            # Билинейное уменьшение заметно дешевле INTER_AREA и само сглаживает шум:
+            # дополнительное размытие на копии сливает рамку пластины с фоном.
+            gray = cv2.resize(
+                gray, (self.ANALYSIS_WIDTH, max(2, int(round(height * scale)))), interpolation=cv2.INTER_LINEAR
+            )
+        else:
+            gray = cv2.GaussianBlur(gray, (3, 3), 0)
+        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        # OpenCV 4 не модифицирует входное изображение, поэтому копия порога не нужна.
+        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return None
+        min_area = self.MIN_QUAD_AREA * gray.shape[0] * gray.shape[1]
+        # На уменьшенной копии контуров единицы-десятки: sorted дешевле heapq.nlargest.
+        for contour in sorted(contours, key=cv2.contourArea, reverse=True)[: self.MAX_CONTOURS]:
+            hull = cv2.convexHull(contour)
+            if cv2.contourArea(hull) < min_area:
+                continue
+            peri = cv2.arcLength(hull, True)
+            for epsilon in self.APPROX_EPSILONS:
+                approx = cv2.approxPolyDP(hull, epsilon * peri, True)
+                if len(approx) == 4:
+                    scale_x = width / gray.shape[1]
+                    scale_y = height / gray.shape[0]
+                    return approx.reshape(4, 2).astype("float32") * np.array([scale_x, scale_y], dtype="float32")
+                if len(approx) < 4:
+                    break
+        return None
+
+    def _axis_aligned_bounds(
+        self, rect: np.ndarray, width: int, height: int
+    ) -> Optional[Tuple[int, int, int, int]]:
+        """Ограничивающий прямоугольник (x1, y1, x2, y2), если упорядоченные углы почти совпадают с ним.
+
+        Восемь координат считаются в Python: на четырех точках вызовы numpy обходятся дороже.
+        """
+        (tl_x, tl_y), (tr_x, tr_y), (br_x, br_y), (bl_x, bl_y) = rect.tolist()
+        x_min, x_max = min(tl_x, bl_x, tr_x, br_x), max(tl_x, bl_x, tr_x, br_x)
+        y_min, y_max = min(tl_y, tr_y, bl_y, br_y), max(tl_y, tr_y, bl_y, br_y)
+        dx = max(tl_x - x_min, bl_x - x_min, x_max - tr_x, x_max - br_x)
+        dy = max(tl_y - y_min, tr_y - y_min, y_max - bl_y, y_max - br_y)
+        if dx > self.AXIS_ALIGNED_TOLERANCE * width or dy > self.AXIS_ALIGNED_TOLERANCE * height:
+            return None
+        return math.floor(x_min), math.floor(y_min), math.ceil(x_max), math.ceil(y_max)
+
+    # --- Эталон для проверки точности ---
+    @staticmethod
+    def locate_reference(plate_image: np.ndarray) -> Optional[np.ndarray]:
+        """Исходный алгоритм: полный размер, все контуры по убыванию площади."""
+        gray = cv2.cvtColor(plate_image, cv2.COLOR_BGR2GRAY)
+        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        contours, _ = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return None
+        contours = sorted(contours, key=cv2.contourArea, reverse=True)
+        for contour in contours:
+            peri = cv2.arcLength(contour, True)
+            approx = cv2.approxPolyDP(contour, 0.02 * peri, True)
+            if len(approx) == 4:
+                return approx.reshape(4, 2).astype("float32")
+        return None
+
+    @classmethod
+    def rectify_reference(cls, plate_image: np.ndarray) -> np.ndarray:
+        quad = cls.locate_reference(plate_image)
+        if quad is None:
+            return plate_image
+        return four_point_transform(plate_image, quad)
@@ -0,0 +1,236 @@
+"""Агрегаты событий для статистики: счетчики по минутам, часам и дням.
+
+Фоновая задача ``RollupStore`` раз в ``interval`` секунд забирает из ``events`` новые строки
+по возрастанию id (последний учтенный id хранится в таблице ``state``) и добавляет их
+в ``rollups``: число событий, уникальных номеров и нечитаемых номеров на канал и интервал,
+плюс строка «все каналы» (канал ``""``). Первый запуск так же, пачками, досчитывает всю
+историю. Нечитаемые номера в ``events`` не попадают, поэтому каналы сообщают о них
+через ``record_unreadable``, а задача дописывает их вместе с событиями. Нечитаемым считается
+трек, ушедший из кадра без зафиксированного номера после прочтений ниже порога, — по одному
+на машину, как и события, поэтому доля нечитаемых сравнивает машины с машинами.
+
+Интервалы считаются в локальном времени. Для уникальных номеров хранятся номера каждого
+интервала (``rollup_plates``); у минут и часов они удаляются через ``PLATES_KEEP``, у дней
+хранятся ``top_plates_days`` дней для топа номеров. Номера интервалов, получавших события
+после прошлой очистки, не удаляются, даже если интервал старше этого срока: архив,
+который пакетная обработка дописывает частями, учитывается точно. Только событие для
+старого интервала, не получавшего событий дольше ``PRUNE_INTERVAL``, увеличит число
+уникальных номеров даже для уже встречавшегося номера.
+"""
+
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from logging_manager import get_logger
+from storage import EventDatabase
+
+logger = get_logger(__name__)
+
+# Формат начала интервала; строки одного периода сравниваются как время.
+PERIODS = {
+    "minute": "%Y-%m-%d %H:%M",
+    "hour": "%Y-%m-%d %H:00",
+    "day": "%Y-%m-%d",
+}
+PERIOD_STEPS = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+ALL_CHANNELS = ""
+
+
+def bucket_start(moment: datetime, period: str) -> str:
+    return moment.strftime(PERIODS[period])
+
+
+def bucket_range(period: str, start: datetime, end: datetime) -> List[str]:
+    """Начала всех интервалов периода от ``start`` до ``end``, включая пустые."""
+    buckets: List[str] = []
+    moment = start
+    while moment <= end:
+        bucket = bucket_start(moment, period)
+        if not buckets or buckets[-1] != bucket:
+            buckets.append(bucket)
+        moment += PERIOD_STEPS[period]
+    last = bucket_start(end, period)
+    if not buckets or buckets[-1] != last:
+        buckets.append(last)
+    return buckets
+
+
+def _local(timestamp: str) -> datetime:
+    moment = datetime.fromisoformat(timestamp)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone()
+
+
+class RollupStore:
+    """Инкрементальное обновление агрегатов событий в фоновом потоке."""
+
+    STATE_KEY = "rollups_last_event_id"
+    # Событий за одну транзакцию: досчет истории идет пачками и не держит базу подолгу.
+    BATCH_ROWS = 20_000
+    # Сколько хранить номера минутных и часовых интервалов (нужны только для уникальных номеров).
+    PLATES_KEEP = {"minute": timedelta(hours=2), "hour": timedelta(days=2)}
+    PRUNE_INTERVAL = 3600.0
+
+    def __init__(
+        self,
+        db_path: str,
+        interval: float = 10.0,
+        minute_days: float = 7.0,
+        top_plates_days: float = 90.0,
+    ) -> None:
+        self.database = EventDatabase(db_path)
+        self.interval = interval
+        self.minute_days = minute_days
+        self.top_plates_days = top_plates_days
+        self._unreadable: Counter = Counter()
+        self._lock = threading.Lock()
+        self._update_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Первая очистка — через PRUNE_INTERVAL после запуска: к ней уже известны интервалы,
+        # которые еще дописываются (например, архивом), и их номера сохраняются.
+        self._last_prune = time.monotonic()
+        # Период → самый ранний интервал, получивший события после прошлой очистки.
+        self._active_since_prune: Dict[str, str] = {}
+        self.events_rolled = 0
+        self.last_update_seconds = 0.0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], db_path: str) -> Optional["RollupStore"]:
+        """Агрегаты по разделу ``rollups`` настроек; None, если они выключены."""
+        if not config.get("enabled", False):
+            return None
+        return cls(
+            db_path,
+            interval=float(config.get("interval_seconds", 10.0)),
+            minute_days=float(config.get("minute_days", 7)),
+            top_plates_days=float(config.get("top_plates_days", 90)),
+        )
+
+    def record_unreadable(self, channel: str, count: int = 1) -> None:
+        """Учитывает нечитаемые треки канала; вызывается из цикла канала, без обращения к БД."""
+        minute = datetime.now().astimezone().replace(second=0, microsecond=0)
+        with self._lock:
+            self._unreadable[(channel, minute)] += count
+
+    def update(self) -> int:
+        """Добавляет в агрегаты новые события и нечитаемые номера; возвращает число событий."""
+        with self._update_lock:
+            started = time.perf_counter()
+            total = 0
+            last_id = self.database.get_state(self.STATE_KEY)
+            while True:
+                rows = self.database.fetch_events_after(last_id, self.BATCH_ROWS)
+                with self._lock:
+                    unreadable, self._unreadable = self._unreadable, Counter()
+                if not rows and not unreadable:
+                    break
+                plates = self._group_by_bucket(rows)
+                self._mark_active(plates)
+                counts = {key: [sum(plate_counts.values()), 0] for key, plate_counts in plates.items()}
+                for (channel, moment), count in unreadable.items():
+                    for period in PERIODS:
+                        bucket = bucket_start(moment, period)
+                        for name in (channel, ALL_CHANNELS):
+                            counts.setdefault((period, bucket, name), [0, 0])[1] += count
+                if rows:
+                    last_id = rows[-1][0]
+                self.database.apply_rollups(
+                    {key: tuple(value) for key, value in counts.items()},
+                    plates,
+                    (self.STATE_KEY, last_id),
+                )
+                total += len(rows)
+                if len(rows) < self.BATCH_ROWS:
+                    break
+            self.events_rolled += total
+            self.last_update_seconds = time.perf_counter() - started
+            if total >= self.BATCH_ROWS:
+                logger.info("Агрегаты событий: учтено %d событий за %.1f с", total, self.last_update_seconds)
+            if time.monotonic() - self._last_prune >= self.PRUNE_INTERVAL:
+                self._prune()
+            return total
+
+    @staticmethod
+    def _group_by_bucket(rows: list) -> Dict[Tuple[str, str, str], Counter]:
+        """Номера событий по ключам (период, интервал, канал), включая строки «все каналы»."""
+        grouped: Dict[Tuple[str, str, str], Counter] = defaultdict(Counter)
+        # События пачки идут по времени: начала интервалов считаются один раз на минуту,
+        # ключ — минута в исходной записи и ее смещение часового пояса.
+        buckets_cache: Dict[Tuple[str, str], Tuple[str, ...]] = {}
+        for _, timestamp, channel, plate in rows:
+            cache_key = (timestamp[:16], timestamp[-6:])
+            buckets = buckets_cache.get(cache_key)
+            if buckets is None:
+                try:
+                    moment = _local(timestamp)
+                except ValueError:
+                    continue
+                buckets = tuple(bucket_start(moment, period) for period in PERIODS)
+                buckets_cache[cache_key] = buckets
+            for period, bucket in zip(PERIODS, buckets):
+                grouped[(period, bucket, channel)][plate] += 1
+                grouped[(period, bucket, ALL_CHANNELS)][plate] += 1
+        return grouped
+
+    def _mark_active(self, plates: Dict[Tuple[str, str, str], Counter]) -> None:
+        for period, bucket, _ in plates:
+            oldest = self._active_since_prune.get(period)
+            if oldest is None or bucket < oldest:
+                self._active_since_prune[period] = bucket
+
+    def _prune(self) -> None:
+        self._last_prune = time.monotonic()
+        now = datetime.now().astimezone()
+        plates_before = {
+            "minute": bucket_start(now - self.PLATES_KEEP["minute"], "minute"),
+            "hour": bucket_start(now - self.PLATES_KEEP["hour"], "hour"),
+            "day": bucket_start(now - timedelta(days=self.top_plates_days), "day"),
+        }
+        # Интервалы, которые еще получают события, сохраняют номера: иначе следующая порция
+        # тех же интервалов посчитала бы уже встречавшиеся номера уникальными.
+        for period, oldest in self._active_since_prune.items():
+            plates_before[period] = min(plates_before[period], oldest)
+        self._active_since_prune = {}
+        removed = self.database.prune_rollups(
+            {"minute": bucket_start(now - timedelta(days=self.minute_days), "minute")},
+            plates_before,
+        )
+        if removed:
+            logger.debug("Агрегаты событий: удалено устаревших строк: %d", removed)
+
+    def start(self) -> threading.Thread:
+        def run() -> None:
+            while True:
+                try:
+                    self.update()
+                except Exception:  # noqa: BLE001
+                    logger.exception("Не удалось обновить агрегаты событий")
+                if self._stop.wait(self.interval):
+                    return
+
+        self._thread = threading.Thread(target=run, name="rollups", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def metrics(self) -> Dict[str, float]:
+        """Показатели для ``REGISTRY.register_gauge``."""
+        return {"events": self.events_rolled, "last_update_seconds": self.last_update_seconds}
+
+    def close(self) -> None:
+        """Останавливает фоновый поток и учитывает оставшиеся события."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        try:
+            self.update()
+        except Exception:  # noqa: BLE001
+            logger.exception("Не удалось обновить агрегаты событий")
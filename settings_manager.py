@@ -1,14 +1,39 @@
+import atexit
 import json
 import os
-from typing import Any, Dict, List
+import tempfile
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from logging_manager import get_logger
+
+logger = get_logger(__name__)
+
+SettingsListener = Callable[[str], None]
 
 
 class SettingsManager:
-    """Управляет конфигурацией приложения и каналами."""
+    """Управляет конфигурацией приложения и каналами.
+
+    Настройки живут в памяти: чтение никогда не обращается к диску, а изменения
+    (``save_*``) сразу видны всем читателям, оповещают подписчиков и записываются
+    в файл отложенно — несколько изменений подряд дают одну запись. Файл заменяется
+    атомарно (временный файл + rename), поэтому сбой во время записи не портит конфиг.
+    """
+
+    # Задержка (сек) отложенной записи: изменения за это время попадают в одну запись.
+    SAVE_DELAY = 0.5
 
     def __init__(self, path: str = "settings.json") -> None:
         self.path = path
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._save_timer: Optional[threading.Timer] = None
+        self._dirty = False
+        self._listeners: List[SettingsListener] = []
         self.settings = self._load()
+        # Несохраненные изменения дописываются при выходе из процесса.
+        atexit.register(self.flush)
 
     def _default(self) -> Dict[str, Any]:
         return {
@@ -21,8 +46,13 @@ class SettingsManager:
                     "best_shots": 3,
                     "cooldown_seconds": 5,
                     "ocr_min_confidence": 0.6,
+                    "consensus_threshold": 0.9,
+                    "ocr_top_k": 5,
+                    "min_plate_quality": 0.3,
+                    "ocr_reverify_seconds": 0.0,
                     "region": {"x": 0, "y": 0, "width": 100, "height": 100},
                     "detection_mode": "continuous",
+                    "tracker": "builtin",
                     "motion_threshold": 0.01,
                     "motion_min_threshold": 0.003,
                     "motion_adaptive_scale": 3.0,
@@ -31,16 +61,69 @@ class SettingsManager:
                 },
             ],
             "storage": {"events_db": "data/events.db"},
+            "snapshots": {
+                "enabled": True,
+                "dir": "data/snapshots",
+                "max_mb": 2048,
+                "format": "jpg",
+                "quality": 85,
+                "context_width": 1280,
+                "workers": 2,
+                "max_pending": 32,
+            },
+            "clips": {
+                "enabled": False,
+                "dir": "data/clips",
+                "pre_seconds": 5.0,
+                "post_seconds": 5.0,
+                "fps": 10.0,
+                "width": 640,
+                "quality": 70,
+                "max_mb_per_channel": 64,
+            },
+            "watchlist": {
+                "enabled": True,
+                "file": "data/watchlist.csv",
+                "fuzzy": True,
+                "reload_seconds": 5.0,
+            },
+            "correlation": {
+                "enabled": True,
+                "pairs": [],
+            },
+            "rollups": {
+                "enabled": True,
+                "interval_seconds": 10.0,
+                "minute_days": 7,
+                "top_plates_days": 90,
+            },
             "tracking": {
                 "best_shots": 3,
                 "cooldown_seconds": 5,
                 "ocr_min_confidence": 0.6,
+                "consensus_threshold": 0.9,
+                "ocr_top_k": 5,
+                "min_plate_quality": 0.3,
+                "ocr_reverify_seconds": 0.0,
             },
             "logging": {
                 "level": "INFO",
                 "file": "data/app.log",
                 "max_bytes": 1048576,
                 "backup_count": 5,
+                "async": True,
+                "queue_size": 10000,
+                "format": "text",
+                "rate_limit_seconds": 5.0,
+            },
+            "metrics": {
+                "enabled": False,
+                "host": "127.0.0.1",
+                "port": 9108,
+            },
+            "inference": {
+                "backend": "torch",
+                "threads": 0,
             },
         }
 
@@ -61,6 +144,11 @@ class SettingsManager:
             if self._fill_channel_defaults(channel, tracking_defaults):
                 changed = True
 
+        for section in ("metrics", "inference", "snapshots", "clips", "watchlist", "correlation", "rollups"):
+            if section not in data:
+                data[section] = self._default()[section]
+                changed = True
+
         if changed:
             self._save(data)
         return data
@@ -71,8 +159,21 @@ class SettingsManager:
             "best_shots": int(tracking_defaults.get("best_shots", 3)),
             "cooldown_seconds": int(tracking_defaults.get("cooldown_seconds", 5)),
             "ocr_min_confidence": float(tracking_defaults.get("ocr_min_confidence", 0.6)),
+            "consensus_threshold": float(tracking_defaults.get("consensus_threshold", 0.9)),
+            "ocr_top_k": int(tracking_defaults.get("ocr_top_k", 5)),
+            "min_plate_quality": float(tracking_defaults.get("min_plate_quality", 0.3)),
+            "ocr_reverify_seconds": float(tracking_defaults.get("ocr_reverify_seconds", 0.0)),
             "region": {"x": 0, "y": 0, "width": 100, "height": 100},
             "detection_mode": "continuous",
+            "tracker": "builtin",
+            "detector_imgsz": 640,
+            "detector_rect": True,
+            "detector_half_resolution": False,
+            "decode_backend": "auto",
+            "decode_threads": 0,
+            "decode_hw_accel": False,
+            "decode_width": 0,
+            "decode_keyframes_only": False,
             "motion_threshold": 0.01,
             "motion_min_threshold": 0.003,
             "motion_adaptive_scale": 3.0,
@@ -91,31 +192,83 @@ class SettingsManager:
         return changed
 
     def _save(self, data: Dict[str, Any]) -> None:
-        with open(self.path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        self._write(json.dumps(data, ensure_ascii=False, indent=2))
+
+    def _write(self, text: str) -> None:
+        """Атомарно заменяет файл настроек: читатель видит либо старую, либо новую версию."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".settings-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def subscribe(self, listener: SettingsListener) -> None:
+        """Подписка на изменения: ``listener(section)`` вызывается в потоке, изменившем настройки."""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: SettingsListener) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _changed(self, section: str) -> None:
+        """Отмечает изменение раздела: планирует отложенную запись и оповещает подписчиков."""
+        with self._lock:
+            self._dirty = True
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.SAVE_DELAY, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+        self._notify(section)
+
+    def _notify(self, section: str) -> None:
+        for listener in list(self._listeners):
+            listener(section)
+
+    def flush(self) -> None:
+        """Немедленно записывает несохраненные изменения (вызывается таймером и при выходе)."""
+        with self._write_lock:
+            with self._lock:
+                if self._save_timer is not None:
+                    self._save_timer.cancel()
+                    self._save_timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                # Сериализуем под блокировкой, а пишем без нее: запись на диск не держит читателей.
+                text = json.dumps(self.settings, ensure_ascii=False, indent=2)
+            try:
+                self._write(text)
+            except OSError:
+                with self._lock:
+                    self._dirty = True
+                logger.exception("Не удалось сохранить настройки в %s", self.path)
 
     def get_channels(self) -> List[Dict[str, Any]]:
         channels = self.settings.get("channels", [])
         tracking_defaults = self.settings.get("tracking", {})
-        changed = False
+        # Недостающие ключи дополняются только в памяти; на диск они попадут со следующим изменением.
         for channel in channels:
-            if self._fill_channel_defaults(channel, tracking_defaults):
-                changed = True
-
-        if changed:
-            self.save_channels(channels)
+            self._fill_channel_defaults(channel, tracking_defaults)
         return channels
 
     def save_channels(self, channels: List[Dict[str, Any]]) -> None:
-        self.settings["channels"] = channels
-        self._save(self.settings)
+        with self._lock:
+            self.settings["channels"] = channels
+        self._changed("channels")
 
     def get_grid(self) -> str:
         return self.settings.get("grid", "2x2")
 
     def save_grid(self, grid: str) -> None:
-        self.settings["grid"] = grid
-        self._save(self.settings)
+        with self._lock:
+            self.settings["grid"] = grid
+        self._changed("grid")
 
     def get_db_path(self) -> str:
         storage = self.settings.get("storage", {})
@@ -126,36 +279,75 @@ class SettingsManager:
         return int(tracking.get("best_shots", 3))
 
     def save_best_shots(self, best_shots: int) -> None:
-        tracking = self.settings.get("tracking", {})
-        tracking["best_shots"] = int(best_shots)
-        self.settings["tracking"] = tracking
-        self._save(self.settings)
+        with self._lock:
+            tracking = self.settings.get("tracking", {})
+            tracking["best_shots"] = int(best_shots)
+            self.settings["tracking"] = tracking
+        self._changed("tracking")
 
     def get_cooldown_seconds(self) -> int:
         tracking = self.settings.get("tracking", {})
         return int(tracking.get("cooldown_seconds", 5))
 
     def save_cooldown_seconds(self, cooldown: int) -> None:
-        tracking = self.settings.get("tracking", {})
-        tracking["cooldown_seconds"] = int(cooldown)
-        self.settings["tracking"] = tracking
-        self._save(self.settings)
+        with self._lock:
+            tracking = self.settings.get("tracking", {})
+            tracking["cooldown_seconds"] = int(cooldown)
+            self.settings["tracking"] = tracking
+        self._changed("tracking")
 
     def get_min_confidence(self) -> float:
         tracking = self.settings.get("tracking", {})
         return float(tracking.get("ocr_min_confidence", 0.6))
 
     def save_min_confidence(self, min_conf: float) -> None:
+        with self._lock:
+            tracking = self.settings.get("tracking", {})
+            tracking["ocr_min_confidence"] = float(min_conf)
+            self.settings["tracking"] = tracking
+        self._changed("tracking")
+
+    def get_consensus_threshold(self) -> float:
         tracking = self.settings.get("tracking", {})
-        tracking["ocr_min_confidence"] = float(min_conf)
-        self.settings["tracking"] = tracking
-        self._save(self.settings)
+        return float(tracking.get("consensus_threshold", 0.9))
+
+    def save_consensus_threshold(self, threshold: float) -> None:
+        with self._lock:
+            tracking = self.settings.get("tracking", {})
+            tracking["consensus_threshold"] = float(threshold)
+            self.settings["tracking"] = tracking
+        self._changed("tracking")
 
     def get_logging_config(self) -> Dict[str, Any]:
         return self.settings.get("logging", {})
 
+    def get_metrics_config(self) -> Dict[str, Any]:
+        return self.settings.get("metrics", {})
+
+    def get_inference_config(self) -> Dict[str, Any]:
+        return self.settings.get("inference", {})
+
+    def get_snapshot_config(self) -> Dict[str, Any]:
+        return self.settings.get("snapshots", {})
+
+    def get_clip_config(self) -> Dict[str, Any]:
+        return self.settings.get("clips", {})
+
+    def get_watchlist_config(self) -> Dict[str, Any]:
+        return self.settings.get("watchlist", {})
+
+    def get_correlation_config(self) -> Dict[str, Any]:
+        return self.settings.get("correlation", {})
+
+    def get_rollup_config(self) -> Dict[str, Any]:
+        return self.settings.get("rollups", {})
+
     def refresh(self) -> None:
-        self.settings = self._load()
+        """Перечитывает файл, предварительно записав несохраненные изменения."""
+        self.flush()
+        with self._lock:
+            self.settings = self._load()
+        self._notify("all")
 
     def update_channel(self, channel_id: int, data: Dict[str, Any]) -> None:
         channels = self.get_channels()
@@ -0,0 +1,217 @@
+"""Снимки событий: кадр-контекст и кроп номера на диске с бюджетом по размеру.
+
+Кодирование (JPEG/WebP) и запись выполняются в пуле потоков; цикл канала только копирует
+кадр и ставит задачу в очередь, а при переполнении очереди снимок отбрасывается. Имя файла —
+SHA-1 содержимого внутри каталога даты (``2024/01/31/<sha1>.jpg``), поэтому одинаковые снимки
+не дублируются. Когда суммарный размер превышает бюджет, удаляются давно не использованные файлы.
+Пути к готовым снимкам дописываются в событие (``frame_path``, ``plate_path``).
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from logging_manager import get_logger
+from storage import EventDatabase
+
+logger = get_logger(__name__)
+
+ENCODE_PARAMS = {
+    "jpg": cv2.IMWRITE_JPEG_QUALITY,
+    "webp": cv2.IMWRITE_WEBP_QUALITY,
+}
+
+
+class SnapshotStore:
+    """Асинхронное сохранение снимков событий с LRU-вытеснением по бюджету диска.
+
+    Один экземпляр разделяется всеми каналами процесса: бюджет и пул кодировщиков общие.
+    """
+
+    def __init__(
+        self,
+        root: str = "data/snapshots",
+        db_path: Optional[str] = None,
+        max_bytes: int = 2 * 1024**3,
+        image_format: str = "jpg",
+        quality: int = 85,
+        context_width: int = 1280,
+        workers: int = 2,
+        max_pending: int = 32,
+    ) -> None:
+        if image_format not in ENCODE_PARAMS:
+            raise ValueError(f"Неподдерживаемый формат снимков: {image_format}")
+        self.root = root
+        self.max_bytes = max_bytes
+        self.image_format = image_format
+        self.quality = quality
+        self.context_width = context_width
+        self.max_pending = max_pending
+        self.database = EventDatabase(db_path) if db_path else None
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="snapshot")
+        self._lock = threading.Lock()
+        # Файлы снимков в порядке последнего использования (первый — кандидат на удаление).
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._indexed = False
+        self._index_lock = threading.Lock()
+        self.total_bytes = 0
+        self.pending = 0
+        self.saved = 0
+        self.dropped = 0
+        self.evicted = 0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], db_path: Optional[str] = None) -> Optional["SnapshotStore"]:
+        """Хранилище по разделу ``snapshots`` настроек; None, если снимки выключены."""
+        if not config.get("enabled", False):
+            return None
+        return cls(
+            root=config.get("dir", "data/snapshots"),
+            db_path=db_path,
+            max_bytes=int(float(config.get("max_mb", 2048)) * 1024**2),
+            image_format=config.get("format", "jpg"),
+            quality=int(config.get("quality", 85)),
+            context_width=int(config.get("context_width", 1280)),
+            workers=int(config.get("workers", 2)),
+            max_pending=int(config.get("max_pending", 32)),
+        )
+
+    def submit(
+        self, event_id: Optional[int], frame: np.ndarray, bbox: Optional[Sequence[int]], timestamp: str
+    ) -> bool:
+        """Ставит снимок события в очередь; False — очередь заполнена и снимок отброшен.
+
+        Кадр копируется сразу: после возврата вызывающий может рисовать на нем превью.
+        """
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.dropped += 1
+                return False
+            self.pending += 1
+        crop = None
+        if bbox:
+            x1, y1, x2, y2 = (int(v) for v in bbox)
+            crop = frame[max(0, y1) : max(0, y2), max(0, x1) : max(0, x2)].copy()
+        self._executor.submit(self._save, event_id, frame.copy(), crop, timestamp)
+        return True
+
+    def _save(self, event_id: Optional[int], frame: np.ndarray, crop: Optional[np.ndarray], timestamp: str) -> None:
+        try:
+            self._ensure_index()
+            shard = self._shard(timestamp)
+            if self.context_width and frame.shape[1] > self.context_width:
+                scale = self.context_width / frame.shape[1]
+                frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            frame_path = self._write(frame, shard)
+            plate_path = self._write(crop, shard) if crop is not None and crop.size else None
+            self._evict()
+            if self.database is not None and event_id is not None:
+                self.database.attach_snapshots(event_id, frame_path, plate_path)
+            with self._lock:
+                self.saved += 1
+        except Exception:  # noqa: BLE001
+            logger.exception("Не удалось сохранить снимок события %s", event_id)
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def _shard(self, timestamp: str) -> str:
+        try:
+            moment = datetime.fromisoformat(timestamp)
+        except (TypeError, ValueError):
+            moment = datetime.now(timezone.utc)
+        return os.path.join(self.root, moment.strftime("%Y"), moment.strftime("%m"), moment.strftime("%d"))
+
+    def _write(self, image: np.ndarray, shard: str) -> Optional[str]:
+        ok, buffer = cv2.imencode(f".{self.image_format}", image, [ENCODE_PARAMS[self.image_format], self.quality])
+        if not ok:
+            return None
+        data = buffer.tobytes()
+        path = os.path.join(shard, f"{hashlib.sha1(data).hexdigest()}.{self.image_format}")
+        with self._lock:
+            known = path in self._index
+            if known:
+                self._index.move_to_end(path)
+        if known:
+            os.utime(path)
+            return path
+        os.makedirs(shard, exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as handle:
+            handle.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._index[path] = len(data)
+            self.total_bytes += len(data)
+        return path
+
+    def _ensure_index(self) -> None:
+        """Учитывает снимки прошлых запусков (один раз, в потоке пула)."""
+        # Обход диска идет под отдельной блокировкой, чтобы submit() из канала не ждал его.
+        with self._index_lock:
+            if self._indexed:
+                return
+            files = []
+            for directory, _, names in os.walk(self.root):
+                for name in names:
+                    if name.endswith(".tmp"):
+                        continue
+                    path = os.path.join(directory, name)
+                    try:
+                        info = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((info.st_mtime, path, info.st_size))
+            with self._lock:
+                # Старые файлы встают в начало очереди вытеснения, перед уже записанными в этом запуске.
+                for _, path, size in sorted(files, reverse=True):
+                    if path not in self._index:
+                        self._index[path] = size
+                        self._index.move_to_end(path, last=False)
+                        self.total_bytes += size
+            self._indexed = True
+
+    def _evict(self) -> None:
+        removed = []
+        with self._lock:
+            while self.total_bytes > self.max_bytes and len(self._index) > 1:
+                path, size = self._index.popitem(last=False)
+                self.total_bytes -= size
+                self.evicted += 1
+                removed.append(path)
+        for path in removed:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            # Пустые каталоги прошлых дней убираем вместе с последним файлом, но не выше корня.
+            directory = os.path.dirname(path)
+            root = os.path.abspath(self.root)
+            while os.path.abspath(directory) != root:
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    break
+                directory = os.path.dirname(directory)
+
+    def metrics(self) -> Dict[str, float]:
+        """Показатели для ``REGISTRY.register_gauge``."""
+        with self._lock:
+            return {
+                "saved": self.saved,
+                "dropped": self.dropped,
+                "evicted": self.evicted,
+                "pending": self.pending,
+                "bytes": self.total_bytes,
+            }
+
+    def close(self) -> None:
+        """Дожидается записи поставленных снимков."""
+        self._executor.shutdown(wait=True)
@@ -1,11 +1,99 @@
 import os
 import sqlite3
+import time
 from datetime import datetime, timezone
-from typing import List, Optional, Sequence
+from typing import Dict, List, Optional, Sequence, Tuple
 
 import aiosqlite
 
 from logging_manager import get_logger
+from metrics import LatencyHistogram
+
+# Колонки, добавленные после первой версии схемы: в старых базах создаются при открытии.
+ADDED_COLUMNS = {"frame_path": "TEXT", "plate_path": "TEXT", "clip_path": "TEXT"}
+
+# Срабатывания списка розыска: отдельная таблица, чтобы журнал тревог читался без фильтра по событиям.
+ALERTS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS alerts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        event_id INTEGER,
+        timestamp TEXT NOT NULL,
+        channel TEXT NOT NULL,
+        plate TEXT NOT NULL,
+        listed_plate TEXT NOT NULL,
+        match_kind TEXT NOT NULL,
+        note TEXT
+    )
+"""
+
+# Проезды между парами каналов (correlator.py): событие начала, событие конца и длительность.
+PASSAGES_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS passages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        pair TEXT NOT NULL,
+        plate TEXT NOT NULL,
+        started_at TEXT NOT NULL,
+        finished_at TEXT NOT NULL,
+        duration_seconds REAL NOT NULL,
+        start_event_id INTEGER,
+        end_event_id INTEGER
+    )
+"""
+
+# Агрегаты событий (rollups.py): счетчики по периоду (minute/hour/day), началу интервала
+# и каналу; канал "" — все каналы вместе. Вкладка статистики читает только эти таблицы.
+ROLLUPS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS rollups (
+        period TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        channel TEXT NOT NULL,
+        events INTEGER NOT NULL DEFAULT 0,
+        unique_plates INTEGER NOT NULL DEFAULT 0,
+        unreadable INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (period, bucket, channel)
+    ) WITHOUT ROWID
+"""
+
+# Номера интервалов: для подсчета уникальных номеров и топа номеров по дням.
+ROLLUP_PLATES_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS rollup_plates (
+        period TEXT NOT NULL,
+        channel TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        plate TEXT NOT NULL,
+        events INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (period, channel, bucket, plate)
+    ) WITHOUT ROWID
+"""
+
+# Служебные значения фоновых задач, например id последнего учтенного в агрегатах события.
+STATE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS state (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    )
+"""
+
+# Выборка событий канала за период (восстановление коррелятора); в существующей базе
+# индекс строится один раз при первом запуске.
+EVENTS_CHANNEL_TIME_INDEX = """
+    CREATE INDEX IF NOT EXISTS idx_events_channel_timestamp ON events (channel, timestamp)
+"""
+
+AUX_SCHEMAS = (
+    ALERTS_SCHEMA,
+    PASSAGES_SCHEMA,
+    ROLLUPS_SCHEMA,
+    ROLLUP_PLATES_SCHEMA,
+    STATE_SCHEMA,
+    EVENTS_CHANNEL_TIME_INDEX,
+)
+
+
+def _missing_columns(existing: Sequence[str]) -> List[str]:
+    return [
+        f"ALTER TABLE events ADD COLUMN {name} {kind}" for name, kind in ADDED_COLUMNS.items() if name not in existing
+    ]
 
 
 class EventDatabase:
@@ -30,10 +118,18 @@ class EventDatabase:
                     channel TEXT NOT NULL,
                     plate TEXT NOT NULL,
                     confidence REAL,
-                    source TEXT
+                    source TEXT,
+                    frame_path TEXT,
+                    plate_path TEXT,
+                    clip_path TEXT
                 )
                 """
             )
+            existing = [row[1] for row in conn.execute("PRAGMA table_info(events)")]
+            for statement in _missing_columns(existing):
+                conn.execute(statement)
+            for schema in AUX_SCHEMAS:
+                conn.execute(schema)
             conn.commit()
 
     def insert_event(
@@ -56,6 +152,36 @@ class EventDatabase:
             )
             return cursor.lastrowid
 
+    def insert_events(self, events: Sequence[Tuple[str, str, str, float, str]]) -> int:
+        """Массовая вставка событий (timestamp, channel, plate, confidence, source) одной транзакцией."""
+        if not events:
+            return 0
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO events (timestamp, channel, plate, confidence, source) VALUES (?, ?, ?, ?, ?)",
+                events,
+            )
+            conn.commit()
+        self.logger.info("Events saved: %d", len(events))
+        return len(events)
+
+    def attach_snapshots(self, event_id: int, frame_path: Optional[str], plate_path: Optional[str]) -> None:
+        """Дописывает к событию пути к снимкам кадра и номера."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE events SET frame_path = ?, plate_path = ? WHERE id = ?",
+                (frame_path, plate_path, event_id),
+            )
+            conn.commit()
+
+    def attach_clip(self, event_ids: Sequence[int], clip_path: str) -> None:
+        """Дописывает путь к видеофрагменту всем событиям, попавшим в него."""
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE events SET clip_path = ? WHERE id = ?", [(clip_path, event_id) for event_id in event_ids]
+            )
+            conn.commit()
+
     def fetch_recent(self, limit: int = 100) -> List[sqlite3.Row]:
         with self._connect() as conn:
             conn.row_factory = sqlite3.Row
@@ -123,6 +249,142 @@ class EventDatabase:
             cursor = conn.execute(query, tuple(params))
             return cursor.fetchall()
 
+    def fetch_alerts(self, limit: int = 100) -> List[sqlite3.Row]:
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute("SELECT * FROM alerts ORDER BY id DESC LIMIT ?", (limit,))
+            return cursor.fetchall()
+
+    def fetch_passages(self, limit: int = 100) -> List[sqlite3.Row]:
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute("SELECT * FROM passages ORDER BY id DESC LIMIT ?", (limit,))
+            return cursor.fetchall()
+
+    def fetch_since(self, start: str, channels: Sequence[str]) -> List[sqlite3.Row]:
+        """События указанных каналов начиная с ``start`` в порядке записи.
+
+        Время сравнивается строками, чтобы работал индекс (channel, timestamp): каналы
+        и пакетная обработка пишут ISO-время в UTC, и ``start`` должен быть в том же виде.
+        """
+        placeholders = ",".join("?" for _ in channels)
+        query = (
+            f"SELECT id, timestamp, channel, plate FROM events WHERE channel IN ({placeholders})"
+            " AND timestamp >= ? ORDER BY id"
+        )
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(query, (*channels, start))
+            return cursor.fetchall()
+
+    def fetch_events_after(self, last_id: int, limit: int) -> List[Tuple[int, str, str, str]]:
+        """События (id, timestamp, channel, plate) с id больше ``last_id`` по возрастанию id."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "SELECT id, timestamp, channel, plate FROM events WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, limit),
+            )
+            return cursor.fetchall()
+
+    def get_state(self, name: str, default: int = 0) -> int:
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM state WHERE name = ?", (name,)).fetchone()
+            return row[0] if row else default
+
+    def apply_rollups(
+        self,
+        counts: Dict[Tuple[str, str, str], Tuple[int, int]],
+        plates: Dict[Tuple[str, str, str], Dict[str, int]],
+        state: Optional[Tuple[str, int]] = None,
+    ) -> None:
+        """Добавляет приращения агрегатов одной транзакцией.
+
+        ``counts``: (период, интервал, канал) → (события, нечитаемые); ``plates``: тот же ключ →
+        {номер: событий}. Уникальные номера увеличиваются на число номеров, которых в интервале
+        еще не было. ``state`` — (имя, значение) служебного счетчика, записываемого вместе с агрегатами.
+        """
+        with self._connect() as conn:
+            # Новые номера считаются одним запросом по временной таблице, а не по запросу на интервал.
+            conn.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS incoming_plates ("
+                "period TEXT, channel TEXT, bucket TEXT, plate TEXT, events INTEGER)"
+            )
+            conn.execute("DELETE FROM incoming_plates")
+            conn.executemany(
+                "INSERT INTO incoming_plates VALUES (?, ?, ?, ?, ?)",
+                [
+                    (period, channel, bucket, plate, count)
+                    for (period, bucket, channel), plate_counts in plates.items()
+                    for plate, count in plate_counts.items()
+                ],
+            )
+            unique = {
+                (period, bucket, channel): new
+                for period, channel, bucket, new in conn.execute(
+                    "SELECT period, channel, bucket, COUNT(*) FROM incoming_plates AS i WHERE NOT EXISTS ("
+                    "SELECT 1 FROM rollup_plates AS p WHERE p.period = i.period AND p.channel = i.channel"
+                    " AND p.bucket = i.bucket AND p.plate = i.plate) GROUP BY period, channel, bucket"
+                )
+            }
+            conn.execute(
+                "INSERT INTO rollup_plates (period, channel, bucket, plate, events)"
+                " SELECT period, channel, bucket, plate, events FROM incoming_plates WHERE true"
+                " ON CONFLICT (period, channel, bucket, plate) DO UPDATE SET events = events + excluded.events"
+            )
+            conn.executemany(
+                "INSERT INTO rollups (period, bucket, channel, events, unique_plates, unreadable) VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (period, bucket, channel) DO UPDATE SET events = events + excluded.events,"
+                " unique_plates = unique_plates + excluded.unique_plates, unreadable = unreadable + excluded.unreadable",
+                [
+                    (period, bucket, channel, events, unique.get((period, bucket, channel), 0), unreadable)
+                    for (period, bucket, channel), (events, unreadable) in counts.items()
+                ],
+            )
+            if state is not None:
+                conn.execute(
+                    "INSERT INTO state (name, value) VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET value = excluded.value",
+                    state,
+                )
+            conn.commit()
+
+    def prune_rollups(self, rollups_before: Dict[str, str], plates_before: Dict[str, str]) -> int:
+        """Удаляет агрегаты и номера интервалов раньше заданных границ по периодам."""
+        removed = 0
+        with self._connect() as conn:
+            for period, bucket in rollups_before.items():
+                removed += conn.execute(
+                    "DELETE FROM rollups WHERE period = ? AND bucket < ?", (period, bucket)
+                ).rowcount
+            for period, bucket in plates_before.items():
+                removed += conn.execute(
+                    "DELETE FROM rollup_plates WHERE period = ? AND bucket < ?", (period, bucket)
+                ).rowcount
+            conn.commit()
+        return removed
+
+    def fetch_rollups(self, period: str, start: str, channel: str = "") -> List[sqlite3.Row]:
+        """Агрегаты периода для канала (``""`` — все каналы) с интервала ``start`` по возрастанию."""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(
+                "SELECT bucket, events, unique_plates, unreadable FROM rollups"
+                " WHERE period = ? AND bucket >= ? AND channel = ? ORDER BY bucket",
+                (period, start, channel),
+            )
+            return cursor.fetchall()
+
+    def fetch_top_plates(self, start: str, channel: str = "", limit: int = 10) -> List[sqlite3.Row]:
+        """Самые частые номера по дневным агрегатам с дня ``start``."""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(
+                "SELECT plate, SUM(events) AS events, COUNT(*) AS days FROM rollup_plates"
+                " WHERE period = 'day' AND channel = ? AND bucket >= ?"
+                " GROUP BY plate ORDER BY events DESC LIMIT ?",
+                (channel, start, limit),
+            )
+            return cursor.fetchall()
+
     def list_channels(self) -> List[str]:
         with self._connect() as conn:
             cursor = conn.execute("SELECT DISTINCT channel FROM events ORDER BY channel")
@@ -137,6 +399,11 @@ class AsyncEventDatabase:
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         self._initialized = False
         self.logger = get_logger(__name__)
+        # Метрики записи: задержка, число вставок/ошибок и записи в процессе выполнения.
+        self.write_latency = LatencyHistogram()
+        self.inserts = 0
+        self.failures = 0
+        self.pending = 0
 
     async def _ensure_schema(self) -> None:
         if self._initialized:
@@ -150,10 +417,19 @@ class AsyncEventDatabase:
                     channel TEXT NOT NULL,
                     plate TEXT NOT NULL,
                     confidence REAL,
-                    source TEXT
+                    source TEXT,
+                    frame_path TEXT,
+                    plate_path TEXT,
+                    clip_path TEXT
                 )
                 """
             )
+            async with conn.execute("PRAGMA table_info(events)") as cursor:
+                existing = [row[1] async for row in cursor]
+            for statement in _missing_columns(existing):
+                await conn.execute(statement)
+            for schema in AUX_SCHEMAS:
+                await conn.execute(schema)
             await conn.commit()
         self._initialized = True
 
@@ -164,20 +440,70 @@ class AsyncEventDatabase:
         confidence: float = 0.0,
         source: str = "",
         timestamp: Optional[str] = None,
+    ) -> int:
+        self.pending += 1
+        started = time.perf_counter()
+        try:
+            await self._ensure_schema()
+            ts = timestamp or datetime.now(timezone.utc).isoformat()
+            async with aiosqlite.connect(self.db_path) as conn:
+                cursor = await conn.execute(
+                    "INSERT INTO events (timestamp, channel, plate, confidence, source) VALUES (?, ?, ?, ?, ?)",
+                    (ts, channel, plate, confidence, source),
+                )
+                await conn.commit()
+                self.inserts += 1
+                self.logger.info(
+                    "[async] Event saved: %s (%s, conf=%.2f, src=%s)",
+                    plate,
+                    channel,
+                    confidence or 0.0,
+                    source,
+                )
+                return cursor.lastrowid
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            self.pending -= 1
+            self.write_latency.observe(time.perf_counter() - started)
+
+    async def insert_alert_async(
+        self,
+        event_id: Optional[int],
+        timestamp: str,
+        channel: str,
+        plate: str,
+        listed_plate: str,
+        match_kind: str,
+        note: str = "",
     ) -> int:
         await self._ensure_schema()
-        ts = timestamp or datetime.now(timezone.utc).isoformat()
         async with aiosqlite.connect(self.db_path) as conn:
             cursor = await conn.execute(
-                "INSERT INTO events (timestamp, channel, plate, confidence, source) VALUES (?, ?, ?, ?, ?)",
-                (ts, channel, plate, confidence, source),
+                "INSERT INTO alerts (event_id, timestamp, channel, plate, listed_plate, match_kind, note)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (event_id, timestamp, channel, plate, listed_plate, match_kind, note),
             )
             await conn.commit()
-            self.logger.info(
-                "[async] Event saved: %s (%s, conf=%.2f, src=%s)",
-                plate,
-                channel,
-                confidence or 0.0,
-                source,
+            return cursor.lastrowid
+
+    async def insert_passage_async(
+        self,
+        pair: str,
+        plate: str,
+        started_at: str,
+        finished_at: str,
+        duration_seconds: float,
+        start_event_id: Optional[int] = None,
+        end_event_id: Optional[int] = None,
+    ) -> int:
+        await self._ensure_schema()
+        async with aiosqlite.connect(self.db_path) as conn:
+            cursor = await conn.execute(
+                "INSERT INTO passages (pair, plate, started_at, finished_at, duration_seconds,"
+                " start_event_id, end_event_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (pair, plate, started_at, finished_at, duration_seconds, start_event_id, end_event_id),
             )
+            await conn.commit()
             return cursor.lastrowid
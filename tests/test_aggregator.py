@@ -0,0 +1,111 @@
+"""Посимвольный консенсус ``TrackAggregator``: голосование по позиции, длине и досрочная выдача.
+
+Запуск из корня репозитория::
+
+    python -m pytest tests/test_aggregator.py
+"""
+
+import pytest
+
+from detector import TrackAggregator
+
+PLATE = "A123BC77"
+
+
+def confident(text: str, conf: float = 0.95):
+    return text, [conf] * len(text)
+
+
+def test_vote_position_unanimous_is_confident():
+    aggregator = TrackAggregator(best_shots=3)
+    char, posterior = aggregator._vote_position([("A", 0.9), ("A", 0.9), ("A", 0.9)])
+    assert char == "A"
+    assert posterior > 0.999
+
+
+def test_vote_position_weighs_votes_by_confidence():
+    aggregator = TrackAggregator(best_shots=3)
+    # Два неуверенных голоса против одного уверенного: побеждает уверенный.
+    char, posterior = aggregator._vote_position([("8", 0.2), ("8", 0.2), ("B", 0.99)])
+    assert char == "B"
+    assert 0.0 < posterior < 1.0
+
+    char, _ = aggregator._vote_position([("8", 0.9), ("8", 0.9), ("B", 0.6)])
+    assert char == "8"
+
+
+def test_vote_position_clamps_extreme_confidence():
+    aggregator = TrackAggregator(best_shots=3)
+    # Уверенность 1.0 не обнуляет остальные голоса и не ломает логарифмы.
+    char, posterior = aggregator._vote_position([("A", 1.0), ("B", 1.0), ("B", 1.0)])
+    assert char == "B"
+    assert 0.0 < posterior <= 1.0
+
+
+def test_consensus_merges_positions_across_candidates():
+    aggregator = TrackAggregator(best_shots=3)
+    # Каждый кадр ошибся в своей позиции и не уверен в ней: консенсус собирается посимвольно.
+    bucket = [
+        ("A123BC77", [0.95] * 8),
+        ("A1Z3BC77", [0.95, 0.95, 0.3, 0.95, 0.95, 0.95, 0.95, 0.95]),
+        ("A123BC71", [0.95] * 7 + [0.3]),
+    ]
+    text, posterior = aggregator._consensus(bucket)
+    assert text == PLATE
+    assert 0.0 < posterior < 1.0
+
+
+def test_consensus_votes_length_by_mean_confidence():
+    aggregator = TrackAggregator(best_shots=3)
+    bucket = [confident(PLATE, 0.9), confident("A123BC777", 0.2), confident(PLATE, 0.8)]
+    text, _ = aggregator._consensus(bucket)
+    assert text == PLATE
+
+
+def test_consensus_posterior_drops_with_length_disagreement():
+    aggregator = TrackAggregator(best_shots=3)
+    _, agreed = aggregator._consensus([confident(PLATE), confident(PLATE)])
+    _, split = aggregator._consensus([confident(PLATE), confident("A123BC777")])
+    assert split < agreed
+    assert split <= 0.5
+
+
+def test_add_result_emits_early_once():
+    aggregator = TrackAggregator(best_shots=5, consensus_threshold=0.9)
+    assert aggregator.add_result(1, *confident(PLATE)) == ""  # один кадр — еще не консенсус
+    assert aggregator.add_result(1, *confident(PLATE)) == PLATE
+    assert aggregator.last_posterior[1] >= 0.9
+    # Тот же номер повторно не выдается.
+    assert aggregator.add_result(1, *confident(PLATE)) == ""
+
+
+def test_add_result_falls_back_to_quorum():
+    aggregator = TrackAggregator(best_shots=3, consensus_threshold=1.0)
+    assert aggregator.add_result(7, *confident(PLATE)) == ""
+    assert aggregator.add_result(7, *confident("A123BC78")) == ""
+    assert aggregator.add_result(7, *confident(PLATE)) == PLATE
+
+
+def test_add_result_keeps_only_best_shots():
+    aggregator = TrackAggregator(best_shots=2, consensus_threshold=1.0)
+    for text in ("X000XX00", PLATE, PLATE):
+        aggregator.add_result(3, *confident(text))
+    assert [text for text, _ in aggregator.track_candidates[3]] == [PLATE, PLATE]
+
+
+@pytest.mark.parametrize("char_confidences", [None, [0.9, 0.9]])
+def test_add_result_uses_overall_confidence_without_char_confidences(char_confidences):
+    aggregator = TrackAggregator(best_shots=3)
+    aggregator.add_result(2, PLATE, char_confidences, confidence=0.7)
+    assert aggregator.track_candidates[2] == [(PLATE, [0.7] * len(PLATE))]
+
+
+def test_empty_text_and_drop_track():
+    aggregator = TrackAggregator(best_shots=3)
+    assert aggregator.add_result(4, "") == ""
+    assert 4 not in aggregator.track_candidates
+
+    aggregator.add_result(4, *confident(PLATE))
+    aggregator.drop_track(4)
+    assert 4 not in aggregator.track_candidates
+    assert 4 not in aggregator.last_posterior
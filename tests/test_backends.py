@@ -0,0 +1,174 @@
+"""Эквивалентность бэкендов инференса: ONNX Runtime и OpenVINO против PyTorch.
+
+Выбор бэкенда и путей экспортированных моделей проверяется без torch. Тесты экспорта
+сохраняют CRNN со случайными весами во временный ONNX — как float-модель, так и
+FX-квантованную, собранную тем же ``CRNNRecognizer._build_quantized``, что и
+``python -m backends``, — и сравнивают log-probs, поэтому не требуют весов моделей.
+Последний тест сравнивает экспортированные модели проекта на синтетических номерах и
+кадрах с порогами ``benchmarks.backend_bench --check``; без весов или экспорта он
+пропускается.
+
+Запуск из корня репозитория::
+
+    python -m pytest tests
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+import backends
+from benchmarks import backend_bench
+from detector import Config
+
+# Допустимое расхождение log-probs float-модели (разный порядок операций в ядрах).
+MAX_LOGPROB_DIFF = 1e-3
+# Для INT8-модели ядра ONNX Runtime/OpenVINO округляют иначе, чем fbgemm: сравниваем
+# среднее расхождение и совпадение символа на каждом шаге CTC.
+MAX_QUANTIZED_MEAN_DIFF = 0.1
+MIN_QUANTIZED_ARGMAX_AGREEMENT = 0.95
+EXPORTED_BACKENDS = ("onnxruntime", "openvino")
+
+
+# --- Без torch ---
+def test_normalize_backend():
+    assert backends.normalize_backend(None) == "torch"
+    assert backends.normalize_backend("OpenVINO") == "openvino"
+    assert backends.normalize_backend("tensorrt") == "torch"
+
+
+def test_yolo_model_path():
+    model_path = os.path.join("models", "yolo", "best.pt")
+    assert backends.yolo_model_path(model_path, "torch") == model_path
+    assert backends.yolo_model_path(model_path, "onnxruntime") == os.path.join("models", "yolo", "best.onnx")
+    assert backends.yolo_model_path(model_path, "openvino") == os.path.join("models", "yolo", "best_openvino_model")
+
+
+def test_resolve_yolo_model_falls_back_without_export(tmp_path):
+    model_path = str(tmp_path / "best.pt")
+    assert backends.resolve_yolo_model(model_path, "onnxruntime") == model_path
+    os.makedirs(tmp_path / "best_openvino_model")
+    assert backends.resolve_yolo_model(model_path, "openvino") == str(tmp_path / "best_openvino_model")
+
+
+def test_exported_yolo_imgsz(tmp_path):
+    pytest.importorskip("yaml")
+    model_dir = tmp_path / "best_openvino_model"
+    model_dir.mkdir()
+    (model_dir / "metadata.yaml").write_text("imgsz:\n- 384\n- 640\n", encoding="utf-8")
+    assert backends.exported_yolo_imgsz(str(model_dir)) == (384, 640)
+    # Нечитаемая модель не роняет загрузку: проверка входа просто пропускается.
+    assert backends.exported_yolo_imgsz(str(tmp_path / "missing.onnx")) is None
+
+
+# --- Экспорт и сравнение с PyTorch ---
+@pytest.fixture
+def torch():
+    return pytest.importorskip("torch")
+
+
+def _create_backend(backend: str, onnx_path: str) -> backends.CrnnBackend:
+    if backend == "onnxruntime":
+        pytest.importorskip("onnxruntime")
+        return backends.OnnxRuntimeCrnnBackend(onnx_path)
+    pytest.importorskip("openvino")
+    return backends.OpenVinoCrnnBackend(onnx_path)
+
+
+def _random_batches(torch, sizes=(1, 4)):
+    return [torch.randn(size, 1, Config.OCR_IMG_HEIGHT, Config.OCR_IMG_WIDTH) for size in sizes]
+
+
+@pytest.mark.parametrize("backend", EXPORTED_BACKENDS)
+def test_crnn_export_matches_torch(tmp_path, torch, backend):
+    pytest.importorskip("onnx")
+    from crnn_model import CRNN
+
+    torch.manual_seed(0)
+    model = CRNN(len(Config.OCR_ALPHABET) + 1).eval()
+    onnx_path = backends.export_crnn(
+        model, str(tmp_path / "crnn.onnx"), Config.OCR_IMG_HEIGHT, Config.OCR_IMG_WIDTH
+    )
+    reference = backends.TorchCrnnBackend(model)
+    candidate = _create_backend(backend, onnx_path)
+
+    # Разные размеры батча: у экспортированной модели динамическая ось батча.
+    for batch in _random_batches(torch):
+        with torch.no_grad():
+            expected = reference(batch)
+        actual = candidate(batch)
+        assert actual.shape == expected.shape
+        assert float((actual - expected).abs().max()) < MAX_LOGPROB_DIFF
+
+
+def _save_quantized_weights(torch, path: str) -> None:
+    """Сохраняет state_dict FX-квантованного CRNN со случайными весами, как веса проекта."""
+    import torch.ao.quantization.quantize_fx as quantize_fx
+    from torch.ao.quantization import QConfigMapping
+
+    from crnn_model import CRNN
+
+    model = CRNN(len(Config.OCR_ALPHABET) + 1).eval()
+    qconfig_mapping = QConfigMapping().set_global(torch.ao.quantization.get_default_qconfig("fbgemm"))
+    example = torch.randn(1, 1, Config.OCR_IMG_HEIGHT, Config.OCR_IMG_WIDTH)
+    prepared = quantize_fx.prepare_fx(model, qconfig_mapping, (example,))
+    with torch.no_grad():
+        # Калибровка наблюдателей: без нее шкалы квантования вырождены.
+        for batch in _random_batches(torch, sizes=(8, 8, 8)):
+            prepared(batch)
+    torch.save(quantize_fx.convert_fx(prepared).state_dict(), path)
+
+
+@pytest.mark.parametrize("backend", EXPORTED_BACKENDS)
+def test_quantized_crnn_export_matches_torch(tmp_path, torch, backend):
+    pytest.importorskip("onnx")
+    if "fbgemm" not in torch.backends.quantized.supported_engines:
+        pytest.skip("квантованные ядра fbgemm недоступны")
+    from detector import CRNNRecognizer
+
+    torch.manual_seed(0)
+    weights_path = str(tmp_path / "cnn.pth")
+    _save_quantized_weights(torch, weights_path)
+    # Тот же путь, что у ``python -m backends``: сборка FX-модели из весов и экспорт в ONNX (QDQ).
+    model = CRNNRecognizer._build_quantized(weights_path, Config.DEVICE)
+    onnx_path = backends.export_crnn(
+        model, backends.crnn_onnx_path(weights_path), Config.OCR_IMG_HEIGHT, Config.OCR_IMG_WIDTH
+    )
+    reference = backends.TorchCrnnBackend(model)
+    candidate = _create_backend(backend, onnx_path)
+
+    for batch in _random_batches(torch):
+        with torch.no_grad():
+            expected = reference(batch)
+        actual = candidate(batch)
+        assert actual.shape == expected.shape
+        assert float((actual - expected).abs().mean()) < MAX_QUANTIZED_MEAN_DIFF
+        agreement = float((actual.argmax(dim=2) == expected.argmax(dim=2)).float().mean())
+        assert agreement >= MIN_QUANTIZED_ARGMAX_AGREEMENT
+
+
+@pytest.mark.parametrize("backend", EXPORTED_BACKENDS)
+def test_exported_models_match_torch(torch, backend):
+    pytest.importorskip("ultralytics")
+    from detector import CRNNRecognizer, YOLODetector
+
+    if not os.path.exists(Config.YOLO_MODEL_PATH) or not os.path.exists(Config.OCR_MODEL_PATH):
+        pytest.skip("нет весов моделей")
+    rng = np.random.default_rng(0)
+
+    crnn = CRNNRecognizer(Config.OCR_MODEL_PATH, Config.DEVICE, backend=backend)
+    if crnn.backend.name == backend:
+        reference = CRNNRecognizer(Config.OCR_MODEL_PATH, Config.DEVICE, backend="torch")
+        result = backend_bench.compare_crnn(reference, crnn, backend_bench.synthetic_plates(rng, 50))
+        assert result["crnn_text_agreement"] >= backend_bench.MIN_TEXT_AGREEMENT
+
+    yolo = YOLODetector(Config.YOLO_MODEL_PATH, Config.DEVICE, backend=backend)
+    if yolo.backend == backend:
+        # Экспортированная модель имеет квадратный вход, поэтому эталон тоже без rect.
+        reference = YOLODetector(Config.YOLO_MODEL_PATH, Config.DEVICE, backend="torch", rect=False)
+        result = backend_bench.compare_yolo(reference, yolo, backend_bench.synthetic_frames(rng, 10))
+        assert result["yolo_box_agreement"] >= backend_bench.MIN_BOX_AGREEMENT
+
+    if crnn.backend.name != backend and yolo.backend != backend:
+        pytest.skip(f"бэкенд {backend} не установлен или модели не экспортированы")
@@ -0,0 +1,124 @@
+"""Отбор бестшотов: top-K по качеству, освобождение места и повторное открытие трека.
+
+Запуск из корня репозитория::
+
+    python -m pytest tests/test_best_shots.py
+"""
+
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from detector import ANPR_Pipeline, BestShotSelector, PlateQualityScorer
+
+
+def test_top_k_admits_only_better_crops():
+    selector = BestShotSelector(top_k=2, min_quality=0.3)
+    assert selector.should_process(1, 0.5)
+    assert selector.should_process(1, 0.6)
+    assert not selector.should_process(1, 0.4)  # хуже худшего из top-K
+    assert selector.should_process(1, 0.7)  # вытесняет 0.5
+    assert not selector.should_process(1, 0.55)
+    assert sorted(selector._track_scores[1]) == [0.6, 0.7]
+
+
+def test_low_quality_is_rejected_even_with_reopen():
+    selector = BestShotSelector(top_k=2, min_quality=0.3)
+    assert not selector.should_process(1, 0.2)
+    assert not selector.should_process(1, 0.2, reopen=True)
+
+
+def test_disabled_selection_processes_every_crop():
+    selector = BestShotSelector(top_k=0, min_quality=0.9)
+    assert all(selector.should_process(1, score) for score in (0.0, 0.1, 0.1))
+
+
+def test_release_frees_slot_of_unreadable_crop():
+    selector = BestShotSelector(top_k=1, min_quality=0.0)
+    assert selector.should_process(1, 0.8)
+    assert not selector.should_process(1, 0.5)
+    selector.release(1, 0.8)
+    assert selector.should_process(1, 0.5)
+    # Освобождение неизвестной оценки или трека ничего не ломает.
+    selector.release(1, 0.123)
+    selector.release(99, 0.5)
+    assert selector._track_scores[1] == [0.5]
+
+
+def test_reopen_admits_crop_without_lowering_bar():
+    selector = BestShotSelector(top_k=2, min_quality=0.0)
+    selector.should_process(1, 0.6)
+    selector.should_process(1, 0.7)
+    assert selector.should_process(1, 0.4, reopen=True)
+    # Слабый кроп, прошедший по reopen, не занимает место с меньшей оценкой.
+    assert sorted(selector._track_scores[1]) == [0.6, 0.7]
+    assert not selector.should_process(1, 0.5)
+
+
+def test_tracks_are_independent_and_droppable():
+    selector = BestShotSelector(top_k=1, min_quality=0.0)
+    assert selector.should_process(1, 0.9)
+    assert selector.should_process(2, 0.1)
+    selector.drop_track(1)
+    assert selector.should_process(1, 0.1)
+    selector.reset()
+    assert selector._track_scores == {}
+
+
+def test_quality_scorer_prefers_sharp_wide_crops():
+    scorer = PlateQualityScorer()
+    rng = np.random.default_rng(0)
+    sharp = rng.integers(0, 255, size=(28, 130, 3), dtype=np.uint8)
+    flat = np.full((28, 130, 3), 128, dtype=np.uint8)
+    small = sharp[:8, :30]
+    assert scorer.score(sharp, 0.9) > scorer.score(flat, 0.9)
+    assert scorer.score(sharp, 0.9) > scorer.score(small, 0.9)
+    assert scorer.score(sharp[:1], 0.9) == 0.0
+    assert 0.0 <= scorer.score(sharp, 2.0) <= 1.0
+
+
+class ScriptedRecognizer:
+    """Возвращает заранее заданные результаты OCR по одному на кроп."""
+
+    def __init__(self, results: Sequence[Tuple[str, float]]):
+        self.results = list(results)
+        self.calls = 0
+
+    def recognize_batch(self, plate_images) -> List[Tuple[str, float, List[float]]]:
+        out = []
+        for _ in plate_images:
+            text, confidence = self.results.pop(0)
+            out.append((text, confidence, [confidence] * len(text)))
+            self.calls += 1
+        return out
+
+
+def _frame_with_plate() -> Tuple[np.ndarray, List[int]]:
+    rng = np.random.default_rng(1)
+    frame = np.zeros((120, 240, 3), dtype=np.uint8)
+    frame[40:70, 50:190] = rng.integers(0, 255, size=(30, 140, 3), dtype=np.uint8)
+    return frame, [50, 40, 190, 70]
+
+
+def test_pipeline_releases_unreadable_and_reopens_stalled_track():
+    recognizer = ScriptedRecognizer([("", 0.1), ("A123BC77", 0.5), ("A123BC77", 0.5)])
+    pipeline = ANPR_Pipeline(
+        recognizer, best_shots=3, min_confidence=0.4, ocr_top_k=1, min_plate_quality=0.0, consensus_threshold=1.0
+    )
+    frame, bbox = _frame_with_plate()
+
+    def step(now: float) -> dict:
+        detection = {"bbox": list(bbox), "track_id": 5, "confidence": 0.9}
+        return pipeline.process_frame(frame, [detection], now=now)[0]
+
+    first = step(0.0)
+    assert first.get("unreadable")
+    # Нечитаемое прочтение освободило место: тот же по качеству кадр снова идет в OCR.
+    second = step(0.1)
+    assert not second.get("ocr_skipped")
+    assert recognizer.calls == 2
+    # top-K заполнен, консенсуса нет: до REOPEN_SECONDS кропы пропускаются.
+    assert step(0.2).get("ocr_skipped")
+    assert recognizer.calls == 2
+    step(0.1 + BestShotSelector.REOPEN_SECONDS)
+    assert recognizer.calls == 3
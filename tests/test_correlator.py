@@ -0,0 +1,111 @@
+"""``Correlator``: проезды между парами каналов, вытеснение по ``max_seconds`` и восстановление из БД.
+
+Запуск из корня репозитория::
+
+    python -m pytest tests/test_correlator.py
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from correlator import ChannelPair, Correlator
+from storage import EventDatabase
+
+BASE = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def event(channel: str, plate: str, seconds: float, event_id=None) -> dict:
+    return {
+        "channel": channel,
+        "plate": plate,
+        "timestamp": (BASE + timedelta(seconds=seconds)).isoformat(),
+        "id": event_id,
+    }
+
+
+@pytest.fixture
+def correlator():
+    return Correlator([ChannelPair("Парковка", "Въезд", "Выезд", max_seconds=3600)])
+
+
+def test_entry_then_exit_makes_passage(correlator):
+    assert correlator.observe(event("Въезд", "A123BC77", 0, event_id=1)) == []
+    (passage,) = correlator.observe(event("Выезд", "A123BC77", 90, event_id=2))
+    assert passage.pair == "Парковка"
+    assert passage.duration_seconds == 90
+    assert (passage.start_event_id, passage.end_event_id) == (1, 2)
+    # Проезд закрыт: повторный выезд ничего не дает.
+    assert correlator.observe(event("Выезд", "A123BC77", 120)) == []
+
+
+def test_ocr_confusions_do_not_break_passage(correlator):
+    correlator.observe(event("Въезд", "O123BC77", 0))
+    (passage,) = correlator.observe(event("Выезд", "0123BC77", 30))
+    assert passage.plate == "0123BC77"
+
+
+def test_unrelated_channels_and_plates_are_ignored(correlator):
+    assert correlator.observe(event("Двор", "A123BC77", 0)) == []
+    correlator.observe(event("Въезд", "A123BC77", 0))
+    assert correlator.observe(event("Выезд", "B456EK99", 10)) == []
+
+
+def test_passages_expire_after_max_seconds(correlator):
+    correlator.observe(event("Въезд", "A123BC77", 0))
+    correlator.observe(event("Въезд", "B456EK99", 3000))
+    # Первый въезд старше max_seconds к моменту выезда и вытесняется.
+    assert correlator.observe(event("Выезд", "A123BC77", 3700)) == []
+    (passage,) = correlator.observe(event("Выезд", "B456EK99", 3700))
+    assert passage.duration_seconds == 700
+
+
+def test_repeated_entry_restarts_passage(correlator):
+    correlator.observe(event("Въезд", "A123BC77", 0))
+    correlator.observe(event("Въезд", "A123BC77", 100))
+    (passage,) = correlator.observe(event("Выезд", "A123BC77", 150))
+    assert passage.duration_seconds == 50
+
+
+def test_chained_pairs_close_and_open_on_same_channel():
+    correlator = Correlator([ChannelPair("AB", "A", "B"), ChannelPair("BC", "B", "C")])
+    correlator.observe(event("A", "A123BC77", 0))
+    (first,) = correlator.observe(event("B", "A123BC77", 10))
+    (second,) = correlator.observe(event("C", "A123BC77", 25))
+    assert (first.pair, second.pair) == ("AB", "BC")
+    assert second.duration_seconds == 15
+
+
+def test_invalid_pairs_are_rejected():
+    with pytest.raises(ValueError):
+        Correlator([ChannelPair("x", "A", "A")])
+    with pytest.raises(ValueError):
+        Correlator([ChannelPair("x", "A", "B"), ChannelPair("x", "B", "C")])
+
+
+def test_from_config():
+    assert Correlator.from_config({"enabled": False, "pairs": [{"from": "A", "to": "B"}]}) is None
+    assert Correlator.from_config({"enabled": True, "pairs": []}) is None
+    correlator = Correlator.from_config({"enabled": True, "pairs": [{"from": "A", "to": "B", "max_seconds": 60}]})
+    assert correlator.pairs == [ChannelPair("A → B", "A", "B", 60.0)]
+
+
+def test_restore_reopens_passages_from_database(tmp_path):
+    database = EventDatabase(str(tmp_path / "events.db"))
+    now = datetime.now(timezone.utc)
+
+    def ts(minutes_ago: float) -> str:
+        return (now - timedelta(minutes=minutes_ago)).isoformat()
+
+    database.insert_event("Въезд", "A123BC77", 0.9, timestamp=ts(30))
+    database.insert_event("Въезд", "B456EK99", 0.9, timestamp=ts(20))
+    database.insert_event("Выезд", "B456EK99", 0.9, timestamp=ts(10))
+    database.insert_event("Двор", "C789MO50", 0.9, timestamp=ts(5))
+    # Въезд старше окна max_seconds не восстанавливается.
+    database.insert_event("Въезд", "E001KX77", 0.9, timestamp=ts(120))
+
+    correlator = Correlator([ChannelPair("Парковка", "Въезд", "Выезд", max_seconds=3600)])
+    assert correlator.restore(database) == 3
+    assert [item["plate"] for item in correlator.inside("Парковка")] == ["A123BC77"]
+    assert correlator.is_inside("Парковка", "A123BC77")
+    assert correlator.occupancy() == {"Парковка": 1}
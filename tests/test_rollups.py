@@ -0,0 +1,109 @@
+"""``RollupStore``: инкрементальное обновление агрегатов, уникальные номера и очистка.
+
+Запуск из корня репозитория::
+
+    python -m pytest tests/test_rollups.py
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from rollups import ALL_CHANNELS, RollupStore, _local, bucket_range, bucket_start
+
+
+@pytest.fixture
+def store(tmp_path):
+    return RollupStore(str(tmp_path / "events.db"))
+
+
+def minute_ago(minutes: float) -> datetime:
+    return (datetime.now(timezone.utc) - timedelta(minutes=minutes)).replace(second=0, microsecond=0)
+
+
+def insert(store: RollupStore, channel: str, plate: str, moment: datetime) -> None:
+    store.database.insert_event(channel, plate, 0.9, timestamp=moment.isoformat())
+
+
+def row(store: RollupStore, period: str, moment: datetime, channel: str = ALL_CHANNELS) -> tuple:
+    bucket = bucket_start(_local(moment.isoformat()), period)
+    rows = [tuple(r) for r in store.database.fetch_rollups(period, bucket, channel) if r[0] == bucket]
+    return rows[0][1:] if rows else (0, 0, 0)
+
+
+def test_update_is_incremental(store):
+    moment = minute_ago(10)
+    insert(store, "A", "A123BC77", moment)
+    insert(store, "A", "A123BC77", moment + timedelta(seconds=10))
+    insert(store, "B", "B456EK99", moment + timedelta(seconds=20))
+    assert store.update() == 3
+    assert store.update() == 0  # уже учтенные события повторно не читаются
+    assert row(store, "minute", moment, "A") == (2, 1, 0)
+    assert row(store, "minute", moment) == (3, 2, 0)
+
+    insert(store, "A", "A123BC77", moment + timedelta(seconds=30))
+    insert(store, "A", "C789MO50", moment + timedelta(seconds=40))
+    assert store.update() == 2
+    # Уже встречавшийся в интервале номер не увеличивает число уникальных.
+    assert row(store, "minute", moment, "A") == (4, 2, 0)
+    assert row(store, "hour", moment) == (5, 3, 0)
+    assert store.metrics()["events"] == 5
+
+
+def test_batches_give_same_result(store, monkeypatch):
+    monkeypatch.setattr(RollupStore, "BATCH_ROWS", 2)
+    moment = minute_ago(10)
+    for index in range(5):
+        insert(store, "A", f"A{index % 3}23BC77", moment + timedelta(seconds=index))
+    assert store.update() == 5
+    assert row(store, "minute", moment, "A") == (5, 3, 0)
+    assert store.database.get_state(RollupStore.STATE_KEY) == 5
+
+
+def test_unreadable_tracks_are_counted(store):
+    store.record_unreadable("A", 2)
+    store.record_unreadable("B")
+    assert store.update() == 0
+    now = datetime.now(timezone.utc)
+    assert row(store, "day", now, "A")[2] == 2
+    assert row(store, "day", now)[2] == 3
+
+
+def test_backfill_over_several_updates_keeps_unique_plates(store, monkeypatch):
+    monkeypatch.setattr(RollupStore, "PRUNE_INTERVAL", 0.0)
+    # Интервал старше PLATES_KEEP, который архив дописывает частями.
+    moment = minute_ago(5 * 60)
+    insert(store, "A", "A123BC77", moment)
+    store.update()
+    insert(store, "A", "A123BC77", moment + timedelta(seconds=5))
+    store.update()
+    assert row(store, "minute", moment, "A") == (2, 1, 0)
+
+
+def test_prune_drops_plates_of_inactive_old_buckets(store):
+    moment = minute_ago(5 * 60)
+    insert(store, "A", "A123BC77", moment)
+    store.update()
+    with store.database._connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM rollup_plates WHERE period = 'minute'").fetchone()[0] == 2
+
+    store._prune()  # интервал получал события после прошлой очистки — номера сохраняются
+    store._prune()  # а теперь уже нет
+    with store.database._connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM rollup_plates WHERE period = 'minute'").fetchone()[0] == 0
+        # Дневные номера нужны для топа и остаются.
+        assert conn.execute("SELECT COUNT(*) FROM rollup_plates WHERE period = 'day'").fetchone()[0] == 2
+    # Сами агрегаты при этом не меняются.
+    assert row(store, "minute", moment, "A") == (1, 1, 0)
+
+
+def test_bucket_range_includes_empty_buckets():
+    start = datetime(2026, 1, 1, 10, 58)
+    end = datetime(2026, 1, 1, 11, 1)
+    assert bucket_range("minute", start, end) == [
+        "2026-01-01 10:58",
+        "2026-01-01 10:59",
+        "2026-01-01 11:00",
+        "2026-01-01 11:01",
+    ]
+    assert bucket_range("hour", start, end) == ["2026-01-01 10:00", "2026-01-01 11:00"]
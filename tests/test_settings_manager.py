@@ -0,0 +1,123 @@
+"""``SettingsManager``: отложенная пакетная запись, атомарная замена файла и дополнение настроек.
+
+Запуск из корня репозитория::
+
+    python -m pytest tests/test_settings_manager.py
+"""
+
+import json
+import os
+import time
+
+import pytest
+
+from settings_manager import SettingsManager
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(SettingsManager, "SAVE_DELAY", 0.05)
+    return SettingsManager(str(tmp_path / "settings.json"))
+
+
+def read(manager: SettingsManager) -> dict:
+    with open(manager.path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def count_writes(manager: SettingsManager, monkeypatch) -> list:
+    writes = []
+    original = manager._write
+
+    def counting_write(text: str) -> None:
+        original(text)
+        writes.append(text)
+
+    monkeypatch.setattr(manager, "_write", counting_write)
+    return writes
+
+
+def test_missing_file_is_created_with_defaults(manager):
+    assert read(manager)["grid"] == manager._default()["grid"]
+    assert manager.get_channels()[0]["name"] == "Канал 1"
+
+
+def test_changes_are_visible_immediately_and_written_once(manager, monkeypatch):
+    writes = count_writes(manager, monkeypatch)
+    sections = []
+    manager.subscribe(sections.append)
+
+    manager.save_grid("3x3")
+    manager.save_best_shots(7)
+    manager.save_cooldown_seconds(11)
+    assert manager.get_grid() == "3x3"
+    assert sections == ["grid", "tracking", "tracking"]
+    assert writes == []  # запись отложена
+
+    manager.flush()
+    assert len(writes) == 1
+    on_disk = read(manager)
+    assert on_disk["grid"] == "3x3"
+    assert on_disk["tracking"]["best_shots"] == 7
+    # Без новых изменений повторный flush ничего не пишет.
+    manager.flush()
+    assert len(writes) == 1
+
+
+def test_timer_writes_after_delay(manager, monkeypatch):
+    writes = count_writes(manager, monkeypatch)
+    manager.save_grid("1x1")
+    deadline = time.monotonic() + 5.0
+    while not writes and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(writes) == 1
+    assert read(manager)["grid"] == "1x1"
+
+
+def test_failed_write_keeps_old_file_and_retries(manager, monkeypatch):
+    manager.save_grid("2x2")
+    manager.flush()
+    before = read(manager)
+
+    def failing_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", failing_replace)
+    manager.save_grid("4x4")
+    manager.flush()
+    assert read(manager) == before
+    # Временный файл удален, изменения остаются несохраненными до следующей попытки.
+    assert os.listdir(os.path.dirname(manager.path)) == ["settings.json"]
+    assert manager._dirty
+
+    monkeypatch.undo()
+    manager.flush()
+    assert read(manager)["grid"] == "4x4"
+
+
+def test_refresh_flushes_pending_changes(manager):
+    manager.save_grid("3x3")
+    manager.refresh()
+    assert manager.get_grid() == "3x3"
+
+
+def test_upgrade_fills_missing_sections_and_channel_keys(tmp_path):
+    path = tmp_path / "settings.json"
+    path.write_text(
+        json.dumps(
+            {
+                "grid": "1x1",
+                "tracking": {"best_shots": 9},
+                "channels": [{"id": 1, "name": "Въезд", "source": "0", "cooldown_seconds": 1}],
+            }
+        ),
+        encoding="utf-8",
+    )
+    manager = SettingsManager(str(path))
+    channel = manager.get_channels()[0]
+    assert channel["best_shots"] == 9  # из старого раздела tracking
+    assert channel["cooldown_seconds"] == 1  # пользовательское значение не перезаписано
+    assert channel["detector_imgsz"] == 640
+    on_disk = json.loads(path.read_text(encoding="utf-8"))
+    for section in ("metrics", "inference", "snapshots", "clips", "watchlist", "correlation", "rollups"):
+        assert section in on_disk
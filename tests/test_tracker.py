@@ -0,0 +1,106 @@
+"""Встроенный трекер ``ByteTracker``: устойчивые ID, второй этап ByteTrack и старение треков.
+
+Запуск из корня репозитория::
+
+    python -m pytest tests/test_tracker.py
+"""
+
+import numpy as np
+
+from tracker import ByteTracker, _greedy_match, iou_matrix
+
+
+def det(x1: float, y1: float, x2: float, y2: float, confidence: float = 0.9) -> dict:
+    return {"bbox": [x1, y1, x2, y2], "confidence": confidence}
+
+
+def moving_box(frame: int, x0: float = 10.0, y0: float = 50.0, speed: float = 5.0) -> list:
+    x = x0 + speed * frame
+    return [x, y0, x + 100, y0 + 25]
+
+
+def test_iou_matrix():
+    a = np.array([[0, 0, 10, 10], [20, 20, 30, 30]], dtype=float)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10]], dtype=float)
+    iou = iou_matrix(a, b)
+    assert iou.shape == (2, 2)
+    assert iou[0, 0] == 1.0
+    assert abs(iou[0, 1] - 50 / 150) < 1e-9
+    assert iou[1].max() == 0.0
+    assert iou_matrix(np.zeros((0, 4)), b).shape == (0, 2)
+
+
+def test_greedy_match_prefers_highest_iou():
+    iou = np.array([[0.9, 0.8], [0.85, 0.1]])
+    matches, unmatched_rows, unmatched_cols = _greedy_match(iou, 0.2)
+    assert matches == [(0, 0)]
+    assert unmatched_rows == [1]
+    assert unmatched_cols == [1]
+
+
+def test_moving_plate_keeps_id():
+    tracker = ByteTracker()
+    ids = set()
+    for frame in range(20):
+        (result,) = tracker.update([det(*moving_box(frame))])
+        ids.add(result["track_id"])
+    assert ids == {1}
+    assert tracker.active_tracks == 1
+
+
+def test_two_plates_get_distinct_ids():
+    tracker = ByteTracker()
+    for frame in range(5):
+        results = tracker.update([det(*moving_box(frame)), det(*moving_box(frame, y0=300))])
+        assert sorted(r["track_id"] for r in results) == [1, 2]
+
+
+def test_low_confidence_detection_continues_track():
+    tracker = ByteTracker(high_threshold=0.5, low_threshold=0.1, new_track_threshold=0.6)
+    tracker.update([det(*moving_box(0))])
+    tracker.update([det(*moving_box(1))])
+    # Размытый кадр: детекция ниже high_threshold сопоставляется на втором этапе.
+    (result,) = tracker.update([det(*moving_box(2), confidence=0.3)])
+    assert result["track_id"] == 1
+    # Но сама по себе неуверенная детекция новый трек не открывает.
+    assert tracker.update([det(600, 600, 700, 625, confidence=0.3)]) == []
+
+
+def test_new_track_requires_new_track_threshold():
+    tracker = ByteTracker(high_threshold=0.5, new_track_threshold=0.6)
+    assert tracker.update([det(0, 0, 100, 25, confidence=0.55)]) == []
+    (result,) = tracker.update([det(0, 0, 100, 25, confidence=0.7)])
+    assert result["track_id"] == 1
+
+
+def test_lost_track_recovers_within_max_age_and_expires_after():
+    tracker = ByteTracker(max_age=3)
+    tracker.update([det(0, 0, 100, 25)])
+    tracker.update([])
+    tracker.update([])
+    (result,) = tracker.update([det(0, 0, 100, 25)])
+    assert result["track_id"] == 1
+
+    for _ in range(4):
+        tracker.update([])
+    assert tracker.active_tracks == 0
+    (result,) = tracker.update([det(0, 0, 100, 25)])
+    assert result["track_id"] == 2
+
+
+def test_result_is_a_copy_with_track_id():
+    tracker = ByteTracker()
+    detection = det(0, 0, 100, 25)
+    detection["extra"] = "x"
+    (result,) = tracker.update([detection])
+    assert result["extra"] == "x"
+    assert "track_id" not in detection
+
+
+def test_reset_restarts_ids():
+    tracker = ByteTracker()
+    tracker.update([det(0, 0, 100, 25)])
+    tracker.reset()
+    assert tracker.active_tracks == 0
+    (result,) = tracker.update([det(300, 300, 400, 325)])
+    assert result["track_id"] == 1
@@ -0,0 +1,122 @@
+"""Список розыска: нормализация, канонические формы с путаницами OCR и нечеткий поиск по краям.
+
+Запуск из корня репозитория::
+
+    python -m pytest tests/test_watchlist.py
+"""
+
+import os
+
+import pytest
+
+from watchlist import (
+    Watchlist,
+    WatchEntry,
+    _edge_keys,
+    _one_edit_apart,
+    canonical_plate,
+    normalize_plate,
+)
+
+
+def test_normalize_plate_maps_cyrillic_and_strips_separators():
+    assert normalize_plate(" а 123 вс-77 ") == "A123BC77"
+    assert normalize_plate("Х 000 ХХ 777") == "X000XX777"
+
+
+@pytest.mark.parametrize(
+    "plate, expected",
+    [
+        ("A123BC77", "A123BC77"),
+        ("0123BC77", "O123BC77"),  # цифра на месте буквы
+        ("A1O3BC77", "A103BC77"),  # буква на месте цифры
+        ("A123808B", "A123BO88"),  # обе путаницы в хвосте номера
+        ("B8B8BB88B", "B888BB888"),  # девятисимвольный регион
+        ("A1O3", "A1O3"),  # нестандартная длина не меняется
+    ],
+)
+def test_canonical_plate_is_positional(plate, expected):
+    assert canonical_plate(plate) == expected
+
+
+def test_canonical_plate_does_not_merge_different_letters():
+    assert canonical_plate("A123BC77") != canonical_plate("A123BE77")
+    assert canonical_plate("A123BC77") != canonical_plate("A128BC77")
+
+
+@pytest.mark.parametrize(
+    "a, b, expected",
+    [
+        ("A123BC77", "A123BC78", True),  # замена
+        ("A123BC77", "A12BC77", True),  # пропуск
+        ("A123BC77", "A1223BC77", True),  # лишний символ
+        ("A123BC77", "A123BC777", True),  # лишний символ в конце
+        ("A123BC77", "A123BC77", False),  # совпадение — не правка
+        ("A123BC77", "A124BC78", False),  # две замены
+        ("A123BC77", "A123B", False),  # разница в длине больше одного
+        ("", "A", True),
+    ],
+)
+def test_one_edit_apart(a, b, expected):
+    assert _one_edit_apart(a, b) is expected
+    assert _one_edit_apart(b, a) is expected
+
+
+def test_edge_keys_cover_neighbouring_lengths():
+    keys = _edge_keys("A123BC77")
+    # Запрос длиной 7 берет ключи по 3 символа, длиной 8 и 9 — по 4.
+    assert keys == ["3<A12", "3>C77", "4<A123", "4>BC77"]
+    assert _edge_keys("AB") == ["1<A", "1>B"]
+    assert _edge_keys("A") == ["1<A", "1>A"]
+
+
+@pytest.fixture
+def watchlist():
+    wl = Watchlist()
+    wl.load([WatchEntry("A123BC77", "угон"), WatchEntry("O777OO99"), WatchEntry("X1")])
+    return wl
+
+
+def test_match_kinds(watchlist):
+    assert watchlist.match("a123bc77").kind == "exact"
+    match = watchlist.match("A1Z3BC77")
+    assert (match.kind, match.distance, match.entry.note) == ("fuzzy", 1, "угон")
+    assert watchlist.match("0777OO99").kind == "confusion"
+    assert watchlist.match("O777OO9").kind == "fuzzy"  # пропуск последней цифры
+    assert watchlist.match("A12BC77").kind == "fuzzy"  # пропуск в середине
+    assert watchlist.match("A123BC777").kind == "fuzzy"  # лишняя цифра региона
+    assert watchlist.match("B456EK99") is None
+    assert watchlist.match("A124BC78") is None  # две правки
+    assert watchlist.metrics() == {"plates": 3, "checks": 8, "matches": 6}
+
+
+def test_fuzzy_can_be_disabled(watchlist):
+    watchlist.fuzzy = False
+    assert watchlist.match("A1Z3BC77") is None
+    assert watchlist.match("0777OO99").kind == "confusion"
+
+
+def test_short_plates_use_one_character_keys(watchlist):
+    assert watchlist.match("X1").kind == "exact"
+    assert watchlist.match("X2").kind == "fuzzy"
+    assert watchlist.match("") is None
+
+
+def test_reload_reads_csv_only_when_changed(tmp_path):
+    path = tmp_path / "watchlist.csv"
+    path.write_text("plate,note\n# комментарий\nа123вс77,угон\n\nB456EK99\n", encoding="utf-8")
+    wl = Watchlist(str(path))
+    assert len(wl) == 2
+    assert wl.match("A123BC77").entry.note == "угон"
+    assert not wl.reload()
+
+    path.write_text("B456EK99\n", encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert wl.reload()
+    assert wl.match("A123BC77") is None
+
+    # Пропавший файл не сбрасывает загруженный список.
+    path.unlink()
+    assert not wl.reload()
+    assert len(wl) == 1
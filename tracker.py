@@ -0,0 +1,264 @@
+"""Легковесный трекер номеров в стиле ByteTrack без внешних зависимостей (только NumPy).
+
+Трекер работает поверх результатов ``YOLODetector.detect`` и хранит состояние отдельно
+от модели, поэтому детектор можно разделять между каналами или батчить, а трекинг
+остается локальным и дешевым для каждого канала.
+"""
+
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+class KalmanBoxFilter:
+    """Фильтр Калмана с постоянной скоростью в пространстве (cx, cy, aspect, height).
+
+    Все операции векторизованы по трекам: ``mean`` имеет форму (N, 8), ``covariance`` — (N, 8, 8).
+    """
+
+    _STD_WEIGHT_POSITION = 1.0 / 20
+    _STD_WEIGHT_VELOCITY = 1.0 / 160
+
+    def __init__(self) -> None:
+        ndim = 4
+        self._motion_mat = np.eye(2 * ndim)
+        self._motion_mat[:ndim, ndim:] = np.eye(ndim)
+        self._update_mat = np.eye(ndim, 2 * ndim)
+
+    def initiate(self, measurements: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        count = measurements.shape[0]
+        mean = np.concatenate([measurements, np.zeros_like(measurements)], axis=1)
+        height = measurements[:, 3]
+        std = np.stack(
+            [
+                2 * self._STD_WEIGHT_POSITION * height,
+                2 * self._STD_WEIGHT_POSITION * height,
+                np.full(count, 1e-2),
+                2 * self._STD_WEIGHT_POSITION * height,
+                10 * self._STD_WEIGHT_VELOCITY * height,
+                10 * self._STD_WEIGHT_VELOCITY * height,
+                np.full(count, 1e-5),
+                10 * self._STD_WEIGHT_VELOCITY * height,
+            ],
+            axis=1,
+        )
+        covariance = np.zeros((count, 8, 8))
+        idx = np.arange(8)
+        covariance[:, idx, idx] = np.square(std)
+        return mean, covariance
+
+    def predict(self, mean: np.ndarray, covariance: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        count = mean.shape[0]
+        height = mean[:, 3]
+        std = np.stack(
+            [
+                self._STD_WEIGHT_POSITION * height,
+                self._STD_WEIGHT_POSITION * height,
+                np.full(count, 1e-2),
+                self._STD_WEIGHT_POSITION * height,
+                self._STD_WEIGHT_VELOCITY * height,
+                self._STD_WEIGHT_VELOCITY * height,
+                np.full(count, 1e-5),
+                self._STD_WEIGHT_VELOCITY * height,
+            ],
+            axis=1,
+        )
+        motion_cov = np.zeros((count, 8, 8))
+        idx = np.arange(8)
+        motion_cov[:, idx, idx] = np.square(std)
+
+        mean = mean @ self._motion_mat.T
+        covariance = self._motion_mat @ covariance @ self._motion_mat.T + motion_cov
+        return mean, covariance
+
+    def update(
+        self, mean: np.ndarray, covariance: np.ndarray, measurements: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        count = mean.shape[0]
+        height = mean[:, 3]
+        std = np.stack(
+            [
+                self._STD_WEIGHT_POSITION * height,
+                self._STD_WEIGHT_POSITION * height,
+                np.full(count, 1e-1),
+                self._STD_WEIGHT_POSITION * height,
+            ],
+            axis=1,
+        )
+        innovation_cov = np.zeros((count, 4, 4))
+        idx = np.arange(4)
+        innovation_cov[:, idx, idx] = np.square(std)
+
+        projected_mean = mean @ self._update_mat.T
+        projected_cov = self._update_mat @ covariance @ self._update_mat.T + innovation_cov
+
+        # K = P Hᵀ S⁻¹; решаем систему вместо явного обращения матрицы.
+        cross_cov = covariance @ self._update_mat.T  # (N, 8, 4)
+        kalman_gain = np.linalg.solve(projected_cov, cross_cov.transpose(0, 2, 1)).transpose(0, 2, 1)
+        innovation = measurements - projected_mean
+        new_mean = mean + np.einsum("nij,nj->ni", kalman_gain, innovation)
+        new_cov = covariance - kalman_gain @ projected_cov @ kalman_gain.transpose(0, 2, 1)
+        return new_mean, new_cov
+
+
+def _xyxy_to_xyah(boxes: np.ndarray) -> np.ndarray:
+    width = boxes[:, 2] - boxes[:, 0]
+    height = np.maximum(boxes[:, 3] - boxes[:, 1], 1e-6)
+    return np.stack(
+        [boxes[:, 0] + width / 2, boxes[:, 1] + height / 2, width / height, height], axis=1
+    )
+
+
+def _xyah_to_xyxy(states: np.ndarray) -> np.ndarray:
+    height = states[:, 3]
+    width = states[:, 2] * height
+    return np.stack(
+        [
+            states[:, 0] - width / 2,
+            states[:, 1] - height / 2,
+            states[:, 0] + width / 2,
+            states[:, 1] + height / 2,
+        ],
+        axis=1,
+    )
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Попарный IoU двух наборов рамок (x1, y1, x2, y2)."""
+    if boxes_a.size == 0 or boxes_b.size == 0:
+        return np.zeros((boxes_a.shape[0], boxes_b.shape[0]))
+    x1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return inter / np.maximum(union, 1e-6)
+
+
+def _greedy_match(iou: np.ndarray, threshold: float) -> Tuple[List[Tuple[int, int]], List[int], List[int]]:
+    """Жадное сопоставление по убыванию IoU (замена венгерскому алгоритму без scipy/lap)."""
+    rows, cols = iou.shape
+    if rows == 0 or cols == 0:
+        return [], list(range(rows)), list(range(cols))
+
+    candidates = np.argwhere(iou >= threshold)
+    order = np.argsort(-iou[candidates[:, 0], candidates[:, 1]], kind="stable")
+    used_rows = np.zeros(rows, dtype=bool)
+    used_cols = np.zeros(cols, dtype=bool)
+    matches: List[Tuple[int, int]] = []
+    for row, col in candidates[order]:
+        if used_rows[row] or used_cols[col]:
+            continue
+        used_rows[row] = used_cols[col] = True
+        matches.append((int(row), int(col)))
+    return matches, np.flatnonzero(~used_rows).tolist(), np.flatnonzero(~used_cols).tolist()
+
+
+class ByteTracker:
+    """Трекер в стиле ByteTrack: двухэтапное сопоставление по IoU с предсказанием Калмана.
+
+    Первый этап сопоставляет активные и потерянные треки с уверенными детекциями, второй —
+    оставшиеся активные треки с детекциями низкой уверенности (частично закрытые или
+    размытые номера), что не дает треку «рваться» на проблемных кадрах.
+    """
+
+    def __init__(
+        self,
+        high_threshold: float = 0.5,
+        low_threshold: float = 0.1,
+        new_track_threshold: float = 0.6,
+        match_iou: float = 0.2,
+        low_match_iou: float = 0.5,
+        max_age: int = 30,
+    ) -> None:
+        self.high_threshold = high_threshold
+        self.low_threshold = low_threshold
+        self.new_track_threshold = new_track_threshold
+        self.match_iou = match_iou
+        self.low_match_iou = low_match_iou
+        self.max_age = max(1, max_age)
+        self._kalman = KalmanBoxFilter()
+        self.reset()
+
+    def reset(self) -> None:
+        """Сбрасывает все треки (например, после переподключения источника)."""
+        self._next_id = 1
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._mean = np.zeros((0, 8))
+        self._cov = np.zeros((0, 8, 8))
+        self._misses = np.zeros(0, dtype=np.int64)
+
+    @property
+    def active_tracks(self) -> int:
+        return int(self._ids.size)
+
+    def update(self, detections: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Присваивает ``track_id`` детекциям кадра и возвращает сопровожденные номера."""
+        boxes = np.array([det["bbox"] for det in detections], dtype=float).reshape(-1, 4)
+        scores = np.array([det.get("confidence", 1.0) for det in detections], dtype=float)
+
+        if self._ids.size:
+            self._mean, self._cov = self._kalman.predict(self._mean, self._cov)
+        predicted = _xyah_to_xyxy(self._mean) if self._ids.size else np.zeros((0, 4))
+
+        high_idx = np.flatnonzero(scores >= self.high_threshold)
+        low_idx = np.flatnonzero((scores < self.high_threshold) & (scores >= self.low_threshold))
+
+        # Этап 1: все треки (включая потерянные) против уверенных детекций.
+        matches, unmatched_tracks, unmatched_high = _greedy_match(
+            iou_matrix(predicted, boxes[high_idx]), self.match_iou
+        )
+        track_to_det = {track: int(high_idx[det]) for track, det in matches}
+
+        # Этап 2: треки, активные на прошлом кадре, против детекций низкой уверенности.
+        recent = [track for track in unmatched_tracks if self._misses[track] == 0]
+        low_matches, _, _ = _greedy_match(
+            iou_matrix(predicted[recent], boxes[low_idx]), self.low_match_iou
+        )
+        for track_pos, det in low_matches:
+            track_to_det[recent[track_pos]] = int(low_idx[det])
+
+        if track_to_det:
+            tracks = np.fromiter(track_to_det.keys(), dtype=np.int64)
+            dets = np.fromiter(track_to_det.values(), dtype=np.int64)
+            self._mean[tracks], self._cov[tracks] = self._kalman.update(
+                self._mean[tracks], self._cov[tracks], _xyxy_to_xyah(boxes[dets])
+            )
+        self._misses += 1
+        if track_to_det:
+            self._misses[tracks] = 0
+
+        keep = self._misses <= self.max_age
+        outputs = [
+            (int(self._ids[track]), det) for track, det in track_to_det.items()
+        ]
+        self._ids, self._mean, self._cov, self._misses = (
+            self._ids[keep],
+            self._mean[keep],
+            self._cov[keep],
+            self._misses[keep],
+        )
+
+        # Новые треки создаются только из достаточно уверенных несопоставленных детекций.
+        new_dets = [
+            int(high_idx[det]) for det in unmatched_high if scores[high_idx[det]] >= self.new_track_threshold
+        ]
+        if new_dets:
+            new_ids = np.arange(self._next_id, self._next_id + len(new_dets), dtype=np.int64)
+            self._next_id += len(new_dets)
+            mean, cov = self._kalman.initiate(_xyxy_to_xyah(boxes[new_dets]))
+            self._ids = np.concatenate([self._ids, new_ids])
+            self._mean = np.concatenate([self._mean, mean])
+            self._cov = np.concatenate([self._cov, cov])
+            self._misses = np.concatenate([self._misses, np.zeros(len(new_dets), dtype=np.int64)])
+            outputs.extend(zip(new_ids.tolist(), new_dets))
+
+        results: List[Dict[str, Any]] = []
+        for track_id, det in outputs:
+            det_copy = dict(detections[det])
+            det_copy["track_id"] = track_id
+            results.append(det_copy)
+        return results
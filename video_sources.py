@@ -0,0 +1,364 @@
+"""Источники кадров каналов: камеры и файлы OpenCV, синтетическая камера и зацикленный файл.
+
+Поле ``source`` канала понимает, кроме индекса камеры и пути/RTSP-адреса для
+``cv2.VideoCapture``, две схемы для нагрузочных тестов без реальных камер:
+
+- ``synthetic://fps=25&res=1920x1080&plates=4`` — генератор кадров с движущимися
+  нарисованными номерами (``plates`` — число пластин или их тексты через запятую,
+  ``seed`` — зерно, ``frames`` — ограничение длины, ``realtime=0`` — без темпа);
+- ``loop://data/gate.mp4?realtime=1`` — файл, который повторяется по кругу и отдается
+  в темпе его FPS, как живой поток.
+
+Оба источника повторяют нужную часть интерфейса ``cv2.VideoCapture``
+(``isOpened``/``read``/``grab``/``get``/``release``). В режиме реального времени кадры,
+которые потребитель не успел забрать, пропускаются — как у живой камеры.
+
+Параметры декодирования канала (``decode_options``): бэкенд OpenCV (FFmpeg/GStreamer),
+число потоков декодера, аппаратное ускорение, уменьшение кадра до заданной ширины сразу
+после декодирования и декодирование только опорных кадров для редких каналов.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl
+
+import cv2
+import numpy as np
+
+from logging_manager import get_logger
+
+logger = get_logger(__name__)
+
+SYNTHETIC_SCHEME = "synthetic://"
+LOOP_SCHEME = "loop://"
+PLATE_ALPHABET = "ABCEHKMOPTXY"
+
+DECODE_BACKENDS = {"auto": cv2.CAP_ANY, "ffmpeg": cv2.CAP_FFMPEG, "gstreamer": cv2.CAP_GSTREAMER}
+# Опции FFmpeg-бэкенда OpenCV читает из окружения при открытии источника («ключ;значение|...»).
+FFMPEG_OPTIONS_ENV = "OPENCV_FFMPEG_CAPTURE_OPTIONS"
+_ffmpeg_env_lock = threading.Lock()
+
+
+def render_plate(text: str, width: int = 520, height: int = 112) -> np.ndarray:
+    """Рисует упрощенную российскую пластину: белый фон, черная рамка и символы."""
+    plate = np.full((height, width, 3), 245, dtype=np.uint8)
+    cv2.rectangle(plate, (2, 2), (width - 3, height - 3), (20, 20, 20), max(2, height // 30))
+    font_scale = height / 40
+    thickness = max(2, height // 14)
+    (text_w, text_h), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+    origin = ((width - text_w) // 2, (height + text_h) // 2)
+    cv2.putText(plate, text, origin, cv2.FONT_HERSHEY_SIMPLEX, font_scale, (20, 20, 20), thickness)
+    return plate
+
+
+def random_plate_text(rng: np.random.Generator) -> str:
+    letters = lambda n: "".join(rng.choice(list(PLATE_ALPHABET), n))  # noqa: E731
+    digits = lambda n: "".join(rng.choice(list("0123456789"), n))  # noqa: E731
+    return f"{letters(1)}{digits(3)}{letters(2)}{digits(2)}"
+
+
+def _parse_params(query: str) -> Dict[str, str]:
+    return {key.lower(): value for key, value in parse_qsl(query.lstrip("?"), keep_blank_values=True)}
+
+
+def _flag(value: Optional[str], default: bool) -> bool:
+    if value is None or value == "":
+        return default
+    return value.lower() not in ("0", "false", "no", "off")
+
+
+class _Pacer:
+    """Темп живого источника: ждет момента следующего кадра, а опоздавшие кадры пропускает."""
+
+    def __init__(self, fps: float) -> None:
+        self.interval = 1.0 / fps if fps > 0 else 0.0
+        self.started: Optional[float] = None
+        self.next_index = 0
+
+    def wait(self) -> int:
+        """Ждет слота и возвращает номер кадра, который должен быть отдан сейчас."""
+        index = self.next_index
+        if self.interval:
+            now = time.monotonic()
+            if self.started is None:
+                self.started = now
+            due = self.started + index * self.interval
+            if due > now:
+                time.sleep(due - now)
+            else:
+                # Потребитель отстал: как живая камера, отдаем самый свежий кадр.
+                index = max(index, int((now - self.started) / self.interval))
+        self.next_index = index + 1
+        return index
+
+
+class SyntheticSource:
+    """Синтетическая камера: статичный фон и пластины, проезжающие кадр по горизонтали."""
+
+    def __init__(
+        self,
+        fps: float = 25.0,
+        size: Tuple[int, int] = (1280, 720),
+        plates: Union[int, List[str]] = 3,
+        seed: int = 0,
+        frames: int = 0,
+        realtime: bool = True,
+    ) -> None:
+        self.fps = float(fps)
+        self.width, self.height = size
+        self.frames = frames
+        self.realtime = realtime
+        rng = np.random.default_rng(seed)
+        noise = rng.integers(40, 170, size=(self.height, self.width, 3), dtype=np.uint8)
+        self._background = cv2.GaussianBlur(noise, (7, 7), 0)
+        texts = plates if isinstance(plates, list) else [random_plate_text(rng) for _ in range(plates)]
+        self._sprites = []
+        for text in texts:
+            plate_w = int(rng.integers(self.width // 12, self.width // 6))
+            sprite = render_plate(text, plate_w, plate_w * 112 // 520)
+            row = int(rng.integers(0, max(1, self.height - sprite.shape[0])))
+            speed = float(rng.uniform(0.15, 0.4)) * self.width / self.fps
+            self._sprites.append((sprite, row, float(rng.uniform(0, self.width)), speed))
+        self._pacer = _Pacer(self.fps if realtime else 0.0)
+        self._index = -1
+        self._opened = True
+
+    @classmethod
+    def from_url(cls, source: str) -> "SyntheticSource":
+        params = _parse_params(source[len(SYNTHETIC_SCHEME):])
+        width, height = (int(part) for part in params.get("res", "1280x720").lower().split("x"))
+        plates_param = params.get("plates", "3")
+        plates: Union[int, List[str]] = (
+            int(plates_param) if plates_param.isdigit() else [text for text in plates_param.split(",") if text]
+        )
+        return cls(
+            fps=float(params.get("fps", 25)),
+            size=(width, height),
+            plates=plates,
+            seed=int(params.get("seed", 0)),
+            frames=int(params.get("frames", 0)),
+            realtime=_flag(params.get("realtime"), True),
+        )
+
+    def render(self, index: int) -> np.ndarray:
+        frame = self._background.copy()
+        for sprite, row, start, speed in self._sprites:
+            sprite_h, sprite_w = sprite.shape[:2]
+            x = int(start + index * speed) % (self.width + sprite_w) - sprite_w
+            x1, x2 = max(0, x), min(self.width, x + sprite_w)
+            if x2 > x1:
+                frame[row : row + sprite_h, x1:x2] = sprite[:, x1 - x : x2 - x]
+        return frame
+
+    def isOpened(self) -> bool:  # noqa: N802 - интерфейс cv2.VideoCapture
+        return self._opened
+
+    def grab(self) -> bool:
+        if not self._opened:
+            return False
+        index = self._pacer.wait()
+        if self.frames and index >= self.frames:
+            return False
+        self._index = index
+        return True
+
+    def retrieve(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if self._index < 0:
+            return False, None
+        return True, self.render(self._index)
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.frames)
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self._index + 1)
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return max(0, self._index) * 1000.0 / self.fps
+        return 0.0
+
+    def release(self) -> None:
+        self._opened = False
+
+
+class LoopingFileSource:
+    """Видеофайл, который повторяется по кругу; при ``realtime`` отдается в темпе своего FPS."""
+
+    def __init__(self, path: str, realtime: bool = True, decode: Optional[Dict[str, Any]] = None) -> None:
+        self.path = path
+        self.decode = decode or {}
+        self.capture = open_video_capture(path, self.decode)
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 25.0
+        self._pacer = _Pacer(self.fps if realtime else 0.0)
+        self._position = 0
+
+    @classmethod
+    def from_url(cls, source: str, decode: Optional[Dict[str, Any]] = None) -> "LoopingFileSource":
+        path, _, query = source[len(LOOP_SCHEME):].partition("?")
+        return cls(path, realtime=_flag(_parse_params(query).get("realtime"), True), decode=decode)
+
+    def _grab_next(self) -> bool:
+        if self.capture.grab():
+            return True
+        # Конец файла: перематываем в начало (некоторые бэкенды не умеют seek — переоткрываем).
+        logger.debug("Источник %s: повтор с начала", self.path)
+        if not self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0):
+            self.capture.release()
+            self.capture = open_video_capture(self.path, self.decode)
+        return self.capture.grab()
+
+    def isOpened(self) -> bool:  # noqa: N802 - интерфейс cv2.VideoCapture
+        return self.capture.isOpened()
+
+    def grab(self) -> bool:
+        target = self._pacer.wait()
+        # Пропущенные потребителем кадры декодируем вхолостую, чтобы поток шел в реальном времени.
+        while self._position <= target:
+            if not self._grab_next():
+                return False
+            self._position += 1
+        return True
+
+    def retrieve(self) -> Tuple[bool, Optional[np.ndarray]]:
+        return self.capture.retrieve()
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            # Источник бесконечен, как живой поток.
+            return 0.0
+        return self.capture.get(prop)
+
+    def release(self) -> None:
+        self.capture.release()
+
+
+class ScaledCapture:
+    """Уменьшает кадры источника до ``width`` (с сохранением пропорций) сразу после декодирования."""
+
+    def __init__(self, capture: Any, width: int) -> None:
+        self.capture = capture
+        self.width = width
+
+    def _scale(self, frame: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        if frame is None or frame.shape[1] <= self.width:
+            return frame
+        height = max(1, round(frame.shape[0] * self.width / frame.shape[1]))
+        return cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+
+    def isOpened(self) -> bool:  # noqa: N802 - интерфейс cv2.VideoCapture
+        return self.capture.isOpened()
+
+    def grab(self) -> bool:
+        return self.capture.grab()
+
+    def retrieve(self) -> Tuple[bool, Optional[np.ndarray]]:
+        ret, frame = self.capture.retrieve()
+        return ret, self._scale(frame)
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        ret, frame = self.capture.read()
+        return ret, self._scale(frame)
+
+    def get(self, prop: int) -> float:
+        return self.capture.get(prop)
+
+    def release(self) -> None:
+        self.capture.release()
+
+
+def decode_options(channel_conf: Dict[str, Any]) -> Dict[str, Any]:
+    """Параметры декодирования из настроек канала."""
+    return {
+        "backend": str(channel_conf.get("decode_backend", "auto")).lower(),
+        "threads": int(channel_conf.get("decode_threads", 0)),
+        "hw_accel": bool(channel_conf.get("decode_hw_accel", False)),
+        "width": int(channel_conf.get("decode_width", 0)),
+        "keyframes_only": bool(channel_conf.get("decode_keyframes_only", False)),
+    }
+
+
+def gstreamer_pipeline(source: str, decode: Dict[str, Any]) -> str:
+    """Конвейер GStreamer для источника; строка с ``!`` считается готовым конвейером."""
+    if "!" in source:
+        return source
+    live = source.isnumeric() or "://" in source
+    if source.isnumeric():
+        head = f"v4l2src device=/dev/video{source}"
+    elif source.startswith("rtsp://"):
+        head = f'rtspsrc location="{source}" latency=200 ! decodebin'
+    elif "://" in source:
+        head = f'uridecodebin uri="{source}"'
+    else:
+        head = f'filesrc location="{source}" ! decodebin'
+    caps = "video/x-raw,format=BGR"
+    if decode.get("width"):
+        caps += f",width={int(decode['width'])}"
+    # Живой поток не копит очередь: appsink держит только последний кадр.
+    sink = "appsink drop=true max-buffers=1 sync=false" if live else "appsink sync=false"
+    return f"{head} ! videoconvert ! videoscale ! {caps} ! {sink}"
+
+
+def open_video_capture(source: str, decode: Optional[Dict[str, Any]] = None) -> cv2.VideoCapture:
+    """``cv2.VideoCapture`` для камеры, файла или потока с параметрами декодирования канала."""
+    decode = decode or {}
+    backend = decode.get("backend", "auto")
+    if backend not in DECODE_BACKENDS:
+        logger.warning("Неизвестный бэкенд декодирования %s, используется auto", backend)
+        backend = "auto"
+    if backend == "gstreamer":
+        if decode.get("keyframes_only") or decode.get("threads"):
+            logger.warning("Источник %s: потоки декодера и опорные кадры задаются только для FFmpeg", source)
+        return cv2.VideoCapture(gstreamer_pipeline(source, decode), cv2.CAP_GSTREAMER)
+    if source.isnumeric():
+        return cv2.VideoCapture(int(source), DECODE_BACKENDS[backend])
+
+    params: List[int] = []
+    if decode.get("threads", 0) > 0:
+        params += [cv2.CAP_PROP_N_THREADS, int(decode["threads"])]
+    if decode.get("hw_accel"):
+        params += [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+    # Окружение общее для процесса, а FFmpeg читает его при каждом открытии: все открытия
+    # идут по очереди, иначе канал без опции подхватил бы «только опорные кадры» соседа.
+    with _ffmpeg_env_lock:
+        if not decode.get("keyframes_only"):
+            return cv2.VideoCapture(source, DECODE_BACKENDS[backend], params)
+        previous = os.environ.get(FFMPEG_OPTIONS_ENV)
+        os.environ[FFMPEG_OPTIONS_ENV] = f"{previous}|avdiscard;nonkey" if previous else "avdiscard;nonkey"
+        try:
+            return cv2.VideoCapture(source, DECODE_BACKENDS[backend], params)
+        finally:
+            if previous is None:
+                del os.environ[FFMPEG_OPTIONS_ENV]
+            else:
+                os.environ[FFMPEG_OPTIONS_ENV] = previous
+
+
+def open_source(source: str, decode: Optional[Dict[str, Any]] = None):
+    """Открывает источник канала по строке ``source``; возвращает объект с интерфейсом ``cv2.VideoCapture``."""
+    decode = decode or {}
+    if source.startswith(SYNTHETIC_SCHEME):
+        capture = SyntheticSource.from_url(source)
+    elif source.startswith(LOOP_SCHEME):
+        capture = LoopingFileSource.from_url(source, decode)
+    else:
+        capture = open_video_capture(source, decode)
+    if decode.get("width", 0) > 0:
+        capture = ScaledCapture(capture, int(decode["width"]))
+    return capture
@@ -0,0 +1,253 @@
+"""Список розыска: проверка каждого события по номерам из CSV без обращения к диску.
+
+Индекс строится целиком в памяти и подменяется одной ссылкой, поэтому горячая
+перезагрузка файла не останавливает проверки в каналах. Номер ищется в три шага:
+
+1. точное совпадение (словарь);
+2. совпадение с учетом путаниц OCR между цифрой и похожей буквой (``0``/``O``, ``8``/``B``):
+   номер формата «Б ЦЦЦ ББ ЦЦ[Ц]» приводится к канонической форме, где на местах букв стоят
+   буквы, а на местах цифр — цифры. Разные буквы (и разные цифры) не сливаются, поэтому
+   другой действительный номер так не совпадет;
+3. нечеткое совпадение — одна замена, пропуск или лишний символ в канонической форме.
+   Одна правка не может задеть и начало, и конец номера, поэтому кандидаты берутся
+   из двух словарей: по первым и по последним ``KEY_LENGTH`` символам (n-граммы на
+   краях номера), и проверяются за один проход по строке.
+"""
+
+import csv
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from logging_manager import get_logger
+
+logger = get_logger(__name__)
+
+# Кириллица в CSV приводится к латинским двойникам алфавита OCR.
+CYRILLIC_TO_LATIN = str.maketrans("АВЕКМНОРСТУХ", "ABEKMHOPCTYX")
+# Цифры и буквы, которые OCR путает между собой: применяются только там, где формат
+# номера ожидает другой класс символа.
+DIGIT_TO_LETTER = str.maketrans("08", "OB")
+LETTER_TO_DIGIT = str.maketrans("OB", "08")
+# Позиции букв в номере «Б ЦЦЦ ББ ЦЦ[Ц]» (8 или 9 символов); остальные позиции — цифры.
+LETTER_POSITIONS = frozenset({0, 4, 5})
+# Длина краевых ключей нечеткого индекса; у коротких номеров — половина длины.
+KEY_LENGTH = 4
+
+
+def normalize_plate(plate: str) -> str:
+    """Верхний регистр, латиница, без пробелов и разделителей."""
+    plate = plate.upper().translate(CYRILLIC_TO_LATIN)
+    return "".join(ch for ch in plate if ch.isalnum())
+
+
+def canonical_plate(plate: str) -> str:
+    """Исправляет класс символа по позиции в стандартном номере; другие форматы не меняются."""
+    if len(plate) not in (8, 9):
+        return plate
+    return "".join(
+        char.translate(DIGIT_TO_LETTER if index in LETTER_POSITIONS else LETTER_TO_DIGIT)
+        for index, char in enumerate(plate)
+    )
+
+
+def _key_size(length: int) -> int:
+    return min(KEY_LENGTH, length // 2)
+
+
+def _edge_keys(text: str) -> List[str]:
+    """Краевые ключи для всех длин запроса, отличающихся от номера не больше чем на символ."""
+    sizes = {_key_size(length) for length in (len(text) - 1, len(text), len(text) + 1)} - {0}
+    keys = []
+    for size in sorted(sizes):
+        keys.append(f"{size}<{text[:size]}")
+        keys.append(f"{size}>{text[-size:]}")
+    return keys
+
+
+def _one_edit_apart(a: str, b: str) -> bool:
+    """Строки отличаются ровно одной заменой, вставкой или пропуском символа."""
+    if len(a) > len(b):
+        a, b = b, a
+    if len(b) - len(a) > 1:
+        return False
+    for i, (char_a, char_b) in enumerate(zip(a, b)):
+        if char_a != char_b:
+            if len(a) == len(b):
+                return a[i + 1 :] == b[i + 1 :]
+            return a[i:] == b[i + 1 :]
+    return len(a) != len(b)
+
+
+@dataclass(frozen=True)
+class WatchEntry:
+    plate: str
+    note: str = ""
+
+
+@dataclass(frozen=True)
+class WatchMatch:
+    """Результат проверки: запись списка, способ совпадения и расстояние."""
+
+    entry: WatchEntry
+    kind: str
+    distance: int = 0
+
+
+class _Index:
+    """Неизменяемый индекс одной версии списка."""
+
+    def __init__(self, entries: List[WatchEntry]) -> None:
+        self.exact: Dict[str, WatchEntry] = {}
+        self.canonical: Dict[str, WatchEntry] = {}
+        edges: Dict[str, List[str]] = defaultdict(list)
+        for entry in entries:
+            if entry.plate in self.exact:
+                continue
+            self.exact[entry.plate] = entry
+            form = canonical_plate(entry.plate)
+            if form in self.canonical:
+                continue
+            self.canonical[form] = entry
+            for key in _edge_keys(form):
+                edges[key].append(form)
+        # Кортежи компактнее списков и не меняются после сборки.
+        self.edges: Dict[str, tuple] = {key: tuple(forms) for key, forms in edges.items()}
+
+    def __len__(self) -> int:
+        return len(self.exact)
+
+
+class Watchlist:
+    """Список номеров с точным, «OCR-путаным» и нечетким поиском и горячей перезагрузкой из CSV.
+
+    CSV: номер в первой колонке, необязательный комментарий во второй; строка заголовка
+    и строки с ``#`` пропускаются. Один экземпляр разделяется всеми каналами.
+    """
+
+    def __init__(self, path: Optional[str] = None, fuzzy: bool = True) -> None:
+        self.path = path
+        self.fuzzy = fuzzy
+        self._index = _Index([])
+        self._mtime: Optional[float] = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.checks = 0
+        self.matches = 0
+        if path:
+            self.reload()
+
+    @classmethod
+    def from_config(cls, config: Dict) -> Optional["Watchlist"]:
+        """Список по разделу ``watchlist`` настроек; None, если он выключен."""
+        if not config.get("enabled", False):
+            return None
+        watchlist = cls(
+            config.get("file", "data/watchlist.csv"),
+            fuzzy=bool(config.get("fuzzy", True)),
+        )
+        interval = float(config.get("reload_seconds", 5.0))
+        if interval > 0:
+            watchlist.start_auto_reload(interval)
+        return watchlist
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @staticmethod
+    def read_csv(path: str) -> List[WatchEntry]:
+        entries = []
+        with open(path, encoding="utf-8-sig", newline="") as handle:
+            for row in csv.reader(handle):
+                if not row or row[0].lstrip().startswith("#"):
+                    continue
+                plate = normalize_plate(row[0])
+                if not plate or plate == "PLATE":
+                    continue
+                entries.append(WatchEntry(plate, row[1].strip() if len(row) > 1 else ""))
+        return entries
+
+    def load(self, entries: List[WatchEntry]) -> None:
+        """Строит новый индекс и подменяет текущий одной операцией."""
+        self._index = _Index(entries)
+
+    def reload(self) -> bool:
+        """Перечитывает CSV, если он изменился; True — список обновлен."""
+        with self._reload_lock:
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                if self._mtime is not None:
+                    logger.warning("Файл списка розыска %s недоступен, используется прежний список", self.path)
+                return False
+            if mtime == self._mtime:
+                return False
+            started = time.perf_counter()
+            try:
+                entries = self.read_csv(self.path)
+            except (OSError, UnicodeDecodeError, csv.Error):
+                logger.exception("Не удалось прочитать список розыска %s", self.path)
+                return False
+            self.load(entries)
+            self._mtime = mtime
+            logger.info(
+                "Список розыска загружен: %d номеров за %.2f с (%s)",
+                len(self._index),
+                time.perf_counter() - started,
+                self.path,
+            )
+            return True
+
+    def start_auto_reload(self, interval: float) -> threading.Thread:
+        """Фоновый поток, который перечитывает файл при изменении времени модификации."""
+
+        def watch() -> None:
+            while not self._stop.wait(interval):
+                self.reload()
+
+        thread = threading.Thread(target=watch, name="watchlist-reload", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def metrics(self) -> Dict[str, float]:
+        """Показатели для ``REGISTRY.register_gauge``."""
+        return {"plates": len(self._index), "checks": self.checks, "matches": self.matches}
+
+    def match(self, plate: str) -> Optional[WatchMatch]:
+        """Проверяет распознанный номер; None — номера нет в списке."""
+        index = self._index
+        self.checks += 1
+        plate = normalize_plate(plate)
+        entry = index.exact.get(plate)
+        if entry is not None:
+            self.matches += 1
+            return WatchMatch(entry, "exact")
+        form = canonical_plate(plate)
+        entry = index.canonical.get(form)
+        if entry is not None:
+            self.matches += 1
+            return WatchMatch(entry, "confusion")
+        if not self.fuzzy:
+            return None
+        found = self._fuzzy(index, form)
+        if found is not None:
+            self.matches += 1
+        return found
+
+    @staticmethod
+    def _fuzzy(index: _Index, form: str) -> Optional[WatchMatch]:
+        # Правка в первой половине не трогает последние символы, и наоборот.
+        size = _key_size(len(form))
+        if size < 1:
+            return None
+        for key in (f"{size}<{form[:size]}", f"{size}>{form[-size:]}"):
+            for candidate in index.edges.get(key, ()):
+                if _one_edit_apart(form, candidate):
+                    return WatchMatch(index.canonical[candidate], "fuzzy", 1)
+        return None